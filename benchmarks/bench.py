@@ -0,0 +1,229 @@
+"""
+Benchmark suite for the cassava hot paths
+
+Each scenario generates a seeded synthetic CSV file (see synthetic.py), and
+then times each benchmark against it.  The results can be saved as a
+baseline, and subsequent runs compared against that baseline, flagging any
+benchmark that is slower than the baseline by more than a threshold
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from cassava import Cassava
+
+from benchmarks import synthetic
+
+DEF_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEF_THRESHOLD = 0.2
+DEF_REPEAT = 3
+
+SCENARIOS = {
+    'datetime': {
+        'generator': {'ragged_fraction': 0.001},
+        'conf': {'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'x_as_datetime': True}
+    },
+    'numeric': {
+        'generator': {'x_as_datetime': False, 'ragged_fraction': 0.001},
+        'conf': {'header_row': 0, 'first_data_row': 1, 'xcol': 0}
+    },
+    'numeric_only': {
+        'generator': {'x_as_datetime': False},
+        'conf': {'header_row': 0, 'first_data_row': 1, 'xcol': 0}
+    },
+    'bom_commented': {
+        'generator': {'bom': True, 'comment': '#', 'ncomment_lines': 20},
+        'conf': {'comment': '#', 'xcol': 0, 'x_as_datetime': True}
+    }
+}
+
+def _read(f):
+    f.fp.seek(0, 0)
+    f.read()
+
+def _plot(f):
+    fig, axs = f.plot(show=False)
+    plt.close(fig)
+
+def _plot_stats(f):
+    fig, axs = f.plot_stats(show=False)
+    plt.close(fig)
+
+BENCHMARKS = {
+    'read': _read,
+    'get_x_axis_data': lambda f: f.get_x_axis_data(),
+    'get_y_axis_data': lambda f: [f.get_y_axis_data(ycol) for ycol in f.conf['ycol']],
+    'check_bom': lambda f: f.check_bom(),
+    'check_column_counts': lambda f: list(f.check_column_counts()),
+    'check_empty_columns': lambda f: list(f.check_empty_columns()),
+    'check_empty_rows': lambda f: list(f.check_empty_rows()),
+    'check_column_outliers_iqr': lambda f: list(f.check_column_outliers_iqr()),
+    'check_time_axis': lambda f: list(f.check_time_axis()),
+    'compute_column_stats': lambda f: list(f.compute_column_stats()),
+    'plot': _plot,
+    'plot_stats': _plot_stats
+}
+
+def time_benchmark(func, f, repeat=DEF_REPEAT):
+    """
+    Time the given benchmark function
+
+    :param func: The benchmark function, taking the Cassava object
+    :type func: Function
+    :param f: The Cassava object
+    :type f: Cassava
+    :param repeat: The number of times to repeat the benchmark
+    :type repeat: int
+    :returns: The best wall time, in seconds
+    :rtype: float
+    """
+
+    times = []
+
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func(f)
+        times.append(time.perf_counter() - t0)
+
+    return min(times)
+
+def run_scenario(name, nrows, ncols, seed=0, repeat=DEF_REPEAT, benchmarks=None):
+    """
+    Run the benchmarks for the given scenario
+
+    :param name: The scenario name
+    :type name: str
+    :param nrows: The number of data rows to generate
+    :type nrows: int
+    :param ncols: The number of columns to generate
+    :type ncols: int
+    :param seed: The generator seed
+    :type seed: int
+    :param repeat: The number of times to repeat each benchmark
+    :type repeat: int
+    :param benchmarks: The names of the benchmarks to run (default all)
+    :type benchmarks: list
+    :returns: The results, keyed by "scenario.benchmark"
+    :rtype: dict
+    """
+
+    scenario = SCENARIOS[name]
+    gen_conf = synthetic.DEFAULTS.copy()
+    gen_conf.update({'nrows': nrows, 'ncols': ncols, 'seed': seed})
+    gen_conf.update(scenario['generator'])
+    conf = Cassava.DEFAULTS.copy()
+    conf.update({'ycol': list(range(1, ncols)), 'missing_value': gen_conf['missing_value'], 'forgive': True})
+    conf.update(scenario['conf'])
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = synthetic.generate(os.path.join(tmpdir, f'{name}.csv'), gen_conf)
+
+        with Cassava(path=path, conf=conf) as f:
+            f.read()
+
+            for bench, func in BENCHMARKS.items():
+                if benchmarks and bench not in benchmarks:
+                    continue
+
+                results[f'{name}.{bench}'] = time_benchmark(func, f, repeat=repeat)
+
+    return results
+
+def compare(results, baseline, threshold=DEF_THRESHOLD):
+    """
+    Compare the results against the baseline
+
+    :param results: The benchmark results
+    :type results: dict
+    :param baseline: The baseline results
+    :type baseline: dict
+    :param threshold: The fractional slowdown considered a regression
+    :type threshold: float
+    :returns: A list of (name, time, baseline time, ratio, is_regression)
+    :rtype: list
+    """
+
+    table = []
+
+    for name, t in results.items():
+        base = baseline.get(name)
+        ratio = t / base if base else None
+        is_regression = ratio is not None and ratio > 1 + threshold
+        table.append((name, t, base, ratio, is_regression))
+
+    return table
+
+def parse_cmdln():
+    """
+    Parse the command line
+
+    :returns: An object containing the command line arguments and options
+    :rtype: argparse.Namespace
+    """
+
+    parser = argparse.ArgumentParser(description='benchmark the cassava hot paths against a stored baseline')
+    parser.add_argument('-r', '--rows', help='number of data rows', dest='nrows', default=100000, type=int)
+    parser.add_argument('-n', '--columns', help='number of columns, including the x-axis column', dest='ncols', default=10, type=int)
+    parser.add_argument('--seed', help='random number generator seed', dest='seed', default=0, type=int)
+    parser.add_argument('--repeat', help='number of times to repeat each benchmark (the best time is kept)', dest='repeat', default=DEF_REPEAT, type=int)
+    parser.add_argument('--scenario', help='scenario to run (can be given multiple times, default all)', dest='scenarios', action='append', choices=list(SCENARIOS))
+    parser.add_argument('--benchmark', help='benchmark to run (can be given multiple times, default all)', dest='benchmarks', action='append', choices=list(BENCHMARKS))
+    parser.add_argument('-b', '--baseline', help='baseline results file', dest='baseline', default=DEF_BASELINE)
+    parser.add_argument('-t', '--threshold', help='fractional slowdown, relative to the baseline, considered a regression', dest='threshold', default=DEF_THRESHOLD, type=float)
+    parser.add_argument('--save', help='save the results as the new baseline', action='store_true')
+
+    return parser.parse_args()
+
+def main():
+    """
+    Main function
+    """
+
+    args = parse_cmdln()
+    params = {'nrows': args.nrows, 'ncols': args.ncols, 'seed': args.seed}
+    results = {}
+
+    for name in args.scenarios or SCENARIOS:
+        results.update(run_scenario(name, args.nrows, args.ncols, seed=args.seed, repeat=args.repeat, benchmarks=args.benchmarks))
+
+    baseline = {}
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fp:
+            stored = json.load(fp)
+
+        if stored['params'] == params:
+            baseline = stored['results']
+        else:
+            print(f"Baseline parameters {stored['params']} differ from {params}, so not comparing", file=sys.stderr)
+
+    table = compare(results, baseline, threshold=args.threshold)
+    nregressions = 0
+
+    print(f"{'benchmark':<40}{'time (s)':>12}{'baseline (s)':>14}{'ratio':>8}")
+
+    for name, t, base, ratio, is_regression in table:
+        base_text = f'{base:.4f}' if base else '-'
+        ratio_text = f'{ratio:.2f}' if ratio else '-'
+        flag = '  REGRESSION' if is_regression else ''
+        print(f'{name:<40}{t:>12.4f}{base_text:>14}{ratio_text:>8}{flag}')
+        nregressions += is_regression
+
+    if args.save:
+        with open(args.baseline, 'w') as fp:
+            json.dump({'params': params, 'results': results}, fp, indent=2)
+
+    if nregressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Seeded synthetic CSV data generator for the cassava benchmarks
+"""
+
+import argparse
+import codecs
+import datetime
+import random
+
+DEFAULTS = {
+    'nrows': 100000,
+    'ncols': 10,
+    'seed': 0,
+    'x_as_datetime': True,
+    'datetime_format': '%Y-%m-%dT%H:%M:%S',
+    'start': '2000-01-01T00:00:00',
+    'cadence': 60,
+    'missing_value': '-999',
+    'missing_fraction': 0.01,
+    'ragged_fraction': 0.0,
+    'bom': False,
+    'comment': None,
+    'ncomment_lines': 0,
+    'delimiter': ','
+}
+
+def generate_lines(conf=DEFAULTS):
+    """
+    Generate the lines of a synthetic CSV file
+
+    The first column holds the x-axis data (datetimes or row indices), and
+    the remaining columns hold random walks.  A fraction of the cells are set
+    to the missing value, and a fraction of the rows are made ragged by
+    dropping or appending cells
+
+    :param conf: The generator configuration
+    :type conf: dict
+    :yields: A line of the file, without a line terminator
+    """
+
+    rng = random.Random(conf['seed'])
+    d = conf['delimiter']
+    t0 = datetime.datetime.strptime(conf['start'], '%Y-%m-%dT%H:%M:%S')
+    dt = datetime.timedelta(seconds=conf['cadence'])
+    walks = [0.0] * (conf['ncols'] - 1)
+
+    for i in range(conf['ncomment_lines']):
+        yield f"{conf['comment']} key_{i}: value {i}"
+
+    yield d.join(['x'] + [f'v{j}' for j in range(1, conf['ncols'])])
+
+    for i in range(conf['nrows']):
+        if conf['x_as_datetime']:
+            x = (t0 + i * dt).strftime(conf['datetime_format'])
+        else:
+            x = str(i)
+
+        row = [x]
+
+        for j in range(len(walks)):
+            walks[j] += rng.gauss(0, 1)
+
+            if rng.random() < conf['missing_fraction']:
+                row.append(conf['missing_value'])
+            else:
+                row.append(f'{walks[j]:.4f}')
+
+        if rng.random() < conf['ragged_fraction']:
+            if rng.random() < 0.5:
+                row = row[:-1]
+            else:
+                row.append('')
+
+        yield d.join(row)
+
+def generate(path, conf=DEFAULTS):
+    """
+    Write a synthetic CSV file to the given path
+
+    :param path: The output file path
+    :type path: str
+    :param conf: The generator configuration
+    :type conf: dict
+    :returns: The output file path
+    :rtype: str
+    """
+
+    with open(path, 'w', encoding='utf-8', newline='') as fp:
+        if conf['bom']:
+            fp.write(codecs.BOM_UTF8.decode('utf-8'))
+
+        for line in generate_lines(conf):
+            fp.write(line + '\n')
+
+    return path
+
+def parse_cmdln():
+    """
+    Parse the command line
+
+    :returns: An object containing the command line arguments and options
+    :rtype: argparse.Namespace
+    """
+
+    parser = argparse.ArgumentParser(description='generate a seeded synthetic CSV file for benchmarking cassava')
+    parser.add_argument('out_file', help='output file')
+    parser.add_argument('-r', '--rows', help='number of data rows', dest='nrows', default=DEFAULTS['nrows'], type=int)
+    parser.add_argument('-n', '--columns', help='number of columns, including the x-axis column', dest='ncols', default=DEFAULTS['ncols'], type=int)
+    parser.add_argument('--seed', help='random number generator seed', dest='seed', default=DEFAULTS['seed'], type=int)
+    parser.add_argument('--numeric-x', help='write row indices rather than datetimes in the x-axis column', dest='x_as_datetime', action='store_false', default=DEFAULTS['x_as_datetime'])
+    parser.add_argument('--missing-fraction', help='fraction of cells set to the missing value', dest='missing_fraction', default=DEFAULTS['missing_fraction'], type=float)
+    parser.add_argument('--ragged-fraction', help='fraction of rows with a differing column count', dest='ragged_fraction', default=DEFAULTS['ragged_fraction'], type=float)
+    parser.add_argument('--bom', help='begin the file with a UTF-8 BOM', action='store_true', default=DEFAULTS['bom'])
+    parser.add_argument('--comment', help='comment character introducing a file header section', dest='comment', default=DEFAULTS['comment'])
+    parser.add_argument('--comment-lines', help='number of lines in the commented file header section', dest='ncomment_lines', default=DEFAULTS['ncomment_lines'], type=int)
+
+    return parser.parse_args()
+
+def main():
+    """
+    Main function
+    """
+
+    args = parse_cmdln()
+    conf = DEFAULTS.copy()
+    out_file = args.out_file
+    del args.out_file
+    conf.update(vars(args))
+
+    if conf['ncomment_lines'] and not conf['comment']:
+        conf['comment'] = '#'
+
+    generate(out_file, conf)
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,67 @@
 __version__ = '0.4.0'
 
+import os
 import sys
 import csv
+import json
+import time
+import random
+import io
+import itertools
+import heapq
+import re
+import threading
+import concurrent.futures
+import contextlib
+import tracemalloc
 import codecs
+import hashlib
 import encodings
 import datetime
 from enum import Enum
 
+import matplotlib
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 import numpy as np
 from blessed import Terminal
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
 MODE = 'r'
+ISO_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
 ENCODING = 'utf-8'
+MAX_FAILURE_ROWS = 10
+CHUNK_NROWS = 100000
+RESAMPLE_UNITS = {'ms': 'ms', 's': 's', 'min': 'm', 'h': 'h', 'd': 'D', 'w': 'W'}
+MAX_PLOT_POINTS = 4000
+PROGRESS_NROWS = 10000
+PROGRESS_INTERVAL = 0.2
+PROGRESS_LOG_INTERVAL = 5.0
+AGGREGATES = ['mean', 'min', 'max', 'count', 'nan_fraction']
 UTF_8_BOM = codecs.BOM_UTF8.decode('utf-8')
 INDENT = 4
+CHECK_ENTRY_POINT_GROUP = 'cassava.checks'
+CHECK_INPUTS = ['rows', 'row_lengths', 'row_is_empty', 'column_is_empty', 'columns', 'x_axis']
+CHECKS = {}
+ENGINES = {}
+AUTO_ENGINES = ['numeric', 'split', 'csv']
+SNIFF_NLINES = 1000
+COLUMN_TYPES = ['bool', 'int', 'float', 'datetime', 'text']
+COLUMN_PROFILE_NSAMPLE = 1000
+COLUMN_TYPE_THRESHOLD = 0.9
+HLL_PRECISION = 14
+QUANTILE_NSAMPLE = 100000
+EXPORT_BUFFER_SIZE = 1 << 20
+EXPORT_FLAGS = ['missing', 'invalid', 'outlier']
+# The labels kwarg of boxplot() was renamed to tick_labels in matplotlib 3.9
+BOXPLOT_LABELS_KWARG = 'tick_labels' if tuple([int(v) for v in re.findall(r'\d+', matplotlib.__version__)[:2]]) >= (3, 9) else 'labels'
 _term = Terminal()
+_ABSENT = object()
+_check_plugins_loaded = False
 
 class CassavaStatus(Enum):
     """
@@ -28,790 +74,4893 @@ class CassavaStatus(Enum):
     error = 3
     neutral = 4
 
-class Cassava(object):
+class CassavaResults(object):
     """
-    Context manager for processing CSV files
+    Compact, columnar store of check results
+
+    Rather than holding a message dict for each result, the coordinates,
+    status codes and each item of the data payload are held in NumPy
+    arrays.  Message dicts are only created on demand, when iterating over
+    or indexing the results, so a check can return results for every row of
+    a large file cheaply.  Indexing with a slice, mask or index array
+    returns a subset of the results (see also select())
+
+    A coordinate of None (meaning all rows or columns) is held as -1
     """
 
-    DEFAULTS = {
-        'header_row': None,
-        'first_data_row': 0,
-        'comment': None,
-        'xcol': None,
-        'ycol': [0],
-        'x_as_datetime': False,
-        'datetime_format': '%Y-%m-%dT%H:%M:%S',
-        'missing_value': None,
-        'delimiter': ',',
-        'skip_initial_space': False,
-        'forgive': False,
-        'verbose': False
-    }
- 
-    def __init__(self, path=None, mode=MODE, encoding=ENCODING, conf={}):
+    def __init__(self, n, x=None, y=None, status=CassavaStatus.ok, data=None):
         """
         Constructor
 
-        :param path: File path
-        :type path: str
-        :param mode: File open mode
-        :type mode: str
-        :param encoding: File character encoding
-        :type encoding: str
-        :param conf: Optional configuration
-        :type conf: dict
+        Each of x, y and status can be a single value for all the results
+
+        :param n: The number of results
+        :type n: int
+        :param x: The x coordinates
+        :type x: int, None or np.ndarray
+        :param y: The y coordinates
+        :type y: int, None or np.ndarray
+        :param status: The statuses, or their values
+        :type status: CassavaStatus or np.ndarray
+        :param data: The data payload arrays, keyed by item name
+        :type data: dict
         """
 
-        self.path = path
-        self.mode = mode
-        self.encoding = encoding
-        self.conf = conf or self.DEFAULTS
-        self.fp = None
-        self.header_row = []
-        self.rows = []
-        sys.excepthook = self._exception_handler
+        self.x = self._to_array(x, n, np.int64)
+        self.y = self._to_array(y, n, np.int64)
+        self.status = self._to_array(status.value if isinstance(status, CassavaStatus) else status, n, np.int8)
+        self.data = {k: np.asarray(v) for k, v in (data or {}).items()}
 
-    def _exception_handler(self, etype, e, tb, verbose_hook=sys.excepthook):
-        """
-        Custom exception handler to provide focused exception reporting
+    @staticmethod
+    def _to_array(value, n, dtype):
+        if value is None:
+            value = -1
 
-        If running in verbose mode, then exceptions are printed using the
-        given verbose_hook function.  This defaults to the system default,
-        so exceptions will be printed in the normal manner and the program
-        terminated.
+        if np.ndim(value) == 0:
+            return np.full(n, value, dtype=dtype)
 
-        If not in verbose mode, then only the exception message is printed
-        and it is colour-coded as a CassavaError.  If running in forgive
-        mode, the program continues, otherwise the program is immediately
-        terminated.
+        return np.asarray(value, dtype=dtype)
 
-        :param etype: The exception type
-        :type etype: Exception type
-        :param e: The exception to handle
-        :type e: Exception
-        :param tb: The exception traceback
-        :type tb: Exception traceback
-        :param verbose_hook: Function to handle verbose exception output
-        :type verbose_hook: Function
-        :raises: e
+    @classmethod
+    def from_messages(cls, msgs):
         """
+        Construct the results from the given message dicts
 
-        if(self.conf['verbose']):
-            verbose_hook(etype, e, tb)
-        else:
-            self.print_status(str(e), CassavaStatus.error)
+        :param msgs: The message dicts
+        :type msgs: iterable
+        :returns: The results
+        :rtype: CassavaResults
+        """
 
-            if not self.conf['forgive']:
-                sys.exit()
+        msgs = list(msgs)
+        keys = list(dict.fromkeys([k for msg in msgs for k in msg['data']]))
+        data = {}
 
-    def _get_unicode_decode_error_context(self, e, N=20):
+        # Messages can have different data items, e.g. a summary message
+        # followed by a message for each problem found.  An item that a
+        # message doesn't have is held as _ABSENT, and left out of the
+        # message dict that's created on demand
+        for k in keys:
+            values = [msg['data'].get(k, _ABSENT) for msg in msgs]
+            data[k] = np.array(values, dtype=object if any([isinstance(v, (list, dict)) or v is _ABSENT for v in values]) else None)
+
+        x = [-1 if msg['x'] is None else msg['x'] for msg in msgs]
+        y = [-1 if msg['y'] is None else msg['y'] for msg in msgs]
+        status = [msg['status'].value for msg in msgs]
+
+        return cls(len(msgs), x=x, y=y, status=status, data=data)
+
+    @classmethod
+    def concatenate(cls, results):
         """
-        Get context of the data that caused a UnicodeDecodeError exception
+        Concatenate the given results, which must have the same data items
 
-        :param e: The exception object
-        :type e: Exception
-        :param N: The (max.) number of bytes to include in the context,
-        before and after the btye that caused the exception
-        :type N: int
-        :returns: The data context
-        :rtype: bytes
+        :param results: The results
+        :type results: list
+        :returns: The concatenated results
+        :rtype: CassavaResults
         """
 
-        n = N if e.start > N else e.start
-        start = e.start - n
-        n = N if len(e.object) - e.end > N else len(e.object) - e.end
-        end = e.end + n
-        context = e.object[start:end]
+        if not results:
+            return cls(0)
 
-        return context
+        data = {k: np.concatenate([r.data[k] for r in results]) for k in results[0].data}
 
-    def __enter__(self):
-        """
-        Enter the runtime context for this object
+        return cls(sum([len(r) for r in results]), x=np.concatenate([r.x for r in results]), y=np.concatenate([r.y for r in results]), status=np.concatenate([r.status for r in results]), data=data)
 
-        The path is opened
+    def __len__(self):
+        return len(self.status)
 
-        :returns: This object
-        :rtype: Cassava
-        """
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return self.get_message(i)
 
-        return self.open(path=self.path, mode=self.mode, encoding=self.encoding)
+        return CassavaResults(len(self.status[i]), x=self.x[i], y=self.y[i], status=self.status[i], data={k: v[i] for k, v in self.data.items()})
 
-    def __exit__(self, exc_type, exc_value, exc_traceback):
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get_message(i)
+
+    def get_message(self, i):
         """
-        Exit the runtime context for this object
+        Get the given result as a message dict
 
-        The path is closed
+        :param i: The index of the result
+        :type i: int
+        :returns: The message dict
+        :rtype: dict
+        """
 
-        :returns: False
-        :rtype: bool
+        x, y = self.x[i].item(), self.y[i].item()
+        data = {k: v[i].item() if isinstance(v[i], np.generic) else v[i] for k, v in self.data.items() if v[i] is not _ABSENT}
+
+        return {'x': None if x < 0 else x, 'y': None if y < 0 else y, 'data': data, 'status': CassavaStatus(self.status[i].item())}
+
+    def select(self, statuses):
         """
+        Select the results with the given statuses
 
-        self.close()
+        :param statuses: The statuses
+        :type statuses: list
+        :returns: The selected results
+        :rtype: CassavaResults
+        """
 
-        return False         # This ensures any exception is re-raised
+        return self[np.isin(self.status, [status.value for status in statuses])]
 
-    def open(self, path=None, mode=None, encoding=None):
+    def count(self):
         """
-        Open the given path
+        Count the results by status
 
-        :param path: File path
-        :type path: str
-        :param mode: File open mode
-        :type mode: str
-        :param encoding: File character encoding
-        :type encoding: str
-        :returns: This object
-        :rtype: Cassava
+        :returns: The counts, keyed by status
+        :rtype: dict
         """
 
-        if path:
-            self.path = path
+        values, counts = np.unique(self.status, return_counts=True)
 
-        if mode:
-            self.mode = mode
+        return {CassavaStatus(int(value)): int(count) for value, count in zip(values, counts)}
 
-        if encoding:
-            self.encoding = encoding
+class CassavaNumericRows(object):
+    """
+    Rows of a purely numeric input file, as parsed by the numeric engine
 
-        self.fp = open(self.path, mode=self.mode, encoding=self.encoding)
+    The rows before the first data row are held parsed.  The data rows are
+    held as the raw bytes of their lines, with the offsets of each line,
+    and as an array of the converted values of each column.  A data row is
+    only split into a list of cell strings when it is accessed, so the rows
+    behave as the list of rows parsed by the other engines, while the
+    column methods (e.g. Cassava.get_y_axis_array()) use the converted
+    columns directly (see get_column())
 
-        return self
+    The rows must not be modified
+    """
 
-    def close(self):
+    def __init__(self, head, data, starts, ends, columns, missing, delimiter, missing_values):
         """
-        Close the path
+        Constructor
 
-        :returns: This object
-        :rtype: Cassava
+        :param head: The parsed rows before the first data row
+        :type head: list
+        :param data: The raw bytes of the data rows (ASCII)
+        :type data: bytes
+        :param starts: The offset of each data row's line in data
+        :type starts: np.ndarray
+        :param ends: The offset of the end of each data row's line in data
+        :type ends: np.ndarray
+        :param columns: The converted values of each column, with missing
+        values NaN
+        :type columns: list
+        :param missing: The mask of missing values of each column, or None
+        if the column has no missing values
+        :type missing: list
+        :param delimiter: The delimiter
+        :type delimiter: str
+        :param missing_values: The missing values the columns were converted
+        with (see Cassava.get_missing_values())
+        :type missing_values: list
         """
 
-        self.fp.close()
-        self.fp = None
+        self.head = head
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+        self.columns = columns
+        self.missing = missing
+        self.delimiter = delimiter
+        self.missing_values = missing_values
+        self.ncols = len(columns)
 
-        return self
+    def __len__(self):
+        return len(self.head) + len(self.starts)
 
-    def read(self):
-        """
-        Read the input file
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
 
-        The input is parsed into a list of rows and accessible via self.rows
+        i = int(i)
 
-        If an index has been set in the header_row config item, then after
-        parsing the rows, the header row is stored in self.header_row
+        if i < 0:
+            i += len(self)
 
-        If a comment character has been set in the comment config item, then
-        any commented header section is first read and processed, and used to
-        automatically set the header_row and first_data_row config items
+        if not 0 <= i < len(self):
+            raise IndexError('row index out of range')
+        elif i < len(self.head):
+            return self.head[i]
 
-        :returns: The rows
-        :rtype: list
-        """
+        i -= len(self.head)
 
-        if self.conf['comment'] is not None:
-            self.process_commented_header()
+        return self.data[self.starts[i]:self.ends[i]].decode('ascii').split(self.delimiter)
 
-        reader = csv.reader(self.fp, delimiter=self.conf['delimiter'], skipinitialspace=self.conf['skip_initial_space'])
+    def __iter__(self):
+        yield from self.head
 
-        try:
-            self.rows = [row for row in reader]
-        except UnicodeDecodeError as e:
-            context = self._get_unicode_decode_error_context(e)
-            e.reason = f'{e.reason}. Specify the encoding of the file (see the --encoding option). Error occurred in the block following line number {reader.line_num}. Failed input data context: {context}'
-            raise e
+        for start, end in zip(self.starts.tolist(), self.ends.tolist()):
+            yield self.data[start:end].decode('ascii').split(self.delimiter)
 
-        self.store_header()
+    def __eq__(self, other):
+        if not isinstance(other, (list, CassavaNumericRows)) or len(other) != len(self):
+            return False
 
-        return self.rows
+        return all([a == b for a, b in zip(self, other)])
 
-    def process_commented_header(self):
+    @property
+    def nbytes(self):
+        """
+        The memory used by the rows, in bytes
         """
-        Read and process any commented file header section from the input file
 
-        Any line beginning with the configured comment character is read and
-        processed.  Processing stops on the first non-commented line.  The
-        file is rewound and this processing is then used to set the following:
+        nbytes = sys.getsizeof(self.data) + self.starts.nbytes + self.ends.nbytes
+        nbytes += sum([column.nbytes for column in self.columns])
+        nbytes += sum([mask.nbytes for mask in self.missing if mask is not None])
 
-        self.conf['header_row']        # First non-commented line
-        self.conf['first_data_row']    # Second non-commented line
+        return nbytes
 
-        :returns: Flag indicating whether a commented header is present or not
-        :rtype: bool
+    def get_column(self, col, first_data_row, missing_values):
         """
+        Get the converted values of the given column
 
-        has_commented_header = False
+        The values can only be used if the rows are configured as they were
+        when they were parsed
 
-        for i, line in enumerate(self.fp):
-            # Here, we silently skip over any unnecessary BOM.  The presence
-            # of any unnecessary BOM will be highlighted in QC checks
-            if i == 0 and line.startswith(UTF_8_BOM):
-                line = line[len(UTF_8_BOM):]
+        :param col: The column index
+        :type col: int
+        :param first_data_row: The configured first data row
+        :type first_data_row: int
+        :param missing_values: The configured missing values
+        :type missing_values: list
+        :returns: The values and the mask of missing values, or None if the
+        values can't be used
+        :rtype: tuple
+        """
 
-            if line.startswith(self.conf['comment']):
-                has_commented_header = True
-            else:
-                if has_commented_header:
-                    self.conf['header_row'] = i
-                    self.conf['first_data_row'] = i + 1
+        if first_data_row != len(self.head) or missing_values != self.missing_values or not -self.ncols <= col < self.ncols:
+            return None
 
-                self.fp.seek(0, 0)
-                break
+        values = self.columns[col]
+        mask = self.missing[col]
 
-        return has_commented_header
+        return values, np.zeros(len(values), dtype=bool) if mask is None else mask
 
-    def store_header(self):
+    def get_row_lengths(self):
         """
-        Store the header row, if one is present in the file
+        Get the column count of each row
 
-        :returns: The parsed header row
-        :rtype: list
+        :returns: The column counts
+        :rtype: np.ndarray
         """
 
-        if self.conf['header_row'] is not None:
-            self.header_row = self.rows[self.conf['header_row']]
+        head = np.array([len(row) for row in self.head], dtype=np.int64)
 
-        return self.header_row
+        return np.concatenate([head, np.full(len(self.starts), self.ncols, dtype=np.int64)])
 
-    def get_column_labels_from_header(self, cols):
+    def get_row_is_empty(self):
         """
-        Get the corresponding labels from the header row, for the given colums
+        Get whether each row is wholly empty.  A data row is never empty, as
+        all its cells are numeric or missing values
 
-        :param cols: The column indices
-        :type cols: list
-        :returns: The column labels
-        :rtype: list
+        :returns: The mask of empty rows
+        :rtype: np.ndarray
         """
 
-        labels = []
-
-        if self.header_row:
-            labels = [self.header_row[col] for col in cols]
-
-        return labels
+        head = np.array([row.count('') == len(row) for row in self.head], dtype=bool)
 
-    def to_float_with_missing_value(self, value, missing_value):
-        """
-        Convert the given value to a float, or to NaN if it matches
-        missing_value
+        return np.concatenate([head, np.zeros(len(self.starts), dtype=bool)])
 
-        :param value: The column value (string representation)
-        :type value: str
-        :param missing_value: The value to treat as a missing value
-        :type missing_value: str
-        :returns: The value as a float or np.nan if it matches missing_value
-        :rtype: float or np.nan
+    def get_column_is_empty(self, ncols):
         """
+        Get whether each of the given number of columns is wholly empty.  A
+        column is never empty if there are any data rows, as all their
+        cells are numeric or missing values
 
-        return np.nan if str(value) == str(missing_value) else float(value)
-
-    def get_column_data(self, col, *args, exc_value=np.nan, func=float, **kwargs):
+        :param ncols: The number of columns
+        :type ncols: int
+        :returns: The mask of empty columns
+        :rtype: np.ndarray
         """
-        Get the data for the given column, taking into account forgive mode
-
-        Provides data context and chaining for exceptions
 
-        :param col: The column index
-        :type col: int
-        :param args: Arbitrary arguments for the processing function
-        :type args: args
-        :param exc_value: The value to use in place of values that throw an
-        exception, when running in forgive mode
-        :type exc_value: any
-        :param func: The processing function to apply to each datum
-        :type func: Function
-        :param kwargs: Arbitrary keyword arguments for the processing function
-        :type kwargs: kwargs
-        :returns: The column data
-        :rtype: list
-        """
+        is_empty = np.full(ncols, len(self.starts) == 0)
 
-        data = []
+        for row in self.head:
+            for x, cell in enumerate(row[:ncols]):
+                if cell != '':
+                    is_empty[x] = False
 
-        for i, row in enumerate(self.rows[self.conf['first_data_row']:len(self.rows)], start=self.conf['first_data_row']):
-            try:
-                data.append(func(row[col], *args, **kwargs))
-            except Exception as e:
-                if self.conf['forgive']:
-                    data.append(exc_value)
-                else:
-                    raise type(e)(f'Failed to convert column {col} at row {i} with {func.__name__}: {row}. Cause: {str(e)}') from e
+        return is_empty
 
-        return data
+class CassavaHyperLogLog(object):
+    """
+    HyperLogLog sketch, to estimate the number of distinct values in a
+    stream, in fixed memory
+
+    Each value is hashed (with a 64-bit BLAKE2b digest, rather than the
+    built-in hash(), which is salted per process, so that the estimates are
+    reproducible), and the first p bits of the hash select one of
+    2**p registers, which holds the maximum position of the first set bit
+    seen in the remaining bits.  The registers are updated in bulk for an
+    array of values.  The standard error of the estimate is about
+    1.04 / sqrt(2**p), e.g. 0.8% for the default precision
+    """
 
-    def get_x_axis_data(self, exc_value=np.nan):
+    def __init__(self, p=HLL_PRECISION):
         """
-        Get the x-axis data from the rows, transforming as required
+        Constructor
 
-        :param exc_value: The value to use in place of values that throw an
-        exception, when running in forgive mode
-        :type exc_value: any
-        :returns: The x-axis data
-        :rtype: list
+        :param p: The precision, the number of bits of the register index
+        :type p: int
         """
 
-        # The x-column can be datetime, numeric, or default to list of indices
-        if self.conf['xcol'] is not None:
-            if self.conf['x_as_datetime']:
-                x = self.get_column_data(self.conf['xcol'], self.conf['datetime_format'], func=datetime.datetime.strptime)
-            else:
-                if self.conf['missing_value'] is not None:
-                    x = self.get_column_data(self.conf['xcol'], self.conf['missing_value'], exc_value=exc_value, func=self.to_float_with_missing_value)
-                else:
-                    x = self.get_column_data(self.conf['xcol'], exc_value=exc_value)
-        else:
-            x = [i for i, n in enumerate(range(self.conf['first_data_row'], len(self.rows)))]
-
-        return x
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+        self._bits = np.uint64(1) << np.arange(64 - p, dtype=np.uint64)
 
-    def get_y_axis_data(self, col, exc_value=np.nan):
+    def add(self, values):
         """
-        Get the y-axis data from the rows, transforming as required
+        Add the given values
 
-        :param col: The column index
-        :type col: int
-        :param exc_value: The value to use in place of values that throw an
-        exception, when running in forgive mode
-        :type exc_value: any
-        :returns: The y-axis data
-        :rtype: list
+        :param values: The values, which are hashed as their strings
+        :type values: np.ndarray or list
         """
 
-        if self.conf['missing_value'] is not None:
-            y = self.get_column_data(col, self.conf['missing_value'], exc_value=exc_value, func=self.to_float_with_missing_value)
-        else:
-            y = self.get_column_data(col, exc_value=exc_value)
+        values = values.tolist() if isinstance(values, np.ndarray) else values
 
-        return y
+        if not values:
+            return
 
-    def compute_stats(self, data):
+        digests = b''.join([hashlib.blake2b(str(value).encode('utf-8', 'surrogatepass'), digest_size=8).digest() for value in values])
+        h = np.frombuffer(digests, dtype=np.uint64)
+        index = (h & np.uint64(self.m - 1)).astype(np.intp)
+        w = h >> np.uint64(self.p)
+
+        # The position of the first set bit, counting from the most
+        # significant of the 64 - p bits, from the bit length of w
+        rank = (64 - self.p + 1 - np.searchsorted(self._bits, w, side='right')).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
         """
-        Compute statistics for the given data
+        Estimate the number of distinct values added
 
-        :returns: A stats dict
-        :rtype: dict
+        :returns: The estimate
+        :rtype: int
         """
 
-        q = np.nanquantile(data, [0.25, 0.5, 0.75])
-        stats = {'min': np.nanmin(data), 'mean': np.nanmean(data), 'max': np.nanmax(data), 'q1': q[0], 'median': q[1], 'q3': q[2], 'std': np.nanstd(data)}
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        nzeros = np.count_nonzero(self.registers == 0)
 
-        return stats
+        # Linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * self.m and nzeros:
+            estimate = self.m * np.log(self.m / nzeros)
+
+        return int(round(estimate))
+
+class CassavaQuantileSketch(object):
+    """
+    Uniformly random (reservoir) sample of the values in a stream, to
+    estimate their quantiles in fixed memory
+
+    The values are added in bulk for an array of values, by the reservoir
+    algorithm of Cassava.sample_rows().  Until more than n values have been
+    added, the sample holds all of them, so the quantiles are exact.  After
+    that, the standard error of the rank of an estimated quartile is about
+    0.43 / sqrt(n), e.g. 0.14% for the default sample size.  NaNs are
+    ignored
+    """
+
+    def __init__(self, n=QUANTILE_NSAMPLE, seed=None):
+        """
+        Constructor
+
+        :param n: The sample size
+        :type n: int
+        :param seed: The seed for the random number generator
+        :type seed: int
+        """
+
+        self.n = n
+        self.nvalues = 0
+        self.sample = np.empty(n)
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, values):
+        """
+        Add the given values
+
+        :param values: The values
+        :type values: np.ndarray
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        # Fill the sample, then replace the value at a random index j of the
+        # t values seen so far, if j falls within the sample
+        nfill = max(0, min(self.n - self.nvalues, len(values)))
+        self.sample[self.nvalues:self.nvalues + nfill] = values[:nfill]
+        t = np.arange(self.nvalues + nfill, self.nvalues + len(values))
+        j = (self.rng.random(len(t)) * (t + 1)).astype(np.int64)
+        keep = j < self.n
+        self.sample[j[keep]] = values[nfill:][keep]
+        self.nvalues += len(values)
+
+    def get_values(self):
+        """
+        Get the sampled values
+
+        :returns: The values
+        :rtype: np.ndarray
+        """
+
+        return self.sample[:min(self.n, self.nvalues)]
+
+class CassavaProgress(object):
+    """
+    Progress and throughput display for long reads and checks
+
+    When stdout is a TTY, the progress is drawn on the current line of the
+    terminal, and redrawn in place.  While shown, stdout is wrapped so that
+    the line is cleared before any other output is written.  Otherwise, the
+    progress is written to stderr as periodic log lines.  Updates are
+    throttled to one per interval, so that the cost is negligible.  The rows
+    read are counted by update(), and the rows processed by a later phase
+    (e.g. a check) by advance(), so that the display keeps updating through
+    every phase that scans the rows
+    """
+
+    def __init__(self, total_bytes=None, interval=None):
+        """
+        Constructor
+
+        :param total_bytes: The size of the input, for the ETA
+        :type total_bytes: int
+        :param interval: The minimum time between updates, in seconds
+        (default PROGRESS_INTERVAL for a TTY, otherwise
+        PROGRESS_LOG_INTERVAL)
+        :type interval: float
+        """
+
+        self.isatty = sys.stdout.isatty()
+        self.interval = interval if interval is not None else PROGRESS_INTERVAL if self.isatty else PROGRESS_LOG_INTERVAL
+        self.total_bytes = total_bytes
+        self.phase = None
+        self.nrows = 0
+        self.nbytes = None
+        self.phase_nrows = 0
+        self.t0 = self.t_update = self.t_render = self.t_phase = self.t_advance = time.perf_counter()
+        self.shown = False
+        self.stdout = None
+
+    def __enter__(self):
+        if self.isatty:
+            self.stdout = sys.stdout
+            sys.stdout = _ProgressStream(self, self.stdout)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if self.isatty:
+            self.clear()
+            sys.stdout = self.stdout
+        else:
+            self.phase = 'done'
+            self.phase_nrows = 0
+            self.render()
+
+        return False
+
+    def update(self, nrows, nbytes=None):
+        """
+        Update the number of rows and bytes processed
+
+        :param nrows: The number of rows processed since the last update
+        :type nrows: int
+        :param nbytes: The total number of bytes processed
+        :type nbytes: int
+        """
+
+        self.nrows += nrows
+        self.nbytes = nbytes
+        self.t_update = time.perf_counter()
+
+        if self.t_update - self.t_render >= self.interval:
+            self.render()
+
+    def advance(self, nrows):
+        """
+        Update the number of rows processed by the phase that's underway
+
+        :param nrows: The number of rows processed since the last update
+        :type nrows: int
+        """
+
+        self.phase_nrows += nrows
+        self.t_advance = time.perf_counter()
+
+        if self.t_advance - self.t_render >= self.interval:
+            self.render()
+
+    def set_phase(self, phase):
+        """
+        Set the processing phase that's underway
+
+        :param phase: The phase name
+        :type phase: str
+        """
+
+        self.phase = phase
+        self.phase_nrows = 0
+        self.t_phase = time.perf_counter()
+
+        if self.t_phase - self.t_render >= self.interval:
+            self.render()
+
+    def get_text(self):
+        """
+        Get the text of the progress display
+
+        :returns: The text
+        :rtype: str
+        """
+
+        now = time.perf_counter()
+        elapsed = self.t_update - self.t0
+        parts = []
+
+        if self.phase_nrows:
+            # The rows processed by the phase, of those read
+            elapsed = self.t_advance - self.t_phase
+            text = f'{self.phase_nrows} of {self.nrows} rows'
+
+            if self.nrows:
+                text += f' ({100 * self.phase_nrows / self.nrows:.0f}%)'
+
+            parts.append(text)
+
+            if elapsed > 0:
+                parts.append(f'{self.phase_nrows / elapsed:.0f} rows/s')
+
+            parts.append(f'elapsed {datetime.timedelta(seconds=round(now - self.t0))}')
+
+            return f'{self.phase}: ' + ', '.join(parts)
+
+        if self.nbytes is not None:
+            text = f'{self.nbytes / 1e6:.1f} MB'
+
+            if self.total_bytes:
+                text += f' of {self.total_bytes / 1e6:.1f} MB ({100 * self.nbytes / self.total_bytes:.0f}%)'
+
+            parts.append(text)
+
+        parts.append(f'{self.nrows} rows')
+
+        if elapsed > 0:
+            if self.nbytes is not None:
+                parts.append(f'{self.nbytes / 1e6 / elapsed:.1f} MB/s')
+
+            parts.append(f'{self.nrows / elapsed:.0f} rows/s')
+
+            if self.nbytes and self.total_bytes and self.nbytes < self.total_bytes:
+                eta = (self.total_bytes - self.nbytes) / (self.nbytes / elapsed)
+                parts.append(f'ETA {datetime.timedelta(seconds=round(eta))}')
+
+        parts.append(f'elapsed {datetime.timedelta(seconds=round(now - self.t0))}')
+
+        return f"{self.phase or 'read'}: " + ', '.join(parts)
+
+    def render(self):
+        """
+        Draw the progress line, or write a log line
+        """
+
+        self.t_render = time.perf_counter()
+        text = self.get_text()
+
+        if self.isatty:
+            self.stdout.write('\r' + text[:max(1, _term.width - 1)] + _term.clear_eol)
+            self.stdout.flush()
+            self.shown = True
+        else:
+            print(f'progress: {text}', file=sys.stderr, flush=True)
+
+    def clear(self):
+        """
+        Clear the progress line, if it's shown
+        """
+
+        if self.shown:
+            self.stdout.write('\r' + _term.clear_eol)
+            self.shown = False
+
+class _ProgressStream(object):
+    """
+    Wrap a stream, so that the progress line is cleared before writing to it
+    """
+
+    def __init__(self, progress, stream):
+        self._progress = progress
+        self._stream = stream
+
+    def write(self, text):
+        self._progress.clear()
+
+        return self._stream.write(text)
+
+    def __getattr__(self, attr):
+        return getattr(self._stream, attr)
+
+class CassavaCheck(object):
+    """
+    Base class for QC check plugins
+
+    A check declares the inputs that it needs in its inputs attribute, from:
+
+    * rows: The parsed rows (self.rows)
+    * row_lengths: The column count of each row (np.ndarray)
+    * row_is_empty: Whether each row is wholly empty (np.ndarray)
+    * column_is_empty: Whether each column of the first data row is wholly
+      empty, in all rows (np.ndarray)
+    * columns: The configured ycol columns converted to floats, keyed by
+      column index (dict of np.ndarray)
+    * x_axis: The converted x-axis data (np.ndarray)
+
+    The inputs are computed once by Cassava.run_checks(), in a single scan of
+    the rows and a single conversion per column, and shared by all checks
+
+    A check implements run(), to yield its results as message dicts, and/or
+    results(), to return them as a CassavaResults object.  Each defaults to
+    using the other
+    """
+
+    name = None
+    title = None
+    inputs = set()
+
+    def run(self, f, inputs, **kwargs):
+        """
+        Run the check
+
+        :param f: The Cassava object
+        :type f: Cassava
+        :param inputs: The inputs, keyed by input name
+        :type inputs: dict
+        :param kwargs: Arbitrary keyword arguments for the check
+        :type kwargs: kwargs
+        :yields: A message dict
+        """
+
+        if type(self).results is CassavaCheck.results:
+            raise NotImplementedError
+
+        yield from self.results(f, inputs, **kwargs)
+
+    def results(self, f, inputs, **kwargs):
+        """
+        Run the check, returning its results
+
+        :param f: The Cassava object
+        :type f: Cassava
+        :param inputs: The inputs, keyed by input name
+        :type inputs: dict
+        :param kwargs: Arbitrary keyword arguments for the check
+        :type kwargs: kwargs
+        :returns: The results
+        :rtype: CassavaResults
+        """
+
+        if type(self).run is CassavaCheck.run:
+            raise NotImplementedError
+
+        return CassavaResults.from_messages(self.run(f, inputs, **kwargs))
+
+def register_check(cls):
+    """
+    Register the given check class, so that it is run by Cassava.run_checks()
+
+    This can be used as a class decorator.  Checks can also be registered by
+    other packages, via the cassava.checks entry point group
+
+    :param cls: The check class
+    :type cls: CassavaCheck subclass
+    :returns: The check class
+    :rtype: CassavaCheck subclass
+    """
+
+    unknown = set(cls.inputs) - set(CHECK_INPUTS)
+
+    if unknown:
+        raise ValueError(f'Check {cls.name} requires unknown inputs: {sorted(unknown)}')
+
+    CHECKS[cls.name] = cls
+
+    return cls
+
+def load_check_plugins():
+    """
+    Register any check classes advertised in the cassava.checks entry point
+    group by installed packages
+
+    :returns: The registered checks, keyed by name
+    :rtype: dict
+    """
+
+    global _check_plugins_loaded
+
+    if not _check_plugins_loaded:
+        _check_plugins_loaded = True
+
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            # Python < 3.8
+            return CHECKS
+
+        eps = entry_points()
+
+        if hasattr(eps, 'select'):
+            group = eps.select(group=CHECK_ENTRY_POINT_GROUP)
+        else:
+            group = eps.get(CHECK_ENTRY_POINT_GROUP, [])
+
+        for ep in group:
+            register_check(ep.load())
+
+    return CHECKS
+
+class CassavaEngine(object):
+    """
+    Base class for parser engines
+
+    An engine parses an input file into rows, each a list of cell strings.
+    It implements reader(), to lazily yield the rows of an open file.  An
+    engine that sets its bulk attribute can also implement read(), to parse
+    the whole input file at once, when it's read by Cassava.read() without
+    selecting or sampling rows
+
+    When the engine config item is auto, each engine in AUTO_ENGINES is
+    asked in turn, via sniff(), whether it can parse a sample of the data
+    lines, and the first that can is used (see Cassava.get_engine())
+    """
+
+    name = None
+    bulk = False
+
+    def sniff(self, f, lines):
+        """
+        Determine whether the engine can parse the input file
+
+        :param f: The Cassava object
+        :type f: Cassava
+        :param lines: A sample of the data lines of the input file
+        :type lines: list
+        :returns: Whether the engine can parse the input file
+        :rtype: bool
+        """
+
+        return True
+
+    def reader(self, f, fp):
+        """
+        Get a reader of the rows of the given file
+
+        :param f: The Cassava object
+        :type f: Cassava
+        :param fp: The open file, positioned at its start
+        :type fp: file object
+        :returns: The reader
+        :rtype: iterator
+        """
+
+        raise NotImplementedError
+
+    def read(self, f, fp):
+        """
+        Read all the rows of the given file at once
+
+        :param f: The Cassava object
+        :type f: Cassava
+        :param fp: The open file, positioned at its start
+        :type fp: file object
+        :returns: The rows, or None to read them via reader()
+        :rtype: sequence
+        """
+
+        return None
+
+def register_engine(cls):
+    """
+    Register the given parser engine class, so that it can be chosen with
+    the engine config item
+
+    This can be used as a class decorator
+
+    :param cls: The engine class
+    :type cls: CassavaEngine subclass
+    :returns: The engine class
+    :rtype: CassavaEngine subclass
+    """
+
+    if cls.name == 'auto':
+        raise ValueError('An engine cannot be named auto')
+
+    ENGINES[cls.name] = cls
+
+    return cls
+
+class Cassava(object):
+    """
+    Context manager for processing CSV files
+    """
+
+    DEFAULTS = {
+        'header_row': None,
+        'first_data_row': 0,
+        'comment': None,
+        'xcol': None,
+        'ycol': [0],
+        'x_as_datetime': False,
+        'datetime_format': ISO_DATETIME_FORMAT,
+        'missing_value': None,
+        'delimiter': ',',
+        'skip_initial_space': False,
+        'forgive': False,
+        'sample': None,
+        'sample_every': None,
+        'sample_seed': None,
+        'start': None,
+        'end': None,
+        'row_range': None,
+        'dtype': 'float64',
+        'engine': 'auto',
+        'resample': None,
+        'aggregate': 'mean',
+        'profile': False,
+        'profile_memory': False,
+        'progress': False,
+        'all_columns': False,
+        'workers': None,
+        'verbose': False
+    }
+ 
+    def __init__(self, path=None, mode=MODE, encoding=ENCODING, conf={}):
+        """
+        Constructor
+
+        :param path: File path, or a list of paths of files that are read as
+        a single dataset (see merge_readers())
+        :type path: str or list
+        :param mode: File open mode
+        :type mode: str
+        :param encoding: File character encoding
+        :type encoding: str
+        :param conf: Optional configuration
+        :type conf: dict
+        """
+
+        self.path = path
+        self.mode = mode
+        self.encoding = encoding
+        self.conf = conf or self.DEFAULTS
+        self.fp = None
+        self.fps = []
+        self.header_row = []
+        self.rows = []
+        self.row_numbers = None
+        self.row_offset = 0
+        self.sample_info = None
+        self.selection_info = None
+        self.diff_info = None
+        self.export_info = None
+        self.merge_info = None
+        self.row_sources = None
+        self._merge_source = None
+        self.columns = {}
+        self._columns_rows = None
+        self.conversion_failures = {}
+        self.profile = []
+        self.profile_hooks = []
+        self.progress = None
+        self.engine = None
+        self._profile_local = threading.local()
+        self._profile_peaks = []
+        sys.excepthook = self._exception_handler
+
+    def _exception_handler(self, etype, e, tb, verbose_hook=sys.excepthook):
+        """
+        Custom exception handler to provide focused exception reporting
+
+        If running in verbose mode, then exceptions are printed using the
+        given verbose_hook function.  This defaults to the system default,
+        so exceptions will be printed in the normal manner and the program
+        terminated.
+
+        If not in verbose mode, then only the exception message is printed
+        and it is colour-coded as a CassavaError.  If running in forgive
+        mode, the program continues, otherwise the program is immediately
+        terminated.
+
+        :param etype: The exception type
+        :type etype: Exception type
+        :param e: The exception to handle
+        :type e: Exception
+        :param tb: The exception traceback
+        :type tb: Exception traceback
+        :param verbose_hook: Function to handle verbose exception output
+        :type verbose_hook: Function
+        :raises: e
+        """
+
+        if(self.conf['verbose']):
+            verbose_hook(etype, e, tb)
+        else:
+            self.print_status(str(e), CassavaStatus.error)
+
+            if not self.conf['forgive']:
+                sys.exit()
+
+    def _get_unicode_decode_error_context(self, e, N=20):
+        """
+        Get context of the data that caused a UnicodeDecodeError exception
+
+        :param e: The exception object
+        :type e: Exception
+        :param N: The (max.) number of bytes to include in the context,
+        before and after the btye that caused the exception
+        :type N: int
+        :returns: The data context
+        :rtype: bytes
+        """
+
+        n = N if e.start > N else e.start
+        start = e.start - n
+        n = N if len(e.object) - e.end > N else len(e.object) - e.end
+        end = e.end + n
+        context = e.object[start:end]
+
+        return context
+
+    def _get_unicode_decode_error_offset(self, e):
+        """
+        Get the offset in the input file of the byte that caused a
+        UnicodeDecodeError exception
+
+        The bytes of the file are decoded in chunks, and the exception's
+        object is the chunk that failed, which ends at the current position
+        of the underlying binary file.  The offset can only be determined
+        for a single input file
+
+        :param e: The exception object
+        :type e: Exception
+        :returns: The byte offset, or None if it can't be determined
+        :rtype: int
+        """
+
+        if len(self.fps) != 1:
+            return None
+
+        try:
+            return self.fp.buffer.tell() - len(e.object) + e.start
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def __enter__(self):
+        """
+        Enter the runtime context for this object
+
+        The path is opened
+
+        :returns: This object
+        :rtype: Cassava
+        """
+
+        return self.open(path=self.path, mode=self.mode, encoding=self.encoding)
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        """
+        Exit the runtime context for this object
+
+        The path is closed
+
+        :returns: False
+        :rtype: bool
+        """
+
+        self.close()
+
+        return False         # This ensures any exception is re-raised
+
+    def open(self, path=None, mode=None, encoding=None):
+        """
+        Open the given path
+
+        If the path is a list of paths, then each file is opened, and
+        self.fp is the first of them
+
+        :param path: File path, or a list of paths
+        :type path: str or list
+        :param mode: File open mode
+        :type mode: str
+        :param encoding: File character encoding
+        :type encoding: str
+        :returns: This object
+        :rtype: Cassava
+        """
+
+        if path:
+            self.path = path
+
+        if mode:
+            self.mode = mode
+
+        if encoding:
+            self.encoding = encoding
+
+        paths = self.path if isinstance(self.path, (list, tuple)) else [self.path]
+        self.fps = []
+
+        for path in paths:
+            self.fps.append(open(path, mode=self.mode, encoding=self.encoding))
+
+        self.fp = self.fps[0]
+
+        return self
+
+    def close(self):
+        """
+        Close the path
+
+        :returns: This object
+        :rtype: Cassava
+        """
+
+        for fp in self.fps:
+            fp.close()
+
+        self.fp = None
+        self.fps = []
+
+        return self
+
+    @property
+    def _profile_depth(self):
+        # Each thread has its own depth of nested profile phases
+        return getattr(self._profile_local, 'depth', 0)
+
+    @_profile_depth.setter
+    def _profile_depth(self, depth):
+        self._profile_local.depth = depth
+
+    @contextlib.contextmanager
+    def profile_phase(self, phase, detail=None, nrows=None, nbytes=None):
+        """
+        Context manager to record the wall and CPU time of a processing phase
+
+        If progress is being shown (see show_progress()), the phase is shown
+        as the one underway.
+
+        Nothing is recorded unless the profile config item is set.  The
+        record dict is yielded, so that the nrows and nbytes processed can be
+        set once they are known.  Completed records are stored in
+        self.profile and passed to each function in self.profile_hooks
+
+        If the profile_memory config item is also set, then the net and peak
+        memory allocated during the phase are recorded using tracemalloc
+        (which is started if necessary), along with the process RSS.  Note
+        that tracing memory allocations slows processing considerably, and
+        that on Python < 3.9 the peak is the peak since tracing started
+
+        :param phase: The phase name
+        :type phase: str
+        :param detail: Optional detail of this instance of the phase
+        :type detail: str
+        :param nrows: The number of rows processed
+        :type nrows: int
+        :param nbytes: The number of bytes processed
+        :type nbytes: int
+        :yields: The record dict
+        """
+
+        record = {'phase': phase, 'detail': detail, 'depth': self._profile_depth, 'wall': 0.0, 'cpu': 0.0, 'nrows': nrows, 'nbytes': nbytes}
+
+        if self.progress is not None:
+            self.progress.set_phase(phase)
+
+        if not self.conf['profile']:
+            yield record
+            return
+
+        self.profile.append(record)
+        self._profile_depth += 1
+
+        if self.conf['profile_memory']:
+            mem0 = self._start_memory_phase()
+
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+
+        try:
+            yield record
+        finally:
+            record['wall'] = time.perf_counter() - wall0
+            record['cpu'] = time.process_time() - cpu0
+            self._profile_depth -= 1
+
+            if self.conf['profile_memory']:
+                record.update(self._stop_memory_phase(mem0))
+
+            for hook in self.profile_hooks:
+                hook(record)
+
+    @contextlib.contextmanager
+    def show_progress(self):
+        """
+        Context manager to show the progress of reading and processing the
+        input file, if the progress config item is set (see CassavaProgress)
+
+        :yields: The progress display, or None
+        """
+
+        if not self.conf['progress']:
+            yield None
+            return
+
+        self.progress = CassavaProgress(total_bytes=self._get_file_size())
+
+        try:
+            with self.progress:
+                yield self.progress
+        finally:
+            self.progress = None
+
+    def _track_progress(self, reader):
+        """
+        Count the rows and bytes read from the given reader, for the progress
+        display (see show_progress())
+
+        The rows are counted in chunks, so the cost is negligible.  The
+        source of each merged row is passed on as it's yielded (see
+        merge_readers())
+
+        :param reader: The CSV reader
+        :type reader: iterator
+        :yields: The rows
+        """
+
+        while True:
+            chunk, sources = self._collect_rows(itertools.islice(reader, PROGRESS_NROWS))
+
+            if not chunk:
+                break
+
+            try:
+                nbytes = sum([fp.buffer.tell() for fp in self.fps])
+            except (AttributeError, OSError, ValueError):
+                nbytes = None
+
+            self.progress.update(len(chunk), nbytes=nbytes)
+
+            if sources is None:
+                yield from chunk
+            else:
+                for row, source in zip(chunk, sources):
+                    self._merge_source = source
+
+                    yield row
+
+    def _count_progress(self, rows):
+        """
+        Count the rows processed from the given rows by the phase that's
+        underway, for the progress display (see show_progress())
+
+        As _track_progress(), the rows are counted in chunks
+
+        :param rows: The rows (e.g. self.rows)
+        :type rows: list
+        :returns: An iterator of the rows
+        :rtype: iterator
+        """
+
+        if self.progress is None:
+            return iter(rows)
+
+        def counted(rows):
+            while True:
+                chunk = list(itertools.islice(rows, PROGRESS_NROWS))
+
+                if not chunk:
+                    break
+
+                yield from chunk
+
+                self.progress.advance(len(chunk))
+
+        return counted(iter(rows))
+
+    def _start_memory_phase(self):
+        """
+        Start measuring the memory allocated during a profile phase
+
+        As phases can be nested, the peak seen so far by each enclosing phase
+        is kept on a stack, before the tracemalloc peak is reset for this phase
+
+        :returns: The traced memory at the start of the phase
+        :rtype: int
+        """
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        if self._profile_peaks:
+            self._profile_peaks[-1] = max(self._profile_peaks[-1], peak)
+
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+        self._profile_peaks.append(current)
+
+        return current
+
+    def _stop_memory_phase(self, mem0):
+        """
+        Stop measuring the memory allocated during a profile phase
+
+        :param mem0: The traced memory at the start of the phase
+        :type mem0: int
+        :returns: The memory fields of the profile record
+        :rtype: dict
+        """
+
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(self._profile_peaks.pop(), peak)
+
+        # The enclosing phase's peak must include this phase's peak
+        if self._profile_peaks:
+            self._profile_peaks[-1] = max(self._profile_peaks[-1], peak)
+
+        return {'mem_net': current - mem0, 'mem_peak': peak - mem0, 'rss': self._get_rss(), 'max_rss': self._get_max_rss()}
+
+    def _get_rss(self):
+        """
+        Get the current resident set size (RSS) of this process
+
+        :returns: The RSS in bytes, or None if it can't be determined
+        :rtype: int
+        """
+
+        try:
+            with open('/proc/self/statm') as fp:
+                rss = int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError, AttributeError):
+            rss = None
+
+        return rss
+
+    def _get_max_rss(self):
+        """
+        Get the peak resident set size (RSS) of this process
+
+        :returns: The peak RSS in bytes, or None if it can't be determined
+        :rtype: int
+        """
+
+        if resource is None:
+            return None
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # The units are bytes on macOS, but kilobytes elsewhere
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+    def estimate_rows_memory(self, nsample=1000):
+        """
+        Estimate the memory used by self.rows
+
+        The sizes of the row lists and their cells are measured for a sample
+        of evenly-spaced rows, and extrapolated to all rows.  Cells are
+        assumed not to be shared between rows.  The size of rows read by
+        the numeric engine is known exactly (see CassavaNumericRows)
+
+        :param nsample: The (max.) number of rows to measure
+        :type nsample: int
+        :returns: A dict of the total estimated bytes, the number of cells,
+        and the bytes per cell
+        :rtype: dict
+        """
+
+        if isinstance(self.rows, CassavaNumericRows):
+            ncells = sum([len(row) for row in self.rows.head]) + len(self.rows.starts) * self.rows.ncols
+            nbytes = self.rows.nbytes + sum([sys.getsizeof(row) + sum([sys.getsizeof(cell) for cell in row]) for row in self.rows.head])
+
+            return {'nbytes': nbytes, 'ncells': ncells, 'bytes_per_cell': nbytes / ncells if ncells else None}
+
+        nrows = len(self.rows)
+        step = max(1, nrows // nsample)
+        sample = self.rows[::step]
+        nbytes = sum([sys.getsizeof(row) + sum([sys.getsizeof(cell) for cell in row]) for row in sample])
+        ncells = sum([len(row) for row in sample])
+        scale = nrows / len(sample) if sample else 0
+        total_ncells = int(ncells * scale)
+        total_nbytes = int(nbytes * scale) + sys.getsizeof(self.rows)
+        bytes_per_cell = total_nbytes / total_ncells if total_ncells else None
+
+        return {'nbytes': total_nbytes, 'ncells': total_ncells, 'bytes_per_cell': bytes_per_cell}
+
+    def get_profile_summary(self):
+        """
+        Summarise the profile records, aggregated by phase
+
+        Phases are listed in the order they were first entered.  Nested
+        phases are included in the times of their enclosing phases.  If
+        memory was profiled, then net allocations are summed and peaks are
+        the maximum over all calls
+
+        :returns: A list of summary dicts
+        :rtype: list
+        """
+
+        summary = {}
+
+        for record in self.profile:
+            item = summary.setdefault(record['phase'], {'phase': record['phase'], 'depth': record['depth'], 'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'nrows': None, 'nbytes': None})
+            item['calls'] += 1
+            item['wall'] += record['wall']
+            item['cpu'] += record['cpu']
+            item['depth'] = min(item['depth'], record['depth'])
+
+            for key in ['nrows', 'nbytes', 'mem_net']:
+                if record.get(key) is not None:
+                    item[key] = (item.get(key) or 0) + record[key]
+
+            for key in ['mem_peak', 'max_rss']:
+                if record.get(key) is not None:
+                    item[key] = max(item.get(key) or 0, record[key])
+
+        for item in summary.values():
+            item['rows_per_sec'] = item['nrows'] / item['wall'] if item['nrows'] is not None and item['wall'] else None
+            item['bytes_per_sec'] = item['nbytes'] / item['wall'] if item['nbytes'] is not None and item['wall'] else None
+
+        return list(summary.values())
+
+    def write_profile(self, path):
+        """
+        Write the profile records and their summary to the given path as JSON
+
+        :param path: The output file path
+        :type path: str
+        """
+
+        with open(path, 'w') as fp:
+            profile = {'path': self.path, 'summary': self.get_profile_summary(), 'records': self.profile}
+
+            if self.conf['profile_memory']:
+                profile['rows_memory'] = self.estimate_rows_memory()
+
+            json.dump(profile, fp, indent=2)
+
+    def read(self):
+        """
+        Read the input file
+
+        The input is parsed into a list of rows and accessible via self.rows
+
+        If an index has been set in the header_row config item, then after
+        parsing the rows, the header row is stored in self.header_row
+
+        If a comment character has been set in the comment config item, then
+        any commented header section is first read and processed, and used to
+        automatically set the header_row and first_data_row config items
+
+        If there are multiple input files, then their rows are merged into a
+        single dataset as they are read (see merge_readers())
+
+        If any of the start, end or row_range config items have been set,
+        then only the selected data rows are parsed and stored (see
+        select_rows())
+
+        If either of the sample or sample_every config items have been set,
+        then only a sample of the data rows is stored (see sample_rows())
+
+        The file is parsed by the engine given in the engine config item, or
+        chosen automatically (see get_engine()).  Otherwise, a bulk engine
+        (e.g. the numeric engine) parses a single input file at once, when
+        its rows aren't being selected or sampled
+
+        :returns: The rows
+        :rtype: list
+        """
+
+        with self.profile_phase('read') as record:
+            reader = None
+
+            try:
+                selecting = self.conf['start'] is not None or self.conf['end'] is not None or self.conf['row_range'] is not None
+                sampling = self.conf['sample'] is not None or self.conf['sample_every'] is not None
+                rows, engine = None, None
+
+                if len(self.fps) == 1 and not selecting and not sampling:
+                    if self.conf['comment'] is not None:
+                        self.process_commented_header()
+
+                    engine = self.get_engine(bulk=True)
+
+                    if engine.bulk:
+                        rows = engine.read(self, self.fp)
+
+                        # If the file can't be read in bulk, choose again
+                        # from the engines that stream the rows
+                        engine = None
+
+                if rows is not None:
+                    self.rows = rows
+                    self.row_numbers = None
+                    self.row_offset = 0
+                    self.selection_info = None
+                    self.sample_info = None
+
+                    if self.progress is not None:
+                        self.progress.update(len(rows), nbytes=self._get_file_size())
+                else:
+                    reader = self.get_reader(engine=engine)
+
+                    if selecting:
+                        reader, offset = self.select_rows(reader)
+                    else:
+                        offset = 0
+                        self.selection_info = None
+
+                    if sampling:
+                        self.rows = self.sample_rows(reader, offset=offset)
+                        self.row_offset = 0
+                    elif selecting:
+                        # Any merged row sources are those of the selection
+                        self.rows = [row for row in reader]
+                        self.row_numbers = None
+                        self.row_offset = offset
+                        self.sample_info = None
+                    else:
+                        self.rows, self.row_sources = self._collect_rows(reader)
+                        self.row_numbers = None
+                        self.row_offset = offset
+                        self.sample_info = None
+            except UnicodeDecodeError as e:
+                # The csv reader counts the lines it has read, but the
+                # other engines' readers don't, and the error can occur
+                # before there's a reader, when choosing the engine
+                context = self._get_unicode_decode_error_context(e)
+                line_num = getattr(reader, 'line_num', None)
+                offset = self._get_unicode_decode_error_offset(e)
+                where = ([f'in the block following line number {line_num}'] if line_num is not None else []) + ([f'at byte offset {offset}'] if offset is not None else [])
+                location = f" Error occurred {', '.join(where)}." if where else ''
+                e.reason = f'{e.reason}. Specify the encoding of the file (see the --encoding option).{location} Failed input data context: {context}'
+                raise e
+
+            self.store_header()
+            self.columns = {}
+            self.conversion_failures = {}
+            record['detail'] = f'{self.engine} engine'
+            record['nrows'] = len(self.rows)
+            record['nbytes'] = self.selection_info['nbytes'] if self.selection_info else self._get_file_size()
+
+        return self.rows
+
+    def get_reader(self, engine=None):
+        """
+        Get a reader of the rows of the input file
+
+        Any commented file header section is first processed (see
+        process_commented_header()), and the rows are then parsed by the
+        configured or automatically chosen engine (see get_engine()).  If
+        there are multiple input files, the reader yields their merged rows
+        (see merge_readers()).  If progress is being shown, the rows are
+        counted (see show_progress())
+
+        :param engine: The engine of a single input file, if already chosen
+        :type engine: CassavaEngine
+        :returns: The reader
+        :rtype: iterator
+        """
+
+        if len(self.fps) > 1:
+            reader = self.merge_readers()
+        else:
+            if engine is None:
+                if self.conf['comment'] is not None:
+                    self.process_commented_header()
+
+                engine = self.get_engine()
+
+            reader = engine.reader(self, self.fp)
+
+        if self.progress is not None:
+            reader = self._track_progress(reader)
+
+        return reader
+
+    def get_engine(self, fp=None, bulk=False):
+        """
+        Get the parser engine for the given input file
+
+        If the engine config item is auto, then a sample of the data lines
+        of the file (at most SNIFF_NLINES) is read, and the first engine in
+        AUTO_ENGINES that can parse them is chosen (see CassavaEngine).  A
+        bulk engine is only chosen if bulk is set.  Any commented file header
+        section must already have been processed.  The name of the engine is
+        held in self.engine
+
+        :param fp: The file (default self.fp), positioned at its start
+        :type fp: file object
+        :param bulk: Whether a bulk engine can be chosen
+        :type bulk: bool
+        :returns: The engine
+        :rtype: CassavaEngine
+        """
+
+        fp = fp or self.fp
+        name = self.conf['engine']
+
+        if name == 'auto':
+            y0 = self.conf['first_data_row']
+            lines = list(itertools.islice(fp, y0 + SNIFF_NLINES))[y0:]
+            fp.seek(0, 0)
+
+            for name in AUTO_ENGINES:
+                engine = ENGINES[name]()
+
+                if (bulk or not engine.bulk) and engine.sniff(self, lines):
+                    break
+        elif name in ENGINES:
+            engine = ENGINES[name]()
+        else:
+            raise ValueError(f"Unknown engine {name}, expected one of: {', '.join(['auto'] + list(ENGINES))}")
+
+        self.engine = engine.name
+
+        return engine
+
+    def merge_readers(self):
+        """
+        Get a reader of the merged rows of the input files
+
+        The files must have the same header and configuration, although any
+        commented file header section can differ in length.  The rows before
+        the first data row are those of the first file, and the header row of
+        each file must match it.  The data rows of the files are then merged
+        lazily by their x-axis values (see _get_row_x_key()), with a
+        heap-based k-way merge, so only one row of each file is held at a
+        time.  The data rows of each file must be sorted by their x-axis
+        values, and a row without an x-axis value is kept after the row
+        before it.  Rows with equal x-axis values are taken in file order.
+        If there's no x-axis column, the files are concatenated in order.
+
+        The merged rows are numbered as a single dataset.  The file index and
+        row number in that file of the row last yielded is held in
+        self._merge_source, so that those of the stored rows can be held in
+        self.row_sources (see _collect_rows() and get_row_source()), and the
+        number of data rows of each file is held in self.merge_info
+
+        :returns: The reader
+        :rtype: iterator
+        """
+
+        readers, heads, header_rows = [], [], []
+        conf = None
+
+        for fp in self.fps:
+            if self.conf['comment'] is not None:
+                self.process_commented_header(fp)
+
+            reader = self.get_engine(fp).reader(self, fp)
+            head = list(itertools.islice(reader, self.conf['first_data_row']))
+            y = self.conf['header_row']
+            readers.append(reader)
+            heads.append(head)
+            header_rows.append(head[y] if y is not None and y < len(head) else None)
+            conf = conf or {item: self.conf[item] for item in ['header_row', 'first_data_row']}
+
+        for fp, header_row in zip(self.fps[1:], header_rows[1:]):
+            if header_row != header_rows[0]:
+                raise ValueError(f'The header row of {fp.name} differs from that of {self.fps[0].name}: {header_row}')
+
+        # The merged dataset is configured as the first file
+        self.conf.update(conf)
+
+        self.row_sources = None
+        self.merge_info = {'paths': [fp.name for fp in self.fps], 'xcol': self.conf['xcol'], 'nrows': [0] * len(self.fps)}
+
+        return self._merge_rows(readers, heads)
+
+    def _merge_rows(self, readers, heads):
+        """
+        Merge the rows of the given readers (see merge_readers())
+
+        :param readers: The CSV readers, after the rows before the first
+        data row
+        :type readers: list
+        :param heads: The rows before the first data row of each reader
+        :type heads: list
+        :yields: The merged rows
+        """
+
+        def keyed(i, reader):
+            key = (0,)
+
+            for y, row in enumerate(reader, start=len(heads[i])):
+                if self.conf['xcol'] is not None:
+                    value = self._get_row_x_key(row)
+
+                    if value is not None:
+                        key = (1, value)
+
+                yield key, i, y, row
+
+        for y, row in enumerate(heads[0]):
+            self._merge_source = (0, y)
+
+            yield row
+
+        nrows = self.merge_info['nrows']
+
+        for key, i, y, row in heapq.merge(*[keyed(i, reader) for i, reader in enumerate(readers)]):
+            self._merge_source = (i, y)
+            nrows[i] += 1
+
+            yield row
+
+    def _collect_rows(self, reader):
+        """
+        Collect the rows from the given reader, and if the input files are
+        being merged, the file index and row number in that file of each row
+        (see merge_readers())
+
+        :param reader: The CSV reader
+        :type reader: iterator
+        :returns: The rows, and the sources as an (nrows, 2) array, or None
+        if there's a single input file
+        :rtype: tuple
+        """
+
+        if self.merge_info is None:
+            return [row for row in reader], None
+
+        rows, sources = [], []
+
+        for row in reader:
+            rows.append(row)
+            sources.append(self._merge_source)
+
+        return rows, self._to_sources_array(sources)
+
+    @staticmethod
+    def _to_sources_array(sources):
+        """
+        Get the given (file index, row number) tuples as a compact array
+
+        :param sources: The sources
+        :type sources: list
+        :returns: The sources
+        :rtype: np.ndarray
+        """
+
+        return np.array(sources, dtype=np.int64).reshape(-1, 2)
+
+    def get_row_source(self, y):
+        """
+        Get the input file and the row number in that file, for the given
+        row number of the merged input files (see merge_readers())
+
+        For a single input file, these are simply its path and the row
+        number.  Otherwise, the sources are only held for the stored rows
+        (see self.row_sources), so the row must be stored
+
+        :param y: The row number (e.g. from get_row_number())
+        :type y: int
+        :returns: The path and row number
+        :rtype: tuple
+        """
+
+        if self.row_sources is None:
+            return self.path, y
+
+        if self.row_numbers is not None:
+            k = int(np.searchsorted(self.row_numbers, y))
+        elif y < self.conf['first_data_row']:
+            k = y
+        else:
+            k = y - self.row_offset
+
+        if not 0 <= k < len(self.row_sources) or self.get_row_number(k) != y:
+            raise ValueError(f'Row {y} is not a stored row of the merged input files')
+
+        i, row = self.row_sources[k]
+
+        return self.merge_info['paths'][i], int(row)
+
+    def _get_file_size(self):
+        """
+        Get the size of the open input file, or the total size of the input
+        files
+
+        :returns: The size in bytes, or None if it can't be determined
+        :rtype: int
+        """
+
+        try:
+            size = sum([os.fstat(fp.fileno()).st_size for fp in self.fps])
+        except (AttributeError, OSError, ValueError):
+            size = None
+
+        return size
+
+    def iter_chunks(self, nrows=CHUNK_NROWS):
+        """
+        Read the input file in chunks of data rows
+
+        Rather than holding all the rows, as read() does, each chunk in turn
+        is stored in self.rows, following the rows before the configured
+        first data row, so that the column methods (e.g. get_y_axis_array())
+        operate on the chunk.  The row numbers in the input file of the
+        chunk's data rows are given by the number of data rows preceding the
+        chunk, held in self.row_offset (see get_row_number()).  Similarly,
+        the sources of the chunk's rows of merged input files are held in
+        self.row_sources (see get_row_source())
+
+        The selection and sampling config items don't apply
+
+        :param nrows: The maximum number of data rows in each chunk
+        :type nrows: int
+        :yields: The rows of each chunk
+        """
+
+        reader = self.get_reader()
+        head, head_sources = self._collect_rows(itertools.islice(reader, self.conf['first_data_row']))
+        y = len(head)
+        self.rows = head
+        self.sample_info = None
+        self.selection_info = None
+
+        while True:
+            with self.profile_phase('read', detail='chunk') as record:
+                chunk, sources = self._collect_rows(itertools.islice(reader, nrows))
+                record['nrows'] = len(chunk)
+
+            if not chunk:
+                break
+
+            self.rows = head + chunk
+
+            if y == len(head):
+                self.store_header()
+
+            self.row_numbers = None
+            self.row_offset = y - len(head)
+            self.row_sources = None if sources is None else np.concatenate([head_sources, sources])
+            self.columns = {}
+            self.conversion_failures = {}
+            y += len(chunk)
+
+            yield self.rows
+
+    def sample_rows(self, reader, offset=0):
+        """
+        Sample the data rows from the given reader
+
+        All rows before the configured first data row are kept.  The data
+        rows are then sampled systematically, keeping every sample_every'th
+        row, and/or by reservoir sampling, keeping a uniformly random sample
+        of at most sample rows.  Only the sample is held in memory, so memory
+        use is proportional to the sample size rather than the file size.
+
+        The original row numbers of the stored rows are held in
+        self.row_numbers, and a summary of the sampling in self.sample_info.
+        If the input files are being merged, the sources of the stored rows
+        are held in self.row_sources (see get_row_source())
+
+        :param reader: The CSV reader
+        :type reader: csv.reader
+        :param offset: The number of data rows preceding those in the reader
+        (e.g. when the reader is a selection of the rows, see select_rows())
+        :type offset: int
+        :returns: The sampled rows, in their original order
+        :rtype: list
+        """
+
+        N = self.conf['sample']
+        K = self.conf['sample_every'] or 1
+        y0 = self.conf['first_data_row']
+        rng = random.Random(self.conf['sample_seed'])
+        head, reservoir = [], []
+        ndata = 0
+        t = 0
+
+        # The sources of merged rows are those of any selection, otherwise
+        # those of the row last read (see merge_readers())
+        merging = self.merge_info is not None
+        selected_sources = self.row_sources
+
+        def source(y):
+            if not merging:
+                return None
+
+            return selected_sources[y] if selected_sources is not None else self._merge_source
+
+        for y, row in enumerate(reader):
+            if y < y0:
+                head.append((y, row, source(y)))
+                continue
+
+            ndata += 1
+
+            if (y - y0) % K:
+                continue
+
+            if N is None or t < N:
+                reservoir.append((y + offset, row, source(y)))
+            else:
+                j = rng.randrange(t + 1)
+
+                if j < N:
+                    reservoir[j] = (y + offset, row, source(y))
+
+            t += 1
+
+        reservoir.sort(key=lambda item: item[0])
+        sample = head + reservoir
+        self.row_numbers = [y for y, row, src in sample]
+        self.row_offset = 0
+        self.row_sources = self._to_sources_array([src for y, row, src in sample]) if merging else None
+        self.sample_info = {'sample': N, 'sample_every': self.conf['sample_every'], 'nrows': ndata, 'nsampled': len(reservoir), 'fraction': len(reservoir) / ndata if ndata else 0.0}
+
+        return [row for y, row, src in sample]
+
+    def get_window_bound(self, value):
+        """
+        Get the given start or end config item as a value comparable with
+        the x-axis data
+
+        A datetime string is parsed in ISO 8601 format, or failing that, with
+        the datetime_format config item
+
+        :param value: The start or end value
+        :type value: str, datetime.datetime or float
+        :returns: The comparable value, or None if value is None
+        :rtype: datetime.datetime or float
+        """
+
+        if value is None or not isinstance(value, str):
+            bound = value
+        elif self.conf['x_as_datetime']:
+            try:
+                bound = datetime.datetime.fromisoformat(value)
+            except ValueError:
+                bound = datetime.datetime.strptime(value, self.conf['datetime_format'])
+        else:
+            bound = float(value)
+
+        return bound
+
+    def _get_row_x_key(self, row):
+        """
+        Get the x-axis value of the given row, for comparison with the window
+        bounds
+
+        :param row: The row
+        :type row: list
+        :returns: The x-axis value, or None if it is missing or can't be
+        converted
+        :rtype: datetime.datetime or float
+        """
+
+        try:
+            value = row[self.conf['xcol']]
+
+            if value in self.get_missing_values():
+                key = None
+            elif self.conf['x_as_datetime']:
+                key = datetime.datetime.strptime(value, self.conf['datetime_format'])
+            else:
+                key = float(value)
+        except (IndexError, ValueError):
+            key = None
+
+        return key
+
+    def _get_line_x_key(self, line):
+        """
+        Get the x-axis value of the given encoded line (see _get_row_x_key())
+
+        :param line: The line
+        :type line: bytes
+        :returns: The x-axis value, or None
+        :rtype: datetime.datetime or float
+        """
+
+        try:
+            text = line.decode(self.fp.encoding).rstrip('\r\n')
+        except UnicodeDecodeError:
+            return None
+
+        row = next(csv.reader([text], delimiter=self.conf['delimiter'], skipinitialspace=self.conf['skip_initial_space']), [])
+
+        return self._get_row_x_key(row)
+
+    def _is_byte_seekable(self):
+        """
+        Check whether the input file can be searched by byte offset, with
+        lines delimited by newline bytes
+
+        This requires a seekable binary buffer, and an encoding in which a
+        newline is a single newline byte (e.g. UTF-8, Latin-1, but not
+        UTF-16)
+
+        :returns: True if the input file can be searched by byte offset
+        :rtype: bool
+        """
+
+        # The merged rows of multiple files aren't in any one file
+        if len(self.fps) > 1:
+            return False
+
+        try:
+            seekable = self.fp.buffer.seekable()
+            encoder = codecs.getincrementalencoder(self.fp.encoding)()
+            encoder.encode('a')
+            seekable = seekable and encoder.encode('\n,') == b'\n,'
+        except (AttributeError, LookupError, TypeError, ValueError):
+            seekable = False
+
+        return seekable
+
+    def _skip_lines(self, bfp, pos, n, chunk_size=1 << 20):
+        """
+        Get the byte offset of the line n lines after the given offset
+
+        The lines are counted by their newline bytes, without decoding them
+
+        :param bfp: The binary file object
+        :type bfp: io.BufferedReader
+        :param pos: The byte offset of the start of a line
+        :type pos: int
+        :param n: The number of lines to skip
+        :type n: int
+        :param chunk_size: The number of bytes to read at a time
+        :type chunk_size: int
+        :returns: The byte offset, or the end of the file
+        :rtype: int
+        """
+
+        bfp.seek(pos)
+
+        while n > 0:
+            chunk = bfp.read(chunk_size)
+
+            if not chunk:
+                break
+
+            count = chunk.count(b'\n')
+
+            if count < n:
+                n -= count
+                pos += len(chunk)
+            else:
+                i = -1
+
+                for _ in range(n):
+                    i = chunk.index(b'\n', i + 1)
+
+                pos += i + 1
+                n = 0
+
+        return pos
+
+    def _count_lines(self, bfp, lo, hi, chunk_size=1 << 20):
+        """
+        Count the lines between the given byte offsets, without decoding them
+
+        :param bfp: The binary file object
+        :type bfp: io.BufferedReader
+        :param lo: The byte offset of the start of the first line
+        :type lo: int
+        :param hi: The byte offset of the start of the line after the last
+        :type hi: int
+        :param chunk_size: The number of bytes to read at a time
+        :type chunk_size: int
+        :returns: The number of lines
+        :rtype: int
+        """
+
+        bfp.seek(lo)
+        n = 0
+
+        while lo < hi:
+            chunk = bfp.read(min(chunk_size, hi - lo))
+
+            if not chunk:
+                break
+
+            n += chunk.count(b'\n')
+            lo += len(chunk)
+
+        return n
+
+    def _find_line_offset(self, bfp, lo, hi, before, window=4096):
+        """
+        Find the byte offset of the first line, in the given byte range of
+        lines sorted by their x-axis values, that is not before a bound
+
+        The range is bisected, seeking to the midpoint and resynchronising on
+        the next line boundary, until it is small enough to be scanned.  A
+        line whose x-axis value can't be converted takes the value of the
+        next line that can
+
+        :param bfp: The binary file object
+        :type bfp: io.BufferedReader
+        :param lo: The byte offset of the start of the first line
+        :type lo: int
+        :param hi: The byte offset of the start of the line after the last
+        :type hi: int
+        :param before: Function that returns True if the given x-axis value
+        is before the bound
+        :type before: function
+        :param window: The range size below which the lines are scanned
+        :type window: int
+        :returns: The byte offset of the line, or hi if all are before
+        :rtype: int
+        """
+
+        end = hi
+
+        # Invariant: all lines starting before lo are before the bound, and
+        # the line sought starts at or before hi
+        while hi - lo > window:
+            mid = (lo + hi) // 2
+            bfp.seek(mid - 1)
+            bfp.readline()
+            p = q = bfp.tell()
+
+            if p >= hi:
+                break
+
+            key = None
+
+            while q < end and key is None:
+                line = bfp.readline()
+                key = self._get_line_x_key(line)
+                q += len(line)
+
+            if key is not None and before(key):
+                lo = q
+            else:
+                hi = p
+
+        bfp.seek(lo)
+        pos = candidate = lo
+
+        while pos < end:
+            line = bfp.readline()
+            key = self._get_line_x_key(line)
+
+            if key is not None:
+                if not before(key):
+                    return candidate
+
+                candidate = pos + len(line)
+
+            pos += len(line)
+
+        return candidate
+
+    def _select_rows_by_offset(self):
+        """
+        Select the rows by seeking to byte offsets in the input file
+
+        See select_rows()
+
+        :returns: The selected rows and the number of data rows preceding
+        them
+        :rtype: tuple
+        """
+
+        bfp = self.fp.buffer
+        y0 = self.conf['first_data_row']
+        start = self.get_window_bound(self.conf['start'])
+        end = self.get_window_bound(self.conf['end'])
+        a, b = self.conf['row_range'] or (None, None)
+
+        bfp.seek(0)
+        head = b''.join([bfp.readline() for y in range(y0)])
+        lo = bfp.tell()
+        hi = os.fstat(bfp.fileno()).st_size
+        first = y0
+
+        if a is not None and a > y0:
+            lo = self._skip_lines(bfp, lo, a - y0)
+            first = a
+
+        if b is not None:
+            hi = min(hi, self._skip_lines(bfp, lo, max(0, b - first)))
+
+        if start is not None:
+            pos = self._find_line_offset(bfp, lo, hi, lambda x: x < start)
+            first += self._count_lines(bfp, lo, pos)
+            lo = pos
+
+        if end is not None:
+            hi = self._find_line_offset(bfp, lo, hi, lambda x: x <= end)
+
+        bfp.seek(lo)
+        data = bfp.read(max(0, hi - lo))
+        self.fp.seek(0)
+        kwargs = {'delimiter': self.conf['delimiter'], 'skipinitialspace': self.conf['skip_initial_space']}
+        rows = [row for row in csv.reader(io.StringIO(head.decode(self.fp.encoding)), **kwargs)]
+        rows += [row for row in csv.reader(io.StringIO(data.decode(self.fp.encoding)), **kwargs)]
+        self.selection_info = {'nbytes': len(head) + len(data)}
+
+        return rows, first - y0
+
+    def _select_rows_by_scan(self, reader):
+        """
+        Select the rows by parsing all rows from the given reader
+
+        See select_rows()
+
+        :param reader: The CSV reader
+        :type reader: csv.reader
+        :returns: The selected rows and the number of data rows preceding
+        them
+        :rtype: tuple
+        """
+
+        y0 = self.conf['first_data_row']
+        start = self.get_window_bound(self.conf['start'])
+        end = self.get_window_bound(self.conf['end'])
+        a, b = self.conf['row_range'] or (None, None)
+
+        rows, sources = self._collect_rows(reader)
+        lo = max(y0, a) if a is not None else y0
+        hi = len(rows) if b is None else max(lo, min(b, len(rows)))
+        keys = [self._get_row_x_key(row) for row in rows[lo:hi]] if start is not None or end is not None else []
+
+        # As _find_line_offset(), a row without an x-axis value is selected
+        # as for the next row with one
+        def find(before):
+            candidate = 0
+
+            for i, key in enumerate(keys):
+                if key is not None:
+                    if not before(key):
+                        return candidate
+
+                    candidate = i + 1
+
+            return candidate
+
+        if end is not None:
+            hi = lo + find(lambda x: x <= end)
+
+        if start is not None:
+            lo = lo + find(lambda x: x < start)
+
+        self.selection_info = {'nbytes': self._get_file_size()}
+
+        if sources is not None:
+            self.row_sources = np.concatenate([sources[:y0], sources[lo:max(lo, hi)]])
+
+        return rows[:y0] + rows[lo:max(lo, hi)], lo - y0
+
+    def select_rows(self, reader):
+        """
+        Select the data rows given by the start, end and row_range config
+        items
+
+        All rows before the configured first data row are kept.  The
+        row_range config item is a (first, last + 1) tuple of row numbers,
+        either of which can be None.  The start and end config items select
+        the rows whose x-axis values are within [start, end], and require the
+        data rows to be sorted by their x-axis values.
+
+        Where possible, the selected rows are located by seeking to byte
+        offsets in the input file (a binary search for start and end), so
+        only the selected rows are decoded and parsed.  This assumes that
+        each row is a single line.  Otherwise, all rows are parsed from the
+        given reader and then selected.
+
+        The selected rows keep their row numbers in the input file (see
+        get_row_number()), and a summary of the selection is held in
+        self.selection_info.  If the input files are being merged, the
+        sources of the selected rows are held in self.row_sources (see
+        get_row_source())
+
+        :param reader: The CSV reader
+        :type reader: csv.reader
+        :returns: The selected rows and the number of data rows preceding
+        them in the input file
+        :rtype: tuple
+        """
+
+        if (self.conf['start'] is not None or self.conf['end'] is not None) and self.conf['xcol'] is None:
+            raise ValueError('Selecting rows by start or end requires an x-axis column (xcol)')
+
+        with self.profile_phase('select') as record:
+            if self._is_byte_seekable():
+                rows, offset = self._select_rows_by_offset()
+                method = 'offset'
+            else:
+                rows, offset = self._select_rows_by_scan(reader)
+                method = 'scan'
+
+            y0 = min(self.conf['first_data_row'], len(rows))
+            self.selection_info.update({
+                'start': self.conf['start'],
+                'end': self.conf['end'],
+                'row_range': self.conf['row_range'],
+                'first_row': y0 + offset,
+                'nrows': len(rows) - y0,
+                'method': method
+            })
+            record['nrows'] = len(rows)
+            record['nbytes'] = self.selection_info['nbytes']
+
+        return rows, offset
+
+    def get_row_numbers(self, ys):
+        """
+        Get the row numbers in the input file, for the given stored row
+        indices (see get_row_number())
+
+        :param ys: The indices into self.rows
+        :type ys: np.ndarray
+        :returns: The row numbers in the input file
+        :rtype: np.ndarray
+        """
+
+        ys = np.asarray(ys, dtype=np.int64)
+
+        if self.row_numbers is not None:
+            return np.asarray(self.row_numbers, dtype=np.int64)[ys]
+        elif self.row_offset:
+            return np.where(ys < self.conf['first_data_row'], ys, ys + self.row_offset)
+
+        return ys
+
+    def get_row_number(self, y):
+        """
+        Get the row number in the input file, for the given stored row index
+
+        The two only differ when the stored rows are a selection, a sample
+        or a chunk of the input.  A sample's row numbers are held in
+        self.row_numbers, whereas the data rows of a selection or a chunk
+        are contiguous, so are offset by self.row_offset
+
+        :param y: The index into self.rows
+        :type y: int
+        :returns: The row number in the input file
+        :rtype: int
+        """
+
+        if self.row_numbers is not None:
+            return self.row_numbers[y]
+        elif y < self.conf['first_data_row']:
+            return y
+
+        return y + self.row_offset
+
+    def process_commented_header(self, fp=None):
+        """
+        Read and process any commented file header section from the input file
+
+        Any line beginning with the configured comment character is read and
+        processed.  Processing stops on the first non-commented line.  The
+        file is rewound and this processing is then used to set the following:
+
+        self.conf['header_row']        # First non-commented line
+        self.conf['first_data_row']    # Second non-commented line
+
+        :param fp: The file to process (default self.fp)
+        :type fp: file object
+        :returns: Flag indicating whether a commented header is present or not
+        :rtype: bool
+        """
+
+        fp = fp or self.fp
+        has_commented_header = False
+
+        for i, line in enumerate(fp):
+            # Here, we silently skip over any unnecessary BOM.  The presence
+            # of any unnecessary BOM will be highlighted in QC checks
+            if i == 0 and line.startswith(UTF_8_BOM):
+                line = line[len(UTF_8_BOM):]
+
+            if line.startswith(self.conf['comment']):
+                has_commented_header = True
+            else:
+                if has_commented_header:
+                    self.conf['header_row'] = i
+                    self.conf['first_data_row'] = i + 1
+
+                fp.seek(0, 0)
+                break
+
+        return has_commented_header
+
+    def store_header(self):
+        """
+        Store the header row, if one is present in the file
+
+        :returns: The parsed header row
+        :rtype: list
+        """
+
+        if self.conf['header_row'] is not None:
+            self.header_row = self.rows[self.conf['header_row']]
+
+        return self.header_row
+
+    def get_column_labels_from_header(self, cols):
+        """
+        Get the corresponding labels from the header row, for the given colums
+
+        :param cols: The column indices
+        :type cols: list
+        :returns: The column labels
+        :rtype: list
+        """
+
+        labels = []
+
+        if self.header_row:
+            labels = [self.header_row[col] for col in cols]
+
+        return labels
+
+    def get_missing_values(self):
+        """
+        Get the configured missing values as a list of strings
+
+        The missing_value config item can be a single value, or a list of
+        values
+
+        :returns: The missing values
+        :rtype: list
+        """
+
+        missing_value = self.conf['missing_value']
+
+        if missing_value is None:
+            missing_values = []
+        elif isinstance(missing_value, (list, tuple, set)):
+            missing_values = [str(value) for value in missing_value]
+        else:
+            missing_values = [str(missing_value)]
+
+        return missing_values
+
+    def get_missing_value_mask(self, values):
+        """
+        Get a mask of those values that match any of the missing values
+
+        The membership test is vectorised over all values at once
+
+        :param values: The column values (string representations)
+        :type values: np.ndarray
+        :returns: The mask
+        :rtype: np.ndarray
+        """
+
+        missing_values = self.get_missing_values()
+
+        if not missing_values:
+            return np.zeros(len(values), dtype=bool)
+
+        return np.isin(values, missing_values)
+
+    def to_float_with_missing_value(self, value, missing_value):
+        """
+        Convert the given value to a float, or to NaN if it matches
+        missing_value
+
+        :param value: The column value (string representation)
+        :type value: str
+        :param missing_value: The value, or list of values, to treat as a
+        missing value
+        :type missing_value: str or list
+        :returns: The value as a float or np.nan if it matches missing_value
+        :rtype: float or np.nan
+        """
+
+        if isinstance(missing_value, (list, tuple, set)):
+            is_missing = str(value) in [str(v) for v in missing_value]
+        else:
+            is_missing = str(value) == str(missing_value)
+
+        return np.nan if is_missing else float(value)
+
+    def get_column_data(self, col, *args, exc_value=np.nan, func=float, **kwargs):
+        """
+        Get the data for the given column, taking into account forgive mode
+
+        Provides data context and chaining for exceptions
+
+        :param col: The column index
+        :type col: int
+        :param args: Arbitrary arguments for the processing function
+        :type args: args
+        :param exc_value: The value to use in place of values that throw an
+        exception, when running in forgive mode
+        :type exc_value: any
+        :param func: The processing function to apply to each datum
+        :type func: Function
+        :param kwargs: Arbitrary keyword arguments for the processing function
+        :type kwargs: kwargs
+        :returns: The column data
+        :rtype: list
+        """
+
+        data = []
+        failures = []
+
+        with self.profile_phase('convert', detail=f'column {col}') as record:
+            for i, row in enumerate(self.rows[self.conf['first_data_row']:len(self.rows)], start=self.conf['first_data_row']):
+                try:
+                    data.append(func(row[col], *args, **kwargs))
+                except Exception as e:
+                    if self.conf['forgive']:
+                        data.append(exc_value)
+                        failures.append(i - self.conf['first_data_row'])
+                    else:
+                        raise type(e)(f'Failed to convert column {col} at row {self.get_row_number(i)} with {func.__name__}: {row}. Cause: {str(e)}') from e
+
+            record['nrows'] = len(data)
+
+        self.store_conversion_failures(col, failures)
+
+        return data
+
+    def store_conversion_failures(self, col, failures):
+        """
+        Store a summary of the cells that failed to convert in forgive mode
+
+        The summary for the column is stored in self.conversion_failures, and
+        holds the count of failures and the first MAX_FAILURE_ROWS row numbers
+
+        :param col: The column index
+        :type col: int
+        :param failures: The indices of the failed cells, relative to the
+        first data row
+        :type failures: list or np.ndarray
+        """
+
+        y0 = self.conf['first_data_row']
+        rows = [self.get_row_number(int(i) + y0) for i in failures[:MAX_FAILURE_ROWS]]
+        self.conversion_failures[col] = {'nfailures': len(failures), 'rows': rows}
+
+    def get_column_cells(self, col):
+        """
+        Get the cells of the given column for all data rows
+
+        Any rows that are too short to contain the column have None in place
+        of the cell
+
+        :param col: The column index
+        :type col: int
+        :returns: The cells
+        :rtype: list
+        """
+
+        rows = self.rows[self.conf['first_data_row']:len(self.rows)]
+
+        try:
+            cells = [row[col] for row in rows]
+        except IndexError:
+            cells = [row[col] if -len(row) <= col < len(row) else None for row in rows]
+
+        return cells
+
+    def get_unconvertible_mask(self, values, candidates, func, *args, **kwargs):
+        """
+        Get a mask of those values that can't be converted by the given function
+
+        Each distinct candidate value is converted once, so exceptions are
+        only raised once per distinct unconvertible value, rather than per
+        cell, and the mask is then computed in bulk
+
+        :param values: The values
+        :type values: np.ndarray
+        :param candidates: A mask of the values to consider
+        :type candidates: np.ndarray
+        :param func: The conversion function
+        :type func: Function
+        :param args: Arbitrary arguments for the conversion function
+        :type args: args
+        :param kwargs: Arbitrary keyword arguments for the conversion function
+        :type kwargs: kwargs
+        :returns: The mask
+        :rtype: np.ndarray
+        """
+
+        bad = set()
+
+        for value in set(values[candidates].tolist()):
+            try:
+                func(value, *args, **kwargs)
+            except Exception:
+                bad.add(value)
+
+        mask = np.fromiter(map(bad.__contains__, values.tolist()), dtype=bool, count=len(values))
+
+        return mask & candidates
+
+    def _convert_float_column(self, col, exc_value=np.nan, dtype=np.float64):
+        """
+        Convert the data for the given column in bulk, to an array of the
+        given dtype, with missing values NaN
+
+        See get_float_column_data().  If the bulk conversion fails, and not
+        in forgive mode, then None is returned, so that the caller can fall
+        back to converting the column cell by cell
+
+        :param col: The column index
+        :type col: int
+        :param exc_value: The value to use in place of values that throw an
+        exception, when running in forgive mode
+        :type exc_value: any
+        :param dtype: The dtype of the array
+        :type dtype: np.dtype
+        :returns: The array and the masks of missing and forgiven cells, or
+        None
+        :rtype: tuple
+        """
+
+        with self.profile_phase('convert', detail=f'column {col}') as record:
+            # The numeric engine has already converted the columns
+            if isinstance(self.rows, CassavaNumericRows):
+                column = self.rows.get_column(col, self.conf['first_data_row'], self.get_missing_values())
+
+                if column is not None:
+                    Y = column[0].astype(dtype)
+                    record['nrows'] = len(Y)
+                    record['nbytes'] = Y.nbytes
+                    self.store_conversion_failures(col, [])
+
+                    return Y, column[1], np.zeros(len(Y), dtype=bool)
+
+            cells = self.get_column_cells(col)
+            types = set(map(type, cells))
+
+            # Parsed rows only contain strings, but rows can be set
+            # directly, so ensure we compare string representations
+            if not types <= {str, type(None)}:
+                cells = [cell if cell is None else str(cell) for cell in cells]
+
+            values = np.array(cells, dtype=object)
+            mask = self.get_missing_value_mask(values)
+            bad = np.zeros(len(values), dtype=bool)
+            Y = np.full(len(values), np.nan, dtype=dtype)
+
+            try:
+                # A cast would silently convert the None of a short row to NaN
+                if type(None) in types:
+                    raise TypeError('Column is missing from some rows')
+
+                Y[~mask] = values[~mask].astype(dtype)
+            except (TypeError, ValueError):
+                if self.conf['forgive']:
+                    bad = self.get_unconvertible_mask(values, ~mask, float)
+                    Y[~mask & ~bad] = values[~mask & ~bad].astype(dtype)
+                else:
+                    record['detail'] = f'column {col} (bulk conversion failed)'
+                    return None
+
+            record['nrows'] = len(Y)
+            record['nbytes'] = Y.nbytes
+            self.store_conversion_failures(col, np.flatnonzero(bad))
+
+            if bad.any():
+                Y[bad] = exc_value
+
+        return Y, mask, bad
+
+    def get_float_column_data(self, col, exc_value=np.nan):
+        """
+        Get the data for the given column as floats, with missing values NaN
+
+        The column is masked for missing values and converted in bulk, rather
+        than cell by cell.  The result is the same as for get_column_data()
+        with to_float_with_missing_value().  If any cell can't be converted,
+        or the column is missing from any row, then in forgive mode, those
+        cells are detected in bulk (see get_unconvertible_mask()), replaced
+        with exc_value, and recorded in self.conversion_failures.  Otherwise
+        the column is converted cell by cell, to provide the exception data
+        context
+
+        :param col: The column index
+        :type col: int
+        :param exc_value: The value to use in place of values that throw an
+        exception, when running in forgive mode
+        :type exc_value: any
+        :returns: The column data
+        :rtype: list
+        """
+
+        result = self._convert_float_column(col, exc_value=np.nan)
+
+        if result is None:
+            return self.get_column_data(col, self.get_missing_values(), exc_value=exc_value, func=self.to_float_with_missing_value)
+
+        Y, mask, bad = result
+
+        # Missing values are np.nan itself, as in to_float_with_missing_value()
+        data = Y.tolist()
+
+        for i in np.flatnonzero(mask):
+            data[i] = np.nan
+
+        for i in np.flatnonzero(bad):
+            data[i] = exc_value
+
+        return data
+
+    def get_float_column_array(self, col, exc_value=np.nan, dtype=None):
+        """
+        Get the data for the given column as a NumPy array of floats, with
+        missing values NaN
+
+        The data are converted as by get_float_column_data(), but straight
+        into an array of the given dtype, without building a list of float
+        objects
+
+        :param col: The column index
+        :type col: int
+        :param exc_value: The value to use in place of values that throw an
+        exception, when running in forgive mode
+        :type exc_value: float
+        :param dtype: The dtype of the array (default the dtype config item)
+        :type dtype: np.dtype
+        :returns: The column data
+        :rtype: np.ndarray
+        """
+
+        dtype = np.dtype(dtype or self.conf['dtype'])
+        result = self._convert_float_column(col, exc_value=exc_value, dtype=dtype)
+
+        if result is None:
+            return np.array(self.get_float_column_data(col, exc_value=exc_value), dtype=dtype)
+
+        return result[0]
+
+    def get_datetime_column_data(self, col, exc_value=np.nan):
+        """
+        Get the data for the given column as datetimes
+
+        The result is the same as for get_column_data() with
+        datetime.datetime.strptime().  In forgive mode, each distinct value
+        is converted only once, so exceptions are only raised once per
+        distinct unconvertible value, and those cells are replaced with
+        exc_value and recorded in self.conversion_failures
+
+        :param col: The column index
+        :type col: int
+        :param exc_value: The value to use in place of values that throw an
+        exception, when running in forgive mode
+        :type exc_value: any
+        :returns: The column data
+        :rtype: list
+        """
+
+        if not self.conf['forgive']:
+            return self.get_column_data(col, self.conf['datetime_format'], func=datetime.datetime.strptime)
+
+        data, failures = self._convert_datetime_column(col, exc_value=exc_value)
+        self.store_conversion_failures(col, failures)
+
+        return data
+
+    def _convert_datetime_column(self, col, exc_value=np.nan, dtype=None):
+        """
+        Convert the data for the given column to datetimes, converting each
+        distinct value only once
+
+        See get_datetime_column_data().  When converting straight into an
+        array, the cells are converted in bulk (see convert_cells()), so
+        ISO 8601 datetimes in the default datetime_format are parsed by
+        NumPy, rather than by strptime()
+
+        :param col: The column index
+        :type col: int
+        :param exc_value: The value to use in place of values that throw an
+        exception
+        :type exc_value: any
+        :param dtype: If given, convert straight into an array of this
+        datetime64 dtype, rather than a list of datetimes
+        :type dtype: np.dtype
+        :returns: The column data and the indices of the failed cells
+        :rtype: tuple
+        """
+
+        with self.profile_phase('convert', detail=f'column {col}') as record:
+            cells = self.get_column_cells(col)
+
+            if dtype is None:
+                distinct = set(cells)
+                lookup = {}
+
+                for value in distinct:
+                    try:
+                        lookup[value] = datetime.datetime.strptime(value, self.conf['datetime_format'])
+                    except Exception:
+                        pass
+
+                data = [lookup.get(cell, exc_value) for cell in cells]
+                failures = [i for i, cell in enumerate(cells) if cell not in lookup] if len(lookup) < len(distinct) else []
+            else:
+                # Parsed rows only contain strings, but rows can be set
+                # directly, so ensure we convert string representations.
+                # The None of a short row always fails
+                values = np.array([cell if cell is None else str(cell) for cell in cells], dtype=object)
+                present = np.flatnonzero(~np.equal(values, None))
+                converted, bad = self.convert_cells(values[present], 'datetime')
+                data = np.full(len(values), exc_value, dtype=dtype)
+                data[present[~bad]] = converted[~bad]
+                ok = np.zeros(len(values), dtype=bool)
+                ok[present[~bad]] = True
+                failures = np.flatnonzero(~ok)
+                record['nbytes'] = data.nbytes
+
+            record['nrows'] = len(data)
+
+        return data, failures
+
+    def get_datetime_column_array(self, col, dtype='datetime64[us]'):
+        """
+        Get the data for the given column as a NumPy datetime64 array
+
+        The data are converted as by get_datetime_column_data(), but in bulk
+        and straight into an array of the given dtype (i.e. as integer time
+        codes), without building a list of datetime objects (see
+        _convert_datetime_column()).  In forgive mode, any forgiven values
+        are NaT.  Otherwise, the first cell that can't be converted raises
+        an exception, with its data context, as for get_column_data()
+
+        :param col: The column index
+        :type col: int
+        :param dtype: The datetime64 dtype of the array
+        :type dtype: np.dtype
+        :returns: The column data
+        :rtype: np.ndarray
+        """
+
+        data, failures = self._convert_datetime_column(col, exc_value=np.datetime64('NaT'), dtype=dtype)
+
+        if len(failures) and not self.conf['forgive']:
+            # Convert the first failed cell again, for its exception
+            y = int(failures[0]) + self.conf['first_data_row']
+            row = self.rows[y]
+
+            try:
+                datetime.datetime.strptime(row[col], self.conf['datetime_format'])
+            except Exception as e:
+                raise type(e)(f'Failed to convert column {col} at row {self.get_row_number(y)} with strptime: {row}. Cause: {str(e)}') from e
+
+        self.store_conversion_failures(col, failures)
+
+        return data
+
+    def get_x_axis_data(self, exc_value=np.nan):
+        """
+        Get the x-axis data from the rows, transforming as required
+
+        :param exc_value: The value to use in place of values that throw an
+        exception, when running in forgive mode
+        :type exc_value: any
+        :returns: The x-axis data
+        :rtype: list
+        """
+
+        # The x-column can be datetime, numeric, or default to list of indices
+        if self.conf['xcol'] is not None:
+            if self.conf['x_as_datetime']:
+                x = self.get_datetime_column_data(self.conf['xcol'], exc_value=exc_value)
+            else:
+                x = self.get_float_column_data(self.conf['xcol'], exc_value=exc_value)
+        else:
+            x = [self.get_row_number(n) - self.conf['first_data_row'] for n in range(self.conf['first_data_row'], len(self.rows))]
+
+        return x
+
+    def get_y_axis_data(self, col, exc_value=np.nan):
+        """
+        Get the y-axis data from the rows, transforming as required
+
+        :param col: The column index
+        :type col: int
+        :param exc_value: The value to use in place of values that throw an
+        exception, when running in forgive mode
+        :type exc_value: any
+        :returns: The y-axis data
+        :rtype: list
+        """
+
+        y = self.get_float_column_data(col, exc_value=exc_value)
+
+        return y
+
+    def _get_column_cache_key(self, col, kind):
+        """
+        Get the key for the given converted column in self.columns
+
+        The key includes the config items that affect the conversion, so
+        that changing the configuration doesn't return stale columns.  The
+        cached columns are discarded if self.rows has been replaced since
+        they were converted, even by rows of the same length
+
+        :param col: The column index
+        :type col: int
+        :param kind: The kind of conversion ('x' or 'y')
+        :type kind: str
+        :returns: The key
+        :rtype: tuple
+        """
+
+        if self._columns_rows is not self.rows:
+            self.columns = {}
+            self._columns_rows = self.rows
+
+        return (kind, col, self.conf['first_data_row'], len(self.rows), str(self.conf['missing_value']), self.conf['forgive'], str(self.conf['dtype']), self.conf['x_as_datetime'] if kind == 'x' else None, self.conf['datetime_format'] if kind == 'x' else None)
+
+    def get_x_axis_array(self):
+        """
+        Get the x-axis data as a NumPy array
+
+        The data are converted as by get_x_axis_data(), but straight into an
+        array.  Datetimes are held as datetime64[us] (see
+        get_datetime_column_array()), numeric data with the dtype config item
+        (see get_float_column_array()), and row indices as int64.  The array
+        is cached in self.columns, so subsequent calls return the same array
+        without converting the data again
+
+        :returns: The x-axis data
+        :rtype: np.ndarray
+        """
+
+        key = self._get_column_cache_key(self.conf['xcol'], 'x')
+
+        if key not in self.columns:
+            if self.conf['xcol'] is not None and self.conf['x_as_datetime']:
+                X = self.get_datetime_column_array(self.conf['xcol'])
+            elif self.conf['xcol'] is not None:
+                X = self.get_float_column_array(self.conf['xcol'])
+            else:
+                X = np.array(self.get_x_axis_data(), dtype=np.int64)
+
+            self.columns[key] = X
+
+        return self.columns[key]
+
+    def get_y_axis_array(self, col):
+        """
+        Get the y-axis data for the given column as a NumPy array
+
+        The data are converted as by get_y_axis_data(), but straight into an
+        array with the dtype config item (see get_float_column_array()).  The
+        array is cached in self.columns, so subsequent calls return the same
+        array without converting the data again
+
+        :param col: The column index
+        :type col: int
+        :returns: The y-axis data
+        :rtype: np.ndarray
+        """
+
+        key = self._get_column_cache_key(col, 'y')
+
+        if key not in self.columns:
+            self.columns[key] = self.get_float_column_array(col)
+
+        return self.columns[key]
+
+    def get_resample_width(self):
+        """
+        Get the width of the buckets given by the resample config item
+
+        For a datetime x-axis, the resample config item is a duration such
+        as 10s, 1min, 1h or 1d (the units are ms, s, min, h, d and w), and
+        otherwise it's a number, in the units of the x-axis values (or rows,
+        if there's no x-axis column)
+
+        :returns: The bucket width
+        :rtype: np.timedelta64 or float
+        """
+
+        freq = str(self.conf['resample']).strip()
+
+        if self.conf['xcol'] is not None and self.conf['x_as_datetime']:
+            m = re.fullmatch(r'(\d*)\s*(ms|s|min|h|d|w)', freq)
+
+            if not m:
+                raise ValueError(f"Invalid resample duration: {freq}. Specify a number and one of the units {', '.join(RESAMPLE_UNITS)}, e.g. 1min")
+
+            n = int(m.group(1) or 1)
+            width = np.timedelta64(n, RESAMPLE_UNITS[m.group(2)]).astype('timedelta64[us]')
+        else:
+            n = width = float(freq)
+
+        if n <= 0:
+            raise ValueError(f'The resample width must be positive: {freq}')
+
+        return width
+
+    def _get_resample_buckets(self):
+        """
+        Get the buckets of the data rows, given by the resample config item
+
+        The x-axis values are divided into buckets of equal width, aligned
+        to multiples of the width (e.g. 1d buckets start at midnight).  The
+        bucket index of each data row is computed at once as an array, and
+        the data rows are then sorted into their buckets, so that each
+        aggregate is a single reduction over the sorted values.  The buckets
+        are cached in self.columns
+
+        :returns: The start of each bucket (x), the number of data rows in
+        each (size), the first data row in each, or in the next non-empty
+        bucket for an empty one (first), the data rows with an x-axis value
+        in bucket order (order), their bucket indices (bucket), and the start
+        of each non-empty bucket in that order (starts, for
+        np.ufunc.reduceat())
+        :rtype: dict
+        """
+
+        key = self._get_column_cache_key(self.conf['xcol'], 'x') + ('resample', str(self.conf['resample']))
+
+        if key not in self.columns:
+            with self.profile_phase('resample', detail='buckets', nrows=len(self.rows)):
+                width = self.get_resample_width()
+                X = self.get_x_axis_array()
+
+                if np.issubdtype(X.dtype, np.datetime64):
+                    valid = ~np.isnat(X)
+                    t = X.astype('datetime64[us]').astype(np.int64)
+                    w = width.astype(np.int64)
+                else:
+                    valid = ~np.isnan(X) if np.issubdtype(X.dtype, np.floating) else np.ones(len(X), dtype=bool)
+                    t = X.astype(np.float64)
+                    w = width
+
+                indices = np.flatnonzero(valid)
+
+                if len(indices):
+                    origin = np.floor(t[indices].min() / w) * w
+                    b = np.floor((t[indices] - origin) / w).astype(np.int64)
+                    nbuckets = int(b.max()) + 1
+                else:
+                    origin, b, nbuckets = 0, np.zeros(0, dtype=np.int64), 0
+
+                # The rows are usually already in bucket order
+                if np.any(b[1:] < b[:-1]):
+                    order = np.argsort(b, kind='stable')
+                    indices, b = indices[order], b[order]
+
+                starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]]) if len(b) else np.zeros(0, dtype=np.int64)
+                first = np.full(nbuckets, -1, dtype=np.int64)
+                first[b[starts]] = indices[starts]
+
+                # An empty bucket takes the first row of the next bucket
+                following = np.where(first >= 0, np.arange(nbuckets), nbuckets - 1)
+                first = first[np.minimum.accumulate(following[::-1])[::-1]]
+                x = origin + np.arange(nbuckets) * w
+
+                if np.issubdtype(X.dtype, np.datetime64):
+                    x = x.astype(np.int64).astype('datetime64[us]')
+
+                self.columns[key] = {'x': x, 'size': np.bincount(b, minlength=nbuckets), 'first': first, 'bucket': b, 'order': indices, 'starts': starts}
+
+        return self.columns[key]
+
+    def resample(self, col, aggregate=None):
+        """
+        Aggregate the data for the given column in the buckets given by the
+        resample config item (see _get_resample_buckets())
+
+        The aggregates are the mean, min, max and count of the values that
+        aren't missing, and the fraction of missing values (nan_fraction).
+        Empty buckets have a NaN aggregate, except a count of 0.  They're
+        computed as vectorised reductions over the bucket indices
+        (np.bincount() and np.ufunc.reduceat()), so the time taken after
+        the data are converted depends on the number of buckets
+
+        :param col: The column index
+        :type col: int
+        :param aggregate: The aggregate (default the aggregate config item)
+        :type aggregate: str
+        :returns: The aggregate of each bucket
+        :rtype: np.ndarray
+        """
+
+        aggregate = aggregate or self.conf['aggregate']
+
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unsupported aggregate: {aggregate}. Specify one of {', '.join(AGGREGATES)}")
+
+        key = self._get_column_cache_key(col, 'y') + ('resample', str(self.conf['resample']), aggregate)
+
+        if key not in self.columns:
+            buckets = self._get_resample_buckets()
+
+            with self.profile_phase('resample', detail=f'column {col} {aggregate}', nrows=len(buckets['order'])):
+                Y = self.get_y_axis_array(col)[buckets['order']].astype(np.float64)
+                b, n = buckets['bucket'], len(buckets['x'])
+                present = ~np.isnan(Y)
+                count = np.bincount(b[present], minlength=n)
+
+                if aggregate == 'mean':
+                    total = np.bincount(b[present], weights=Y[present], minlength=n)
+                    A = np.divide(total, count, out=np.full(n, np.nan), where=count > 0)
+                elif aggregate in ['min', 'max']:
+                    A = np.full(n, np.nan)
+
+                    if len(b):
+                        reduce = np.fmin if aggregate == 'min' else np.fmax
+                        A[b[buckets['starts']]] = reduce.reduceat(Y, buckets['starts'])
+                elif aggregate == 'count':
+                    A = count.astype(np.float64)
+                else:
+                    size = buckets['size']
+                    A = np.divide(size - count, size, out=np.full(n, np.nan), where=size > 0)
+
+            self.columns[key] = A
+
+        return self.columns[key]
+
+    def get_resampled_x_axis_array(self):
+        """
+        Get the x-axis data, resampled if the resample config item is set
+
+        :returns: The start of each bucket, or the x-axis data (see
+        get_x_axis_array())
+        :rtype: np.ndarray
+        """
+
+        if self.conf['resample'] is None:
+            return self.get_x_axis_array()
+
+        return self._get_resample_buckets()['x']
+
+    def get_resampled_y_axis_array(self, col):
+        """
+        Get the y-axis data for the given column, resampled with the
+        aggregate config item if the resample config item is set
+
+        :param col: The column index
+        :type col: int
+        :returns: The aggregate of each bucket (see resample()), or the y-axis
+        data (see get_y_axis_array())
+        :rtype: np.ndarray
+        """
+
+        if self.conf['resample'] is None:
+            return self.get_y_axis_array(col)
+
+        return self.resample(col)
+
+    def get_resampled_rows(self):
+        """
+        Get the data row index of each value of the (resampled) y-axis data
+
+        :returns: The first data row of each bucket (see
+        _get_resample_buckets()), or each data row index
+        :rtype: np.ndarray
+        """
+
+        if self.conf['resample'] is None:
+            return np.arange(max(0, len(self.rows) - self.conf['first_data_row']))
+
+        return self._get_resample_buckets()['first']
+
+    def get_field_names(self, cols):
+        """
+        Get unique field names for the given columns, derived from the header
+
+        Columns without a (unique) header label are named colN, where N is
+        the column index
+
+        :param cols: The column indices
+        :type cols: list
+        :returns: The field names
+        :rtype: list
+        """
+
+        labels = self.get_column_labels_from_header(cols) if self.header_row else []
+        names = []
+
+        for i, col in enumerate(cols):
+            name = labels[i].strip() if i < len(labels) else ''
+
+            if not name or name in names:
+                name = f'col{col}'
+
+            names.append(name)
+
+        return names
+
+    def get_column_arrays(self, cols=None):
+        """
+        Get the x-axis and the given y-axis columns as NumPy arrays
+
+        The arrays are those cached in self.columns, so they are handed out
+        without copying.  If an xcol is configured, it is the first item.
+        Otherwise, the row indices are included, named index
+
+        :param cols: The y-axis column indices (default the ycol config item)
+        :type cols: list
+        :returns: The arrays, keyed by field name
+        :rtype: dict
+        """
+
+        cols = self.conf['ycol'] if cols is None else cols
+        arrays = {}
+
+        if self.conf['xcol'] is not None:
+            names = self.get_field_names([self.conf['xcol']] + list(cols))
+        else:
+            names = ['index'] + self.get_field_names(list(cols))
+
+        arrays[names[0]] = self.get_x_axis_array()
+
+        for name, col in zip(names[1:], cols):
+            arrays[name] = self.get_y_axis_array(col)
+
+        return arrays
+
+    def to_numpy(self, cols=None):
+        """
+        Get the x-axis and the given y-axis columns as a NumPy structured array
+
+        The field names are derived from the header (see get_field_names()).
+        Note that a structured array interleaves the fields of each row, so
+        unlike get_column_arrays(), the converted columns are copied into it
+
+        :param cols: The y-axis column indices (default the ycol config item)
+        :type cols: list
+        :returns: The structured array
+        :rtype: np.ndarray
+        """
+
+        arrays = self.get_column_arrays(cols)
+        dtype = np.dtype([(name, array.dtype) for name, array in arrays.items()])
+        nrows = len(next(iter(arrays.values())))
+        data = np.empty(nrows, dtype=dtype)
+
+        for name, array in arrays.items():
+            data[name] = array
+
+        return data
+
+    def to_arrow(self, cols=None):
+        """
+        Get the x-axis and the given y-axis columns as a pyarrow Table
+
+        The table's columns wrap the converted column buffers in self.columns
+        without copying.  Missing and forgiven values are NaN (or NaT), as
+        for get_x_axis_data() and get_y_axis_data(), rather than nulls.
+        This requires the optional pyarrow package
+
+        :param cols: The y-axis column indices (default the ycol config item)
+        :type cols: list
+        :returns: The table
+        :rtype: pyarrow.Table
+        """
+
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError('Exporting to Arrow requires the pyarrow package to be installed') from e
+
+        arrays = self.get_column_arrays(cols)
+
+        return pa.table({name: pa.array(array) for name, array in arrays.items()})
+
+    def export_csv(self, path, k=1.5, flags=False, nrows=CHUNK_NROWS):
+        """
+        Write a cleaned copy of the input file to the given path
+
+        In the configured columns (see get_stats_columns()), cells that
+        match a missing value, and in forgive mode, cells that can't be
+        converted to floats, are written as empty cells.  Outliers, beyond
+        the Tukey fences of their column (see compute_column_fences()), are
+        written unchanged.  If flags is set, a flag column is appended to
+        each row for each configured column, holding one of EXPORT_FLAGS, or
+        empty, and the header row gains their labels, the column's label
+        suffixed with _flag.  The other columns, and the rows before the
+        first data row, are written unchanged
+
+        The input file is read twice in chunks (see iter_chunks()), first to
+        compute the fences, then to write the chunks through a buffered
+        writer.  So only the converted columns are held while computing the
+        fences, and a chunk while writing.  The selection, sampling and
+        resample config items don't apply.  A summary of the export is held
+        in self.export_info, including the number of values of each column,
+        of which the fences are estimated if there are more than
+        QUANTILE_NSAMPLE
+
+        :param path: The output file path, or - for stdout
+        :type path: str
+        :param k: The factor to multiply the IQR by
+        :type k: float
+        :param flags: Whether to append flag columns
+        :type flags: bool
+        :param nrows: The maximum number of data rows in each chunk
+        :type nrows: int
+        :returns: The number of cells of each configured column with each
+        flag
+        :rtype: list
+        """
+
+        with self.profile_phase('export_fences'):
+            fences = self.compute_column_fences(k=k, nrows=nrows)
+
+        cols = list(fences)
+        counts = {col: dict.fromkeys(EXPORT_FLAGS, 0) for col in cols}
+        nvalues = dict.fromkeys(cols, 0)
+        y0 = self.conf['first_data_row']
+        data_nrows = 0
+
+        for fp in self.fps:
+            fp.seek(0, 0)
+
+        out = sys.stdout if path == '-' else open(path, 'w', encoding=self.encoding, newline='', buffering=EXPORT_BUFFER_SIZE)
+
+        try:
+            writer = csv.writer(out, delimiter=self.conf['delimiter'], lineterminator='\n')
+            ncols = None
+
+            for rows in self.iter_chunks(nrows):
+                with self.profile_phase('export', nrows=len(rows) - y0):
+                    if ncols is None:
+                        self._write_export_head(writer, rows[:y0], cols, flags)
+                        ncols = len(self.header_row) if self.header_row else max([len(row) for row in rows[y0:]], default=0)
+
+                    # The rows of a chunk are parsed afresh, so can be changed
+                    chunk = [list(row) for row in rows[y0:]] if isinstance(rows, CassavaNumericRows) else rows[y0:]
+                    chunk_flags = []
+
+                    for col in cols:
+                        result = self._convert_float_column(col, dtype=np.dtype(self.conf['dtype']))
+
+                        if result is None:
+                            # Not in forgive mode, so this raises the
+                            # conversion error, with its data context
+                            Y = np.array(self.get_float_column_data(col), dtype=self.conf['dtype'])
+                            result = Y, np.isnan(Y), np.zeros(len(Y), dtype=bool)
+
+                        Y, missing, bad = result
+                        low, high = fences[col]
+                        column_flags = np.full(len(Y), '', dtype=object)
+                        column_flags[(Y < low) | (Y > high)] = 'outlier'
+                        column_flags[bad] = 'invalid'
+                        column_flags[missing] = 'missing'
+
+                        for y in np.flatnonzero(missing | bad):
+                            if col < len(chunk[y]):
+                                chunk[y][col] = ''
+
+                        for flag in EXPORT_FLAGS:
+                            counts[col][flag] += int(np.count_nonzero(column_flags == flag))
+
+                        nvalues[col] += int(np.count_nonzero(~np.isnan(Y)))
+
+                        chunk_flags.append(column_flags.tolist())
+
+                    if flags:
+                        for row, row_flags in zip(chunk, zip(*chunk_flags)):
+                            # Short rows are padded, so the flags line up
+                            if len(row) < ncols:
+                                row.extend([''] * (ncols - len(row)))
+
+                            row.extend(row_flags)
+
+                    writer.writerows(chunk)
+                    data_nrows += len(chunk)
+
+            # Without any data rows, there are no chunks, but the rows before
+            # the first data row (held in self.rows) are still written
+            if ncols is None:
+                if (self.conf['header_row'] or 0) < len(self.rows):
+                    self.store_header()
+
+                self._write_export_head(writer, self.rows[:y0], cols, flags)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        self.export_info = {'path': path, 'nrows': data_nrows, 'k': k, 'fences': fences, 'nvalues': nvalues}
+
+        return [{'x': col, 'y': None, 'data': counts[col], 'status': CassavaStatus.warn if counts[col]['invalid'] else CassavaStatus.ok} for col in cols]
+
+    def _write_export_head(self, writer, head, cols, flags):
+        """
+        Write the given rows before the first data row, as export_csv()
+
+        :param writer: The CSV writer
+        :type writer: csv.writer
+        :param head: The rows before the first data row
+        :type head: list
+        :param cols: The configured columns
+        :type cols: list
+        :param flags: Whether to append the labels of the flag columns to
+        the header row
+        :type flags: bool
+        """
+
+        head = [list(row) for row in head]
+        header_row = self.conf['header_row']
+
+        if flags and header_row is not None and header_row < len(head):
+            head[header_row].extend([f'{label}_flag' for label in self.get_field_names(cols)])
+
+        writer.writerows(head)
+
+    def compute_stats(self, data):
+        """
+        Compute statistics for the given data
+
+        The stats of empty data (e.g. when no rows are selected) are NaN
+
+        :returns: A stats dict
+        :rtype: dict
+        """
+
+        if len(data) == 0:
+            return dict.fromkeys(['min', 'mean', 'max', 'q1', 'median', 'q3', 'std'], np.nan)
+
+        with self.profile_phase('stats', nrows=len(data)):
+            q = np.nanquantile(data, [0.25, 0.5, 0.75])
+            stats = {'min': np.nanmin(data), 'mean': np.nanmean(data), 'max': np.nanmax(data), 'q1': q[0], 'median': q[1], 'q3': q[2], 'std': np.nanstd(data)}
+
+        return stats
 
     def print_status(self, text, status, indent=0, end='\n'):
         """
-        Print the given text, colour-coded according to the given status
+        Print the given text, colour-coded according to the given status
+
+        :param text: The text to print
+        :type text: str
+        :param status: The status of the message for colour-coding
+        :type status: CassavaStatus
+        :param indent: Number of blank spaces to indent the text by
+        :type indent: int
+        :param end: An arbitrary end to append to the text (as with print())
+        :type end: str
+        """
+
+        prefix = ' ' * indent
+
+        if status is CassavaStatus.ok:
+            print(prefix + _term.green(text), end=end)
+        elif status is CassavaStatus.warn:
+            print(prefix + _term.yellow(text), end=end)
+        elif status is CassavaStatus.error:
+            print(prefix + _term.red(text), end=end)
+        elif status is CassavaStatus.neutral:
+            print(prefix + _term.blue(text), end=end)
+        else:
+            print(prefix + text, end=end)
+
+    def print_msg_table(self, table, indent=0, fmt='.2g'):
+        """
+        Print the given list of message dicts as a table
+
+        :param table: The list of message dicts to be tabulated
+        :type table: list
+        :param indent: An indent to prepend to each row of the table
+        :type indent: int
+        :param fmt: A format specifier to apply to each data value
+        :type fmt: str
+        """
+
+        # Dynamically calculate column lengths and data coords label lengths
+        if len(table) > 0:
+            coords = []
+            if table[0]['x'] is not None:
+                coords.append('column')
+            if table[0]['y'] is not None:
+                coords.append('row')
+            label_header = ','.join(coords)
+
+            col_lens = [0] * len(table[0]['data'])
+            label_len = len(label_header) + 1
+            labels = []
+
+        for row in table:
+            for x, (k, v) in enumerate(row['data'].items()):
+                col_lens[x] = np.max([col_lens[x], len(str(k)) + 1, len(f'{v:{fmt}}') + 1])
+
+            coords = []
+            if row['x'] is not None:
+                coords.append(str(row['x']))
+            if row['y'] is not None:
+                coords.append(str(row['y']))
+            label = ','.join(coords)
+            labels.append(label)
+            label_len = np.max([label_len, len(label) + 1])
+
+        for i, row in enumerate(table):
+            if i == 0:
+                text = ''.join([f'{k}'.ljust(col_lens[x]) for x,k in enumerate(row['data'])])
+                self.print_status(label_header.ljust(label_len) + text, row['status'], indent=indent)
+
+            text = ''.join([f'{v:{fmt}}'.ljust(col_lens[x]) for x,v in enumerate(row['data'].values())])
+            self.print_status(labels[i].ljust(label_len) + text, row['status'], indent=indent)
+
+    def compute_multi_plot_layout(self, ncols=2):
+        """
+        Compute an optimal rows and columns layout for multiple plots
+
+        :param ncols: The suggested number of columns in the layout
+        :type ncols: int
+        :returns: The plot layout of rows and columns
+        :rtype: tuple
+        """
+
+        N = len(self.conf['ycol'])
+
+        if N < ncols:
+            ncols = N
+
+        if N % ncols == 0:
+            layout = (N // ncols, ncols)
+        else:
+            layout = (N // ncols + 1, ncols)
+
+        return layout
+
+    def decimate(self, x, y, lo=None, hi=None, max_points=MAX_PLOT_POINTS):
+        """
+        Decimate the given data in the given x-axis range, for plotting
+
+        The x-axis data must be sorted, so that the data rows in the range
+        are found by binary search, and only those are extracted.  If there
+        are more than max_points of them, they're divided into max_points / 2
+        bins of consecutive rows, and each bin is drawn as its minimum and
+        maximum at the x-axis value of its first row, so that no peaks are
+        lost.  Otherwise, every data row in the range is returned, with one
+        either side, so that the curve runs to the edges of the plot
+
+        :param x: The sorted x-axis data
+        :type x: np.ndarray
+        :param y: The y-axis data
+        :type y: np.ndarray
+        :param lo: The start of the range (default the start of the data)
+        :type lo: any type comparable with x
+        :param hi: The end of the range (default the end of the data)
+        :type hi: any type comparable with x
+        :param max_points: The maximum number of points to return
+        :type max_points: int
+        :returns: The decimated x-axis and y-axis data
+        :rtype: tuple
+        """
+
+        i0 = 0 if lo is None else max(0, int(np.searchsorted(x, lo, side='left')) - 1)
+        i1 = len(x) if hi is None else min(len(x), int(np.searchsorted(x, hi, side='right')) + 1)
+        xs, ys = x[i0:i1], y[i0:i1]
+
+        if len(xs) <= max_points:
+            return xs, ys
+
+        size = -(-len(xs) // max(1, max_points // 2))
+        n = len(xs) // size * size
+        starts = xs[0:n:size]
+        mins = np.fmin.reduce(ys[:n].reshape(-1, size), axis=1)
+        maxs = np.fmax.reduce(ys[:n].reshape(-1, size), axis=1)
+
+        if n < len(xs):
+            starts = np.append(starts, xs[n])
+            mins = np.append(mins, np.fmin.reduce(ys[n:]))
+            maxs = np.append(maxs, np.fmax.reduce(ys[n:]))
+
+        xd = np.append(np.repeat(starts, 2), xs[-1])
+        yd = np.append(np.column_stack([mins, maxs]).ravel(), ys[-1])
+
+        return xd, yd
+
+    def _get_x_axis_limit_value(self, x, value):
+        """
+        Get the given x-axis limit of a plot as a value comparable with the
+        given x-axis data
+
+        :param x: The x-axis data
+        :type x: np.ndarray
+        :param value: The axis limit, in matplotlib's units
+        :type value: float
+        :returns: The value, or None if it's out of range
+        :rtype: np.datetime64 or float
+        """
+
+        if np.issubdtype(x.dtype, np.datetime64):
+            try:
+                value = np.datetime64(mdates.num2date(value).replace(tzinfo=None), 'us')
+            except (ValueError, OverflowError):
+                value = None
+
+        return value
+
+    def _plot_line(self, ax, x, y, max_points=None, **opts):
+        """
+        Plot a curve of the given data on the given axes
+
+        If max_points is given, the data are decimated (see decimate()), and
+        are decimated again for the visible x-axis range whenever the plot is
+        zoomed or panned, so that every data row is drawn once the range
+        contains no more than max_points rows
+
+        :param ax: The axes
+        :type ax: matplotlib.axes.Axes
+        :param x: The x-axis data, which must be sorted if max_points is given
+        :type x: np.ndarray
+        :param y: The y-axis data
+        :type y: np.ndarray
+        :param max_points: The maximum number of points to draw
+        :type max_points: int
+        :param opts: Option kwargs for the plot
+        :type opts: kwargs
+        :returns: The line
+        :rtype: matplotlib.lines.Line2D
+        """
+
+        if not max_points:
+            return ax.plot(x, y, **opts)[0]
+
+        line = ax.plot(*self.decimate(x, y, max_points=max_points), **opts)[0]
+
+        def on_xlim_changed(ax):
+            lo, hi = [self._get_x_axis_limit_value(x, value) for value in ax.get_xlim()]
+            line.set_data(*self.decimate(x, y, lo, hi, max_points=max_points))
+            ax.figure.canvas.draw_idle()
+
+        ax.callbacks.connect('xlim_changed', on_xlim_changed)
+
+        return line
+
+    def _plot_multi(self, fig, axs, x, labels, layout, opts={}, max_points=None, order=None):
+        """
+        Plot the data.  Configured columns are each plotted on their own plot
+
+        :param fig: The figure object
+        :type fig: matplotlib.figure.Figure
+        :param axs: The axes array
+        :type axs: matplotlib.axes.Axes
+        :param x: The x-axis data
+        :type x: np.ndarray
+        :param labels: The column header labels
+        :type labels: list
+        :param layout: The dimensions of the plot grid
+        :type layout: tuple
+        :param opts: Option kwargs to apply to all plots
+        :type opts: dict
+        :param max_points: The maximum number of points to draw for each
+        curve (see _plot_line())
+        :type max_points: int
+        :param order: The order that sorts the x-axis data, if it's not sorted
+        :type order: np.ndarray
+        """
+
+        for i in range(layout[0]):
+            for j in range(layout[1]):
+                k = i * layout[1] + j
+
+                # The last grid row may have empty plots so remove them
+                try:
+                    ycol = self.conf['ycol'][k]
+                except IndexError:
+                    fig.delaxes(axs[i,j])
+                    continue
+
+                y = self.get_resampled_y_axis_array(ycol)
+                y = y if order is None else y[order]
+
+                if len(labels) > k and labels[k]:
+                    opts['label'] = labels[k]
+
+                self._plot_line(axs[i,j], x, y, max_points=max_points, **opts)
+                axs[i,j].legend()
+
+    def _plot_single(self, fig, axs, x, labels, opts={}, max_points=None, order=None):
+        """
+        Plot the data.  Configured columns are all plotted on a single plot
+
+        :param fig: The figure object
+        :type fig: matplotlib.figure.Figure
+        :param axs: The axes array
+        :type axs: matplotlib.axes.Axes
+        :param x: The x-axis data
+        :type x: np.ndarray
+        :param labels: The column header labels
+        :type labels: list
+        :param opts: Option kwargs to apply to all plots
+        :type opts: dict
+        :param max_points: The maximum number of points to draw for each
+        curve (see _plot_line())
+        :type max_points: int
+        :param order: The order that sorts the x-axis data, if it's not sorted
+        :type order: np.ndarray
+        """
+
+        for i, ycol in enumerate(self.conf['ycol']):
+            y = self.get_resampled_y_axis_array(ycol)
+            y = y if order is None else y[order]
+
+            if len(labels) > i and labels[i]:
+                opts['label'] = labels[i]
+
+            self._plot_line(axs[0,0], x, y, max_points=max_points, **opts)
+
+        axs[0,0].legend()
+
+    def plot(self, show=True, layout=(1,1), opts={}, max_points=None):
+        """
+        Plot the data
+
+        * If the product of layout > 1, then configured columns are each
+          plotted on their own plot
+        * Otherwise configured columns are all plotted on a single plot
+
+        If max_points is given, the plot is interactive: at most about
+        max_points points are drawn for each curve, and the visible x-axis
+        range is decimated again whenever the plot is zoomed or panned (see
+        _plot_line()), down to every data row
+
+        :param show: Show the plot
+        :type show: bool
+        :param layout: The rows and columns for the subplots() call
+        :type layout: tuple
+        :param opts: Option kwargs to apply to all plots
+        :type opts: dict
+        :param max_points: The maximum number of points to draw for each
+        curve
+        :type max_points: int
+        :returns: The figure and axes objects
+        :rtype: tuple
+        """
+
+        # Determine if we've been asked to plot a multi-plot grid
+        multi = layout[0] * layout[1] > 1
+
+        with self.profile_phase('plot', nrows=len(self.rows)):
+            fig, axs = plt.subplots(*layout, squeeze=False)
+            x = self.get_resampled_x_axis_array()
+            labels = self.get_column_labels_from_header(self.conf['ycol'])
+            order = None
+
+            # Decimating the visible range needs a sorted x-axis
+            if max_points and not np.all(x[1:] >= x[:-1]):
+                order = np.argsort(x, kind='stable')
+                x = x[order]
+
+            if multi:
+                self._plot_multi(fig, axs, x, labels, layout, opts, max_points=max_points, order=order)
+            else:
+                self._plot_single(fig, axs, x, labels, opts, max_points=max_points, order=order)
+
+            titles = [text for text in [self.get_sampling_text(), self.get_resampling_text()] if text]
+
+            if titles:
+                fig.suptitle('\n'.join(titles))
+
+        if show:
+            plt.show()
+
+        return fig, axs
+
+    def plot_stats(self, show=True, bins='auto', k=1.5, showfliers=True):
+        """
+        Plot stats of the data
+
+        :param show: Show the plot
+        :type show: bool
+        :param bins: The bins for the density plot
+        :type bins: The types supported by matplotlib.pyplot.hist
+        :param k: The factor to multiply the IQR by
+        :type k: float
+        :param showfliers: Show outliers in the plots
+        :type showfliers: bool
+        :returns: The figure and axes objects
+        :rtype: tuple
+        """
 
-        :param text: The text to print
-        :type text: str
-        :param status: The status of the message for colour-coding
-        :type status: CassavaStatus
-        :param indent: Number of blank spaces to indent the text by
-        :type indent: int
-        :param end: An arbitrary end to append to the text (as with print())
-        :type end: str
+        with self.profile_phase('plot_stats', nrows=len(self.rows)):
+            fig, axs = plt.subplots(len(self.conf['ycol']), 3, squeeze=False)
+            x = self.get_resampled_x_axis_array()
+            labels = self.get_column_labels_from_header(self.conf['ycol'])
+
+            for i, ycol in enumerate(self.conf['ycol']):
+                y = self.get_resampled_y_axis_array(ycol)
+
+                # Remove any NaNs, as boxplot() balks on them
+                Y = y[~np.isnan(y)]
+
+                label = ''
+
+                if len(labels) > i and labels[i]:
+                    label = labels[i]
+
+                # Compute the range of the data
+                stats = self.compute_stats(y)
+                r = (stats['min'], stats['max'])
+                iqr = stats['q3'] - stats['q1']
+
+                # Compute the IQR-filtered range of the data
+                if not showfliers:
+                    r = (stats['q1'] - k * iqr, stats['q3'] + k * iqr)
+
+                # Density plot.  There's no range without any data
+                finite = bool(np.all(np.isfinite(r)))
+                axs[i,0].hist(y, bins=bins, range=r if finite else None, density=True, label=label)
+                axs[i,0].legend()
+
+                if i == 0:
+                    axs[i,0].set_title('Density')
+
+                # Line plot and k * IQR interval to show outliers
+                axs[i,1].plot(x, y, label=label)
+                axs[i,1].axhline(y=stats['q3'] + k * iqr, c='red', ls='--', lw=0.5)
+                axs[i,1].axhline(y=stats['q1'] - k * iqr, c='red', ls='--', lw=0.5)
+                axs[i,1].legend()
+
+                # Optionally chop-off outliers
+                if not showfliers and finite:
+                    axs[i,1].set_ylim(*r)
+
+                if i == 0:
+                    axs[i,1].set_title(f'{k} * IQR')
+
+                # Box plot
+                axs[i,2].boxplot(Y, whis=k, showfliers=showfliers, **{BOXPLOT_LABELS_KWARG: [label]})
+
+                if i == 0:
+                    axs[i,2].set_title('Boxplot')
+
+            titles = [text for text in [self.get_sampling_text(), self.get_resampling_text()] if text]
+
+            if titles:
+                fig.suptitle('\n'.join(titles))
+
+        if show:
+            plt.show()
+
+        return fig, axs
+
+    def compute_overview(self, nbins=500):
+        """
+        Compute an overview of the configured columns, aggregated in bins of
+        consecutive rows
+
+        The rows are divided into at most nbins bins, and for each column and
+        bin, the minimum, maximum and fraction of missing values are
+        computed.  The minima and maxima are normalised to the range of each
+        column, so that columns of different scales can be compared
+
+        :param nbins: The (maximum) number of bins
+        :type nbins: int
+        :returns: The bin start rows (data row indices) and the normalised
+        min, max, and missing fraction (ncolumns x nbins arrays).  There are
+        no bins if there are no data rows
+        :rtype: dict
         """
 
-        prefix = ' ' * indent
+        with self.profile_phase('overview', nrows=len(self.rows)) as record:
+            columns = [self.get_y_axis_array(ycol) for ycol in self.conf['ycol']]
+            nrows = len(columns[0]) if columns else 0
 
-        if status is CassavaStatus.ok:
-            print(prefix + _term.green(text), end=end)
-        elif status is CassavaStatus.warn:
-            print(prefix + _term.yellow(text), end=end)
-        elif status is CassavaStatus.error:
-            print(prefix + _term.red(text), end=end)
-        elif status is CassavaStatus.neutral:
-            print(prefix + _term.blue(text), end=end)
+            # There are no bins without any data rows
+            if nrows == 0:
+                empty = np.empty((len(columns), 0))
+                return {'starts': np.empty(0, dtype=np.int64), 'min': empty, 'max': empty.copy(), 'nan_fraction': empty.copy()}
+
+            nbins = max(1, min(nbins, nrows))
+            starts = np.unique(np.linspace(0, nrows, nbins, endpoint=False).astype(np.int64))
+            counts = np.diff(np.append(starts, nrows))
+
+            # Aggregate each column into the bins, ignoring NaNs
+            bmin = np.array([np.fmin.reduceat(Y, starts) for Y in columns])
+            bmax = np.array([np.fmax.reduceat(Y, starts) for Y in columns])
+            bnan = np.array([np.add.reduceat(np.isnan(Y), starts) for Y in columns]) / counts
+
+            # Normalise all columns in a single pass over the binned data
+            lo = np.fmin.reduce(bmin, axis=1, keepdims=True)
+            span = np.fmax.reduce(bmax, axis=1, keepdims=True) - lo
+            span[span == 0] = 1
+            nmin = (bmin - lo) / span
+            nmax = (bmax - lo) / span
+
+            record['nbytes'] = sum([Y.nbytes for Y in columns])
+
+        return {'starts': starts, 'min': nmin, 'max': nmax, 'nan_fraction': bnan}
+
+    def plot_overview(self, show=True, nbins=500, opts={}):
+        """
+        Plot an overview of the data as images of columns by row bins
+
+        This is a single figure, however many columns are configured, so is
+        suitable for wide files (see compute_overview())
+
+        :param show: Show the plot
+        :type show: bool
+        :param nbins: The (maximum) number of bins
+        :type nbins: int
+        :param opts: Option kwargs to apply to all images (e.g. cmap)
+        :type opts: dict
+        :returns: The figure and axes objects
+        :rtype: tuple
+        """
+
+        overview = self.compute_overview(nbins=nbins)
+
+        with self.profile_phase('plot_overview', nrows=len(self.rows)):
+            fig, axs = plt.subplots(3, 1, sharex=True, squeeze=False)
+            ncols = len(self.conf['ycol'])
+            nrows = len(self.rows) - self.conf['first_data_row']
+            extent = (0, max(nrows, 1), ncols - 0.5, -0.5)
+            panels = [('min', 'Min (normalised)'), ('max', 'Max (normalised)'), ('nan_fraction', 'Missing fraction')]
+
+            for i, (key, title) in enumerate(panels):
+                kwargs = {'aspect': 'auto', 'interpolation': 'nearest', 'extent': extent, 'vmin': 0, 'vmax': 1}
+                kwargs.update(opts)
+                im = axs[i,0].imshow(overview[key], **kwargs)
+                axs[i,0].set_title(title)
+                fig.colorbar(im, ax=axs[i,0])
+
+                # Label the columns if they're legible, otherwise label the
+                # ticks with the column indices
+                if ncols <= 40:
+                    axs[i,0].set_yticks(range(ncols))
+                    axs[i,0].set_yticklabels(self.get_field_names(self.conf['ycol']))
+                else:
+                    axs[i,0].yaxis.set_major_formatter(lambda v, pos: str(self.conf['ycol'][int(v)]) if 0 <= int(v) < ncols else '')
+
+            # Label the row bins with the x-axis values, if any
+            if self.conf['xcol'] is not None and nrows:
+                x = self.get_x_axis_array()
+                ticks = np.unique(np.linspace(0, nrows - 1, 6).astype(np.int64))
+
+                if x.dtype.kind == 'M':
+                    ticklabels = np.datetime_as_string(x[ticks], unit='s')
+                else:
+                    ticklabels = [f'{v:g}' for v in x[ticks]]
+
+                axs[-1,0].set_xticks(ticks)
+                axs[-1,0].set_xticklabels(ticklabels, rotation=15)
+
+            if self.sample_info:
+                fig.suptitle(self.get_sampling_text())
+
+        if show:
+            plt.show()
+
+        return fig, axs
+
+    def check_bom(self, rows=None):
+        """
+        Check if the input file begins with an unnecessary Byte Order Mark (BOM)
+
+        If the encoding is UTF-8, the first cell is inspected for the
+        presence of a BOM
+
+        :param rows: The rows (default self.rows)
+        :type rows: list
+        :returns: A message dict
+        :rtype: dict
+        """
+
+        rows = self.rows if rows is None else rows
+        x,y = 0,0
+        msg = {'x': x, 'y': y, 'data': {'has_bom': False}, 'status': CassavaStatus.ok}
+
+        if encodings.normalize_encoding(self.fp.encoding) == encodings.normalize_encoding('utf-8'):
+            try:
+                cell = rows[y][x]
+            except IndexError:
+                cell = ''
+
+            if cell.startswith(UTF_8_BOM):
+                msg = {'x': x, 'y': y, 'data': {'has_bom': True}, 'status': CassavaStatus.warn}
+
+        return msg
+
+    def check_column_counts(self):
+        """
+        Check that the number of columns is consistent for all rows
+
+        :yields: A message dict
+        """
+
+        first_line_ncols = 0
+
+        for y, row in enumerate(self._count_progress(self.rows)):
+            if y < self.conf['first_data_row']:
+                continue
+            else:
+                if y == self.conf['first_data_row']:
+                    first_line_ncols = len(row)
+                    msg = {'x': None, 'y': self.get_row_number(y), 'data': {'is_first_row': True, 'ncols': len(row)}, 'status': CassavaStatus.ok}
+                else:
+                    msg = {'x': None, 'y': self.get_row_number(y), 'data': {'is_first_row': False, 'ncols': len(row)}, 'status': CassavaStatus.undefined}
+                    if len(row) != first_line_ncols:
+                        msg['status'] = CassavaStatus.error
+                    else:
+                        msg['status'] = CassavaStatus.ok
+
+                yield msg
+
+    def check_empty_columns(self):
+        """
+        Check for any columns that are wholly empty
+
+        :yields: A message dict
+        """
+
+        ncols = len(self.rows[self.conf['first_data_row']])
+
+        for x in range(ncols):
+            is_empty = True
+            status = CassavaStatus.error
+
+            for row in self.rows:
+                try:
+                    if row[x] != '':
+                        is_empty = False
+                        status = CassavaStatus.ok
+                        break
+                except IndexError:
+                    # Some rows may (incorrectly) have different column counts
+                    # but that's not our concern here
+                    pass
+
+            msg = {'x': x, 'y': None, 'data': {'is_empty': is_empty}, 'status': status}
+            yield msg
+
+    def check_empty_rows(self):
+        """
+        Check for any rows that are wholly empty
+
+        :yields: A message dict
+        """
+
+        for y, row in enumerate(self._count_progress(self.rows)):
+            is_empty = True
+            status = CassavaStatus.error
+            ncols = len(row)
+
+            for x in range(ncols):
+                if row[x] != '':
+                    is_empty = False
+                    status = CassavaStatus.ok
+                    break
+
+            msg = {'x': None, 'y': self.get_row_number(y), 'data': {'is_empty': is_empty}, 'status': status}
+            yield msg
+
+    def get_numeric_columns(self, nsample=COLUMN_PROFILE_NSAMPLE):
+        """
+        Get the indices of the numeric columns, other than the x-axis column
+
+        A column is numeric if its type, inferred from a sample of evenly-
+        spaced data rows, is int or float (see infer_column_type())
+
+        :param nsample: The (max.) number of data rows to sample
+        :type nsample: int
+        :returns: The column indices
+        :rtype: list
+        """
+
+        y0 = self.conf['first_data_row']
+        nrows = len(self.rows) - y0
+
+        if nrows <= 0:
+            return []
+
+        ys = np.unique(np.linspace(y0, len(self.rows) - 1, min(nsample, nrows)).astype(np.int64))
+        columns = list(itertools.zip_longest(*[self.rows[y] for y in ys]))
+        cols = []
+
+        for col, cells in enumerate(columns):
+            values = np.array([str(cell) for cell in cells if cell is not None and cell != ''], dtype=object)
+            values = values[~self.get_missing_value_mask(values)]
+
+            if col != self.conf['xcol'] and self.infer_column_type(values) in ['int', 'float']:
+                cols.append(col)
+
+        return cols
+
+    def get_stats_columns(self):
+        """
+        Get the columns that statistics are computed for: the configured
+        ycol columns, or if the all_columns config item is set, all the
+        numeric columns (see get_numeric_columns())
+
+        :returns: The column indices
+        :rtype: list
+        """
+
+        return self.get_numeric_columns() if self.conf['all_columns'] else self.conf['ycol']
+
+    def _compute_column_stats(self, col, depth=0):
+        """
+        Convert the given column and compute its statistics, as a task of
+        compute_column_stats()
+
+        :param col: The column index
+        :type col: int
+        :param depth: The profile phase depth of the submitting thread
+        :type depth: int
+        :returns: The stats dict
+        :rtype: dict
+        """
+
+        self._profile_depth = depth
+
+        return self.compute_stats(self.get_resampled_y_axis_array(col))
+
+    def compute_column_stats(self):
+        """
+        Compute column statistics for the configured columns (see
+        get_stats_columns())
+
+        If the resample config item is set, the statistics are of the
+        resampled data (see resample())
+
+        Each column is converted and its statistics computed as a task on a
+        pool of threads, the number given by the workers config item
+        (default the number of CPUs), and the results are yielded in column
+        order.  NumPy releases the GIL for much of the work on the arrays,
+        so the columns are processed in parallel.  If memory is being
+        profiled, the columns are processed in turn
+
+        :yields: A message dict
+        """
+
+        cols = self.get_stats_columns()
+        workers = 1 if self.conf['profile_memory'] else min(self.conf['workers'] or os.cpu_count() or 1, len(cols))
+
+        if workers > 1:
+            # Shared by all the columns, so computed up front
+            if self.conf['resample'] is not None:
+                self._get_resample_buckets()
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self._compute_column_stats, cols, itertools.repeat(self._profile_depth)))
         else:
-            print(prefix + text, end=end)
+            results = [self._compute_column_stats(col, depth=self._profile_depth) for col in cols]
+
+        for ycol, stats in zip(cols, results):
+            msg = {'x': ycol, 'y': None, 'data': stats, 'status': CassavaStatus.ok}
+            yield msg
+
+    def convert_cells(self, values, kind):
+        """
+        Convert the given cells in bulk to the given column type
+
+        Each of the COLUMN_TYPES is converted as follows: bool from true or
+        false (in any case), int and float as by the int and float
+        functions (int to int64), datetime with the datetime_format config
+        item, and text as is
+
+        :param values: The cells, none of which are missing
+        :type values: np.ndarray
+        :param kind: The column type
+        :type kind: str
+        :returns: The converted values and a mask of the cells that failed
+        to convert
+        :rtype: tuple
+        """
+
+        bad = np.zeros(len(values), dtype=bool)
+
+        if kind == 'bool':
+            lower = np.char.lower(values.astype(str))
+            bad = ~np.isin(lower, ['true', 'false'])
+            converted = lower == 'true'
+        elif kind in ['int', 'float']:
+            dtype = np.int64 if kind == 'int' else np.float64
+
+            try:
+                converted = values.astype(dtype)
+            except (TypeError, ValueError, OverflowError):
+                bad = self.get_unconvertible_mask(values, ~bad, dtype)
+                converted = np.zeros(len(values), dtype=dtype)
+                converted[~bad] = values[~bad].astype(dtype)
+        elif kind == 'datetime':
+            converted = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[us]')
+            todo = np.ones(len(values), dtype=bool)
+
+            # ISO 8601 datetimes are parsed in bulk by NumPy, which accepts
+            # other forms too, so only those that format back to the same
+            # string are taken as converted
+            if self.conf['datetime_format'] == ISO_DATETIME_FORMAT:
+                strs = values.astype(str)
+
+                try:
+                    parsed = strs.astype('datetime64[s]')
+                    todo = np.datetime_as_string(parsed, unit='s') != strs
+                    converted[~todo] = parsed[~todo]
+                except ValueError:
+                    pass
+
+            lookup = {}
+
+            for value in set(values[todo].tolist()):
+                try:
+                    lookup[value] = datetime.datetime.strptime(value, self.conf['datetime_format'])
+                except ValueError:
+                    pass
+
+            if todo.any():
+                converted[todo] = np.array([lookup.get(value) for value in values[todo].tolist()], dtype='datetime64[us]')
+                bad[todo] = [value not in lookup for value in values[todo].tolist()]
+        else:
+            converted = values
+
+        return converted, bad
+
+    def infer_column_type(self, values, threshold=COLUMN_TYPE_THRESHOLD):
+        """
+        Infer the type of a column from the given sample of its cells
+
+        The type is the first of the COLUMN_TYPES that at least the given
+        fraction of the cells convert to (see convert_cells()), so that a
+        few bad cells don't stop a column being recognised as, for example,
+        numeric
+
+        :param values: The sample of cells, none of which are missing
+        :type values: np.ndarray
+        :param threshold: The fraction of the cells that must convert
+        :type threshold: float
+        :returns: The column type, or None if there are no cells
+        :rtype: str
+        """
+
+        if len(values) == 0:
+            return None
+
+        for kind in COLUMN_TYPES[:-1]:
+            if 1 - np.mean(self.convert_cells(values, kind)[1]) >= threshold:
+                return kind
+
+        return COLUMN_TYPES[-1]
+
+    def profile_columns(self, nsample=COLUMN_PROFILE_NSAMPLE, nrows=CHUNK_NROWS):
+        """
+        Profile every column, inferring its type and validating every cell
+        against it
+
+        The type of each column is inferred from an evenly-spaced sample of
+        at most nsample of its non-missing cells, from the first chunk of
+        data rows that has any (see infer_column_type()), in a vectorised
+        pass over the sample for each candidate type.  Then all of the
+        cells are converted to that type, in bulk per chunk, to count the
+        cells that fail to convert and find the minimum and maximum of
+        those that do.  The number of distinct values is estimated with a
+        HyperLogLog sketch (see CassavaHyperLogLog).  Empty cells and
+        missing values are counted as missing, and are otherwise ignored
+
+        If the rows haven't been read (see read()), the input file is
+        streamed in chunks of nrows data rows (see iter_chunks()), so it's
+        never held in memory, and the selection and sampling config items
+        don't apply.  Otherwise the rows that have been read are profiled
+
+        :param nsample: The (max.) number of cells to infer each type from
+        :type nsample: int
+        :param nrows: The maximum number of data rows in each chunk
+        :type nrows: int
+        :yields: A message dict for each column
+        """
+
+        profiles = []
+        chunks = self.iter_chunks(nrows=nrows) if len(self.rows) == 0 and self.fp is not None else [self.rows]
+        y0 = self.conf['first_data_row']
+
+        for rows in chunks:
+            with self.profile_phase('column_profile', nrows=len(rows) - y0):
+                # Transpose the chunk's data rows, with None for the cells
+                # missing from short rows
+                columns = list(itertools.zip_longest(*rows[y0:]))
+
+                while len(profiles) < len(columns):
+                    profiles.append({'type': None, 'nvalues': 0, 'nmissing': 0, 'nfailures': 0, 'rows': [], 'hll': CassavaHyperLogLog(), 'min': None, 'max': None})
+
+                for col, profile in enumerate(profiles):
+                    cells = np.array(columns[col], dtype=object) if col < len(columns) else np.full(len(rows) - y0, None, dtype=object)
+                    is_none = np.equal(cells, None)
+
+                    # Parsed rows only contain strings, but rows can be set
+                    # directly, so ensure we compare string representations
+                    if not set(map(type, columns[col] if col < len(columns) else [])) <= {str, type(None)}:
+                        cells[~is_none] = [str(cell) for cell in cells[~is_none]]
+                    missing = is_none | (cells == '') | self.get_missing_value_mask(cells)
+                    ys = np.flatnonzero(~missing)
+                    values = cells[ys]
+                    profile['nmissing'] += int(np.count_nonzero(missing))
+                    profile['nvalues'] += len(values)
+                    profile['hll'].add(values)
+
+                    if profile['type'] is None:
+                        sample = values[np.linspace(0, len(values) - 1, min(nsample, len(values))).astype(np.int64)] if len(values) else values
+                        profile['type'] = self.infer_column_type(sample)
+
+                    if profile['type'] is None:
+                        continue
+
+                    converted, bad = self.convert_cells(values, profile['type'])
+                    nfailures = int(np.count_nonzero(bad))
+
+                    if nfailures and len(profile['rows']) < MAX_FAILURE_ROWS:
+                        rows_failed = self.get_row_numbers(ys[bad][:MAX_FAILURE_ROWS] + y0).tolist()
+                        profile['rows'] = (profile['rows'] + rows_failed)[:MAX_FAILURE_ROWS]
+
+                    profile['nfailures'] += nfailures
+                    converted = converted[~bad]
+
+                    if profile['type'] == 'float':
+                        converted = converted[~np.isnan(converted)]
+
+                    if len(converted):
+                        lo, hi = converted.min(), converted.max()
+                        lo, hi = [v.item() if isinstance(v, np.generic) else v for v in [lo, hi]]
+                        profile['min'] = lo if profile['min'] is None else min(profile['min'], lo)
+                        profile['max'] = hi if profile['max'] is None else max(profile['max'], hi)
+
+        labels = self.header_row or []
+
+        for col, profile in enumerate(profiles):
+            data = {'label': labels[col] if col < len(labels) else '', 'type': profile['type'] or 'empty', 'nvalues': profile['nvalues'], 'nmissing': profile['nmissing'], 'nfailures': profile['nfailures'], 'rows': profile['rows'], 'cardinality': profile['hll'].count(), 'min': profile['min'], 'max': profile['max']}
+            status = CassavaStatus.warn if profile['nfailures'] else CassavaStatus.ok
+            yield {'x': col, 'y': None, 'data': data, 'status': status}
+
+    def get_iqr_fences(self, stats, k=1.5):
+        """
+        Get the Tukey fences for the given statistics, beyond which values
+        are outliers
+
+        :param stats: The stats dict (see compute_stats())
+        :type stats: dict
+        :param k: The factor to multiply the IQR by
+        :type k: float
+        :returns: The low and high fences
+        :rtype: tuple
+        """
 
-    def print_msg_table(self, table, indent=0, fmt='.2g'):
+        iqr = stats['q3'] - stats['q1']
+
+        return stats['q1'] - k * iqr, stats['q3'] + k * iqr
+
+    def compute_column_fences(self, k=1.5, nrows=CHUNK_NROWS):
         """
-        Print the given list of message dicts as a table
+        Compute the Tukey fences of the configured columns (see
+        get_stats_columns()), over all the data rows of the input file
+
+        The input file is read from its start in chunks (see iter_chunks()),
+        and the quartiles of each column are computed from a sample of its
+        values of at most QUANTILE_NSAMPLE (see CassavaQuantileSketch), so
+        memory is bounded, whatever the file size.  So for a column of more
+        than QUANTILE_NSAMPLE values, the fences are estimates, and can
+        differ from those of check_column_outliers_iqr(), which computes the
+        exact quartiles of the stored values.  The sample is seeded with the
+        sample_seed config item, or 0, so the fences are reproducible.
+        Unlike check_column_outliers_iqr(), the resample config item doesn't
+        apply, so the fences are those of the values, not of their buckets
 
-        :param table: The list of message dicts to be tabulated
-        :type table: list
-        :param indent: An indent to prepend to each row of the table
-        :type indent: int
-        :param fmt: A format specifier to apply to each data value
-        :type fmt: str
+        :param k: The factor to multiply the IQR by
+        :type k: float
+        :param nrows: The maximum number of data rows in each chunk
+        :type nrows: int
+        :returns: The low and high fences, keyed by column index
+        :rtype: dict
         """
 
-        # Dynamically calculate column lengths and data coords label lengths
-        if len(table) > 0:
-            coords = []
-            if table[0]['x'] is not None:
-                coords.append('column')
-            if table[0]['y'] is not None:
-                coords.append('row')
-            label_header = ','.join(coords)
+        cols, sketches = None, {}
+        seed = 0 if self.conf['sample_seed'] is None else self.conf['sample_seed']
 
-            col_lens = [0] * len(table[0]['data'])
-            label_len = len(label_header) + 1
-            labels = []
+        for fp in self.fps:
+            fp.seek(0, 0)
 
-        for row in table:
-            for x, (k, v) in enumerate(row['data'].items()):
-                col_lens[x] = np.max([col_lens[x], len(str(k)) + 1, len(f'{v:{fmt}}') + 1])
+        for rows in self.iter_chunks(nrows):
+            if cols is None:
+                cols = self.get_stats_columns()
+                sketches = {col: CassavaQuantileSketch(seed=seed) for col in cols}
 
-            coords = []
-            if row['x'] is not None:
-                coords.append(str(row['x']))
-            if row['y'] is not None:
-                coords.append(str(row['y']))
-            label = ','.join(coords)
-            labels.append(label)
-            label_len = np.max([label_len, len(label) + 1])
+            for col in cols:
+                sketches[col].add(self.get_y_axis_array(col))
 
-        for i, row in enumerate(table):
-            if i == 0:
-                text = ''.join([f'{k}'.ljust(col_lens[x]) for x,k in enumerate(row['data'])])
-                self.print_status(label_header.ljust(label_len) + text, row['status'], indent=indent)
+        # Without any data rows, there are no chunks, and no values
+        if cols is None:
+            cols = self.get_stats_columns()
+            sketches = {col: CassavaQuantileSketch(seed=seed) for col in cols}
 
-            text = ''.join([f'{v:{fmt}}'.ljust(col_lens[x]) for x,v in enumerate(row['data'].values())])
-            self.print_status(labels[i].ljust(label_len) + text, row['status'], indent=indent)
+        fences = {}
 
-    def compute_multi_plot_layout(self, ncols=2):
+        for col, sketch in sketches.items():
+            values = sketch.get_values()
+            fences[col] = self.get_iqr_fences(self.compute_stats(values), k=k) if len(values) else (np.nan, np.nan)
+
+        return fences
+
+    def check_column_outliers_iqr(self, k=1.5):
         """
-        Compute an optimal rows and columns layout for multiple plots
+        Check for any outliers for the configured columns (IQR) (see
+        get_stats_columns())
 
-        :param ncols: The suggested number of columns in the layout
-        :type ncols: int
-        :returns: The plot layout of rows and columns
-        :rtype: tuple
+        If the resample config item is set, the outliers are buckets, and are
+        reported at the first row of the bucket
+
+        :param k: The factor to multiply the IQR by
+        :type k: float
+        :yields: A message dict
         """
 
-        N = len(self.conf['ycol'])
+        y0 = self.conf['first_data_row']
+        rows = self.get_resampled_rows()
 
-        if N < ncols:
-            ncols = N
+        for ycol in self.get_stats_columns():
+            Y = self.get_resampled_y_axis_array(ycol)
+            low, high = self.get_iqr_fences(self.compute_stats(Y), k=k)
 
-        if N % ncols == 0:
-            layout = (N // ncols, ncols)
-        else:
-            layout = (N // ncols + 1, ncols)
+            # High outliers
+            for y in np.where(Y > high)[0]:
+                msg = {'x': ycol, 'y': self.get_row_number(rows[y] + y0), 'data': {'value': Y[y]}, 'status': CassavaStatus.error}
+                yield msg
 
-        return layout
+            # Low outliers
+            for y in np.where(Y < low)[0]:
+                msg = {'x': ycol, 'y': self.get_row_number(rows[y] + y0), 'data': {'value': Y[y]}, 'status': CassavaStatus.error}
+                yield msg
 
-    def _plot_multi(self, fig, axs, x, labels, layout, opts={}):
+    def _get_runs(self, indices):
         """
-        Plot the data.  Configured columns are each plotted on their own plot
+        Group the given sorted indices into runs of consecutive indices
 
-        :param fig: The figure object
-        :type fig: matplotlib.figure.Figure
-        :param axs: The axes array
-        :type axs: matplotlib.axes.Axes
-        :param x: The x-axis data
-        :type x: list
-        :param labels: The column header labels
-        :type labels: list
-        :param layout: The dimensions of the plot grid
-        :type layout: tuple
-        :param opts: Option kwargs to apply to all plots
-        :type opts: dict
+        :param indices: The sorted indices
+        :type indices: np.ndarray
+        :returns: The (first, last) index of each run
+        :rtype: list
         """
 
-        for i in range(layout[0]):
-            for j in range(layout[1]):
-                k = i * layout[1] + j
+        if len(indices) == 0:
+            return []
 
-                # The last grid row may have empty plots so remove them
-                try:
-                    ycol = self.conf['ycol'][k]
-                except IndexError:
-                    fig.delaxes(axs[i,j])
-                    continue
+        breaks = np.flatnonzero(np.diff(indices) != 1)
+        starts = np.concatenate(([indices[0]], indices[breaks + 1]))
+        ends = np.concatenate((indices[breaks], [indices[-1]]))
 
-                y = self.get_y_axis_data(ycol)
+        return list(zip(starts.tolist(), ends.tolist()))
 
-                if len(labels) > k and labels[k]:
-                    opts['label'] = labels[k]
+    def check_time_axis(self, gap_factor=1.5):
+        """
+        Check the cadence, gaps and monotonicity of a datetime x-axis
 
-                axs[i,j].plot(x, y, **opts)
-                axs[i,j].legend()
+        The nominal cadence is inferred as the median of the positive steps
+        between consecutive datetimes.  Steps greater than gap_factor times
+        the cadence are gaps, zero steps are duplicate datetimes, and negative
+        steps are reversals.  Consecutive problem steps of the same kind are
+        reported as a single range of rows.  Any forgiven (NaT) datetimes are
+        skipped.  Nothing is yielded unless a datetime xcol is configured
 
-    def _plot_single(self, fig, axs, x, labels, opts={}):
-        """
-        Plot the data.  Configured columns are all plotted on a single plot
+        The first message summarises the check, and is followed by a message
+        for each range of rows
 
-        :param fig: The figure object
-        :type fig: matplotlib.figure.Figure
-        :param axs: The axes array
-        :type axs: matplotlib.axes.Axes
-        :param x: The x-axis data
-        :type x: list
-        :param labels: The column header labels
-        :type labels: list
-        :param opts: Option kwargs to apply to all plots
-        :type opts: dict
+        :param gap_factor: The factor to multiply the cadence by
+        :type gap_factor: float
+        :yields: A message dict
         """
 
-        for i, ycol in enumerate(self.conf['ycol']):
-            y = self.get_y_axis_data(ycol)
+        if self.conf['xcol'] is None or not self.conf['x_as_datetime']:
+            return
 
-            if len(labels) > i and labels[i]:
-                opts['label'] = labels[i]
+        xcol = self.conf['xcol']
+        y0 = self.conf['first_data_row']
+        X = self.get_x_axis_array()
+        valid = np.flatnonzero(~np.isnat(X))
+        T = X[valid].astype('datetime64[us]').astype(np.int64)
+        steps = np.diff(T)
+        positive = steps[steps > 0]
+        cadence = int(np.median(positive)) if len(positive) else 0
+        kinds = {
+            'gap': (np.flatnonzero(steps > gap_factor * cadence) if cadence else np.array([], dtype=np.int64), CassavaStatus.warn),
+            'duplicate': (np.flatnonzero(steps == 0), CassavaStatus.error),
+            'reversal': (np.flatnonzero(steps < 0), CassavaStatus.error)
+        }
+
+        data = {'cadence': datetime.timedelta(microseconds=cadence), 'nsteps': len(steps), 'nmissing': len(X) - len(valid)}
+        status = CassavaStatus.ok
 
-            axs[0,0].plot(x, y, **opts)
+        for kind, (indices, kind_status) in kinds.items():
+            data[f'n{kind}s'] = len(indices)
 
-        axs[0,0].legend()
+            if len(indices) and kind_status.value > status.value:
+                status = kind_status
 
-    def plot(self, show=True, layout=(1,1), opts={}):
+        yield {'x': xcol, 'y': None, 'data': data, 'status': status}
+
+        for kind, (indices, kind_status) in kinds.items():
+            for first, last in self._get_runs(indices):
+                # Step i is between the valid datetimes i and i + 1
+                run = steps[first:last + 1]
+                step = run.max() if kind == 'gap' else run.min()
+                data = {'kind': kind, 'start_row': self.get_row_number(int(valid[first]) + y0), 'end_row': self.get_row_number(int(valid[last + 1]) + y0), 'nsteps': last - first + 1, 'step': datetime.timedelta(microseconds=int(step))}
+                yield {'x': xcol, 'y': data['start_row'], 'data': data, 'status': kind_status}
+
+    def check_conversion_failures(self):
         """
-        Plot the data
+        Check for any cells that failed to convert and were forgiven
 
-        * If the product of layout > 1, then configured columns are each
-          plotted on their own plot
-        * Otherwise configured columns are all plotted on a single plot
+        This reports on the columns that have been converted so far, so is
+        only meaningful after the data have been used, e.g. for stats
 
-        :param show: Show the plot
-        :type show: bool
-        :param layout: The rows and columns for the subplots() call
-        :type layout: tuple
-        :param opts: Option kwargs to apply to all plots
-        :type opts: dict
-        :returns: The figure and axes objects
-        :rtype: tuple
+        :yields: A message dict
         """
 
-        # Determine if we've been asked to plot a multi-plot grid
-        multi = layout[0] * layout[1] > 1
+        for col, failures in self.conversion_failures.items():
+            status = CassavaStatus.warn if failures['nfailures'] else CassavaStatus.ok
+            msg = {'x': col, 'y': None, 'data': failures, 'status': status}
+            yield msg
 
-        fig, axs = plt.subplots(*layout, squeeze=False)
-        x = self.get_x_axis_data()
-        labels = self.get_column_labels_from_header(self.conf['ycol'])
+    def diff(self, base, key=None, tolerance=0.0, nrows=CHUNK_NROWS):
+        """
+        Compare the data rows of the input file with those of the given base
+        file, matching the rows by the values of a key column
+
+        Both files are read in chunks (see iter_chunks()).  The base file is
+        read into a hash index of its keys, and arrays of its y-axis columns.
+        Then the keys of each chunk of the input file are looked up in the
+        index, and its y-axis columns are compared with those of the matching
+        base rows as arrays.  So the comparison takes linear time, and memory
+        bounded by the size of the index
+
+        Keys are compared as the cells' text, and rows with an empty key are
+        ignored.  Values are unchanged if they differ by no more than the
+        tolerance, or are both missing.  Only the first base row with a given
+        key is matched, and any later ones are reported as duplicates
+
+        Each result has a kind of added, removed, changed or duplicate, the
+        key and the row number in the base file as base_row (-1 for added
+        rows).  Added rows and changed cells have the row number in the input
+        file as y, and changed cells also have the column as x, and the
+        base_value and value.  Changed cells have an error status, and the
+        others a warn status.  A summary of the comparison is held in
+        self.diff_info
+
+        :param base: The base file, which must be open
+        :type base: Cassava
+        :param key: The key column (default the xcol config item)
+        :type key: int
+        :param tolerance: The largest absolute difference between equal values
+        :type tolerance: float
+        :param nrows: The maximum number of data rows in each chunk
+        :type nrows: int
+        :returns: The results, in the order added, removed, changed,
+        duplicate
+        :rtype: CassavaResults
+        """
 
-        if multi:
-            self._plot_multi(fig, axs, x, labels, layout, opts)
-        else:
-            self._plot_single(fig, axs, x, labels, opts)
+        key = self.conf['xcol'] if key is None else key
+
+        if key is None:
+            raise ValueError('A key column is required to diff files (see the --key and --x-column options)')
+
+        cols = self.conf['ycol']
+        index = {}
+        base_rows, base_values = [], {col: [] for col in cols}
+        duplicates, duplicate_keys = [], []
+        base_nrows = 0
+
+        with self.profile_phase('diff_index') as record:
+            for rows in base.iter_chunks(nrows):
+                keys = base.get_column_cells(key)
+                ys = base.get_row_numbers(range(base.conf['first_data_row'], len(rows)))
+                keep = np.zeros(len(keys), dtype=bool)
+
+                for i, k in enumerate(keys):
+                    if not k:
+                        continue
+                    elif k in index:
+                        duplicates.append(ys[i])
+                        duplicate_keys.append(k)
+                    else:
+                        index[k] = len(index)
+                        keep[i] = True
+
+                base_rows.append(ys[keep])
+
+                for col in cols:
+                    base_values[col].append(base.get_y_axis_array(col)[keep].astype(np.float64))
+
+                base_nrows += len(keys)
+
+            base_rows = np.concatenate(base_rows) if base_rows else np.zeros(0, dtype=np.int64)
+            base_values = {col: np.concatenate(v) if v else np.zeros(0) for col, v in base_values.items()}
+            index_keys = np.array(list(index), dtype=object)
+            record['nrows'] = base_nrows
+
+        matched = np.zeros(len(index), dtype=bool)
+        added, changed = [], []
+        nrows_total = nchanged = nunchanged = 0
+
+        with self.profile_phase('diff_compare') as record:
+            for rows in self.iter_chunks(nrows):
+                keys = np.array(self.get_column_cells(key), dtype=object)
+                ys = self.get_row_numbers(range(self.conf['first_data_row'], len(rows)))
+                ia = np.fromiter((index.get(k, -1) if k else -2 for k in keys), dtype=np.int64, count=len(keys))
+                found = ia >= 0
+                ia_found, ys_found, keys_found = ia[found], ys[found], keys[found]
+                matched[ia_found] = True
+                is_added = ia == -1
+                added.append(self._get_diff_results('added', keys[is_added], y=ys[is_added]))
+                is_changed = np.zeros(len(ia_found), dtype=bool)
+
+                for col in cols:
+                    a = base_values[col][ia_found]
+                    b = self.get_y_axis_array(col)[found].astype(np.float64)
+                    differs = ~((np.abs(a - b) <= tolerance) | (np.isnan(a) & np.isnan(b)))
+                    is_changed |= differs
+                    changed.append(self._get_diff_results('changed', keys_found[differs], x=col, y=ys_found[differs], base_row=base_rows[ia_found[differs]], base_value=a[differs], value=b[differs]))
+
+                nrows_total += len(keys)
+                nchanged += int(is_changed.sum())
+                nunchanged += int((~is_changed).sum())
+
+            record['nrows'] = nrows_total
+
+        added = CassavaResults.concatenate([self._get_diff_results('added', [])] + added)
+        changed = CassavaResults.concatenate([self._get_diff_results('changed', [])] + changed)
+        changed = changed[np.lexsort((changed.x, changed.y))]
+        removed = self._get_diff_results('removed', index_keys[~matched], base_row=base_rows[~matched])
+        duplicate = self._get_diff_results('duplicate', duplicate_keys, base_row=duplicates)
+        results = CassavaResults.concatenate([added, removed, changed, duplicate])
+
+        self.diff_info = {'base_path': base.path, 'key': key, 'tolerance': tolerance, 'nrows': nrows_total, 'base_nrows': base_nrows, 'added': len(added), 'removed': len(removed), 'changed': nchanged, 'changed_cells': len(changed), 'unchanged': nunchanged, 'duplicates': len(duplicate)}
+
+        return results
+
+    def _get_diff_results(self, kind, keys, x=None, y=None, base_row=-1, base_value=np.nan, value=np.nan):
+        """
+        Get the diff results of the given kind for the given keys (see diff())
+
+        :param kind: The kind of difference
+        :type kind: str
+        :param keys: The keys
+        :type keys: list
+        :returns: The results
+        :rtype: CassavaResults
+        """
 
-        if show:
-            plt.show()
+        n = len(keys)
+        status = CassavaStatus.error if kind == 'changed' else CassavaStatus.warn
+        data = {
+            'kind': np.full(n, kind),
+            'key': np.array(list(keys), dtype=object),
+            'base_row': CassavaResults._to_array(base_row, n, np.int64),
+            'base_value': CassavaResults._to_array(base_value, n, np.float64),
+            'value': CassavaResults._to_array(value, n, np.float64)
+        }
 
-        return fig, axs
+        return CassavaResults(n, x=x, y=y, status=status, data=data)
 
-    def plot_stats(self, show=True, bins='auto', k=1.5, showfliers=True):
+    def get_check_inputs(self, names):
         """
-        Plot stats of the data
+        Compute the given check inputs (see CassavaCheck)
 
-        :param show: Show the plot
-        :type show: bool
-        :param bins: The bins for the density plot
-        :type bins: The types supported by matplotlib.pyplot.hist
-        :param k: The factor to multiply the IQR by
-        :type k: float
-        :param showfliers: Show outliers in the plots
-        :type showfliers: bool
-        :returns: The figure and axes objects
-        :rtype: tuple
+        The row-based and empty column inputs are computed in a single scan
+        of the rows, and each column is converted once (the converted
+        columns are cached in self.columns)
+
+        :param names: The input names
+        :type names: set
+        :returns: The inputs, keyed by input name
+        :rtype: dict
         """
 
-        fig, axs = plt.subplots(len(self.conf['ycol']), 3, squeeze=False)
-        x = self.get_x_axis_data()
-        labels = self.get_column_labels_from_header(self.conf['ycol'])
+        inputs = {}
 
-        for i, ycol in enumerate(self.conf['ycol']):
-            y = self.get_y_axis_data(ycol)
+        if 'rows' in names:
+            inputs['rows'] = self.rows
 
-            # Remove any NaNs, as boxplot() balks on them
-            Y = np.array(y)
-            Y = Y[~np.isnan(Y)]
+        if names & {'row_lengths', 'row_is_empty', 'column_is_empty'}:
+            # The empty columns are those of the first data row (as in
+            # check_empty_columns()).  Only the columns not yet found to have
+            # a non-empty cell are looked at in each row
+            y0 = self.conf['first_data_row']
+            ncols = len(self.rows[y0]) if y0 < len(self.rows) else 0
+            pending = set(range(ncols)) if 'column_is_empty' in names else set()
 
-            label = ''
+            with self.profile_phase('scan', nrows=len(self.rows)):
+                if isinstance(self.rows, CassavaNumericRows):
+                    row_lengths = self.rows.get_row_lengths()
+                    row_is_empty = self.rows.get_row_is_empty()
+                    column_is_empty = self.rows.get_column_is_empty(ncols)
+                else:
+                    row_lengths = np.empty(len(self.rows), dtype=np.int64)
+                    row_is_empty = np.empty(len(self.rows), dtype=bool)
 
-            if len(labels) > i and labels[i]:
-                label = labels[i]
+                    for y, row in enumerate(self._count_progress(self.rows)):
+                        row_lengths[y] = len(row)
+                        row_is_empty[y] = row.count('') == len(row)
 
-            # Compute the range of the data
-            stats = self.compute_stats(y)
-            r = (stats['min'], stats['max'])
-            iqr = stats['q3'] - stats['q1']
+                        if pending:
+                            pending.difference_update([x for x in pending if x < len(row) and row[x] != ''])
 
-            # Compute the IQR-filtered range of the data
-            if not showfliers:
-                r = (stats['q1'] - k * iqr, stats['q3'] + k * iqr)
+                    column_is_empty = np.zeros(ncols, dtype=bool)
+                    column_is_empty[list(pending)] = True
 
-            # Density plot
-            axs[i,0].hist(y, bins=bins, range=r, density=True, label=label)
-            axs[i,0].legend()
+            inputs['row_lengths'] = row_lengths
+            inputs['row_is_empty'] = row_is_empty
+            inputs['column_is_empty'] = column_is_empty
 
-            if i == 0:
-                axs[i,0].set_title('Density')
+        if 'columns' in names:
+            inputs['columns'] = {ycol: self.get_y_axis_array(ycol) for ycol in self.conf['ycol']}
 
-            # Line plot and k * IQR interval to show outliers
-            axs[i,1].plot(x, y, label=label)
-            axs[i,1].axhline(y=stats['q3'] + k * iqr, c='red', ls='--', lw=0.5)
-            axs[i,1].axhline(y=stats['q1'] - k * iqr, c='red', ls='--', lw=0.5)
-            axs[i,1].legend()
+        if 'x_axis' in names:
+            inputs['x_axis'] = self.get_x_axis_array()
 
-            # Optionally chop-off outliers
-            if not showfliers:
-                axs[i,1].set_ylim(*r)
+        return inputs
 
-            if i == 0:
-                axs[i,1].set_title(f'{k} * IQR')
+    def plan_checks(self, names=None):
+        """
+        Plan the given checks, determining the union of the inputs they need
+
+        :param names: The names of the checks (default all registered checks)
+        :type names: list
+        :returns: The check objects and the required input names
+        :rtype: tuple
+        """
 
-            # Box plot
-            axs[i,2].boxplot(Y, labels=[label], whis=k, showfliers=showfliers)
+        registry = load_check_plugins()
+        names = list(registry) if names is None else names
+        unknown = [name for name in names if name not in registry]
 
-            if i == 0:
-                axs[i,2].set_title('Boxplot')
+        if unknown:
+            raise ValueError(f'Unknown checks: {unknown}. Available checks are: {list(registry)}')
 
-        if show:
-            plt.show()
+        checks = [registry[name]() for name in names]
+        inputs = set()
 
-        return fig, axs
+        for check in checks:
+            inputs |= set(check.inputs)
 
-    def check_bom(self):
+        return checks, inputs
+
+    def run_checks(self, names=None, **kwargs):
         """
-        Check if the input file begins with an unnecessary Byte Order Mark (BOM)
+        Run the given checks, sharing their inputs
 
-        If the encoding is UTF-8, the first cell is inspected for the
-        presence of a BOM
+        :param names: The names of the checks (default all registered checks)
+        :type names: list
+        :param kwargs: Arbitrary keyword arguments for the checks (e.g. k)
+        :type kwargs: kwargs
+        :yields: A tuple of the check and a message dict
+        """
 
-        :returns: A message dict
+        checks, input_names = self.plan_checks(names)
+        inputs = self.get_check_inputs(input_names)
+
+        for check in checks:
+            for msg in self._run_check(check, inputs, **kwargs):
+                yield check, msg
+
+    def get_check_results(self, names=None, **kwargs):
+        """
+        Run the given checks, sharing their inputs, and return their results
+
+        Unlike run_checks(), no message dicts are created, unless requested
+        from the results
+
+        :param names: The names of the checks (default all registered checks)
+        :type names: list
+        :param kwargs: Arbitrary keyword arguments for the checks (e.g. k)
+        :type kwargs: kwargs
+        :returns: The results, keyed by check name
         :rtype: dict
         """
 
-        x,y = 0,0
-        msg = {'x': x, 'y': y, 'data': {'has_bom': False}, 'status': CassavaStatus.ok}
+        checks, input_names = self.plan_checks(names)
+        inputs = self.get_check_inputs(input_names)
 
-        if encodings.normalize_encoding(self.fp.encoding) == encodings.normalize_encoding('utf-8'):
-            try:
-                cell = self.rows[y][x]
-            except IndexError:
-                cell = ''
+        return {check.name: self._get_check_results(check, inputs, **kwargs) for check in checks}
 
-            if cell.startswith(UTF_8_BOM):
-                msg = {'x': x, 'y': y, 'data': {'has_bom': True}, 'status': CassavaStatus.warn}
+    def _get_check_results(self, check, inputs, **kwargs):
+        """
+        Run the given check on the given inputs, returning its results
 
-        return msg
+        :param check: The check object
+        :type check: CassavaCheck
+        :param inputs: The inputs, keyed by input name
+        :type inputs: dict
+        :param kwargs: Arbitrary keyword arguments for the check
+        :type kwargs: kwargs
+        :returns: The results
+        :rtype: CassavaResults
+        """
 
-    def check_column_counts(self):
+        with self.profile_phase(f'check:{check.name}'):
+            return check.results(self, inputs, **kwargs)
+
+    def _run_check(self, check, inputs, **kwargs):
         """
-        Check that the number of columns is consistent for all rows
+        Run the given check on the given inputs
 
+        :param check: The check object
+        :type check: CassavaCheck
+        :param inputs: The inputs, keyed by input name
+        :type inputs: dict
+        :param kwargs: Arbitrary keyword arguments for the check
+        :type kwargs: kwargs
         :yields: A message dict
         """
 
-        first_line_ncols = 0
+        with self.profile_phase(f'check:{check.name}'):
+            yield from check.run(self, inputs, **kwargs)
 
-        for y, row in enumerate(self.rows):
-            if y < self.conf['first_data_row']:
-                continue
-            else:
-                if y == self.conf['first_data_row']:
-                    first_line_ncols = len(row)
-                    msg = {'x': None, 'y': y, 'data': {'is_first_row': True, 'ncols': len(row)}, 'status': CassavaStatus.ok}
-                else:
-                    msg = {'x': None, 'y': y, 'data': {'is_first_row': False, 'ncols': len(row)}, 'status': CassavaStatus.undefined}
-                    if len(row) != first_line_ncols:
-                        msg['status'] = CassavaStatus.error
-                    else:
-                        msg['status'] = CassavaStatus.ok
+    def print_bom(self):
+        """
+        Print whether the input file begins with an unnecessary BOM
+        """
 
-                yield msg
+        msg = self.check_bom()
 
-    def check_empty_columns(self):
+        if msg['data']['has_bom']:
+            text = f"The effective encoding is utf-8 and the input begins with an unneccessary Byte Order Mark (BOM). This BOM is present in cell ({msg['x']},{msg['y']}) of the stored input. If this is undesirable, either remove the BOM or specify the encoding as utf-8-sig (see the --encoding option)"
+            self.print_status(text, msg['status'])
+        else:
+            if(self.conf['verbose']):
+                text = 'No unnecessary Byte Order Mark (BOM) found'
+                self.print_status(text, msg['status'])
+
+    def get_sampling_text(self):
         """
-        Check for any columns that are wholly empty
+        Get a description of how the stored rows were sampled from the input
 
-        :yields: A message dict
+        :returns: The description, or None if the rows were not sampled
+        :rtype: str
         """
 
-        ncols = len(self.rows[self.conf['first_data_row']])
+        text = None
+        info = self.sample_info
 
-        for x in range(ncols):
-            is_empty = True
-            status = CassavaStatus.error
+        if info:
+            methods = []
 
-            for row in self.rows:
-                try:
-                    if row[x] != '':
-                        is_empty = False
-                        status = CassavaStatus.ok
-                        break
-                except IndexError:
-                    # Some rows may (incorrectly) have different column counts
-                    # but that's not our concern here
-                    pass
+            if info['sample_every']:
+                methods.append(f"every {info['sample_every']} rows")
+            if info['sample'] is not None:
+                methods.append(f"reservoir of {info['sample']} rows")
 
-            msg = {'x': x, 'y': None, 'data': {'is_empty': is_empty}, 'status': status}
-            yield msg
+            text = f"sampled {info['nsampled']} of {info['nrows']} data rows ({' then '.join(methods)}), sampling fraction = {info['fraction']:.3g}"
 
-    def check_empty_rows(self):
+        return text
+
+    def get_selection_text(self):
         """
-        Check for any rows that are wholly empty
+        Get a description of how the stored rows were selected from the input
 
-        :yields: A message dict
+        :returns: The description, or None if the rows were not selected
+        :rtype: str
         """
 
-        for y, row in enumerate(self.rows):
-            is_empty = True
-            status = CassavaStatus.error
-            ncols = len(row)
+        text = None
+        info = self.selection_info
 
-            for x in range(ncols):
-                if row[x] != '':
-                    is_empty = False
-                    status = CassavaStatus.ok
-                    break
+        if info:
+            criteria = []
+
+            if info['row_range'] is not None:
+                a, b = info['row_range']
+                criteria.append(f"rows {'' if a is None else a}:{'' if b is None else b}")
+            if info['start'] is not None:
+                criteria.append(f"start = {info['start']}")
+            if info['end'] is not None:
+                criteria.append(f"end = {info['end']}")
+
+            rows = f"rows {info['first_row']}-{info['first_row'] + info['nrows'] - 1}" if info['nrows'] else 'no rows'
+            text = f"selected {info['nrows']} data rows ({rows}) by {', '.join(criteria)}"
+
+        return text
+
+    def get_merge_text(self):
+        """
+        Get a description of how the rows of multiple input files were merged
 
-            msg = {'x': None, 'y': y, 'data': {'is_empty': is_empty}, 'status': status}
-            yield msg
+        :returns: The description, or None if there's a single input file
+        :rtype: str
+        """
 
-    def compute_column_stats(self):
+        text = None
+        info = self.merge_info
+
+        if info:
+            how = f"by x-axis column {info['xcol']}" if info['xcol'] is not None else 'in order'
+            text = f"merged {sum(info['nrows'])} data rows of {len(info['paths'])} files {how}"
+
+        return text
+
+    def get_resampling_text(self):
         """
-        Compute column statistics for the configured columns
+        Get a description of how the data were resampled
 
-        :yields: A message dict
+        :returns: The description, or None if the data were not resampled
+        :rtype: str
         """
 
-        for ycol in self.conf['ycol']:
-            Y = self.get_y_axis_data(ycol)
-            stats = self.compute_stats(Y)
-            msg = {'x': ycol, 'y': None, 'data': stats, 'status': CassavaStatus.ok}
-            yield msg
+        text = None
 
-    def check_column_outliers_iqr(self, k=1.5):
+        if self.conf['resample'] is not None:
+            buckets = self._get_resample_buckets()
+            text = f"resampled {len(buckets['order'])} data rows into {len(buckets['x'])} buckets of {self.conf['resample']} ({self.conf['aggregate']})"
+
+        return text
+
+    def print_resampling(self):
+        """
+        Print whether the report is based on resampled data
         """
-        Check for any outliers for the configured columns (IQR)
 
-        :param k: The factor to multiply the IQR by
-        :type k: float
-        :yields: A message dict
+        text = self.get_resampling_text()
+
+        if text:
+            print('Resampling:')
+            self.print_status(text, CassavaStatus.neutral, indent=INDENT)
+
+    def print_merge(self):
+        """
+        Print whether the report is based on the merged rows of multiple
+        input files, and in verbose mode, the number of data rows of each
         """
 
-        y0 = self.conf['first_data_row']
+        text = self.get_merge_text()
 
-        for ycol in self.conf['ycol']:
-            Y = self.get_y_axis_data(ycol)
-            stats = self.compute_stats(Y)
-            iqr = stats['q3'] - stats['q1']
+        if text:
+            print('Files:')
+            self.print_status(text, CassavaStatus.neutral, indent=INDENT)
 
-            # High outliers
-            for y in np.where(Y > stats['q3'] + k * iqr)[0]:
-                msg = {'x': ycol, 'y': y + y0, 'data': {'value': Y[y]}, 'status': CassavaStatus.error}
-                yield msg
+            if self.conf['verbose']:
+                for path, nrows in zip(self.merge_info['paths'], self.merge_info['nrows']):
+                    self.print_status(f'{path}: {nrows} data rows', CassavaStatus.neutral, indent=INDENT)
 
-            # Low outliers
-            for y in np.where(Y < stats['q1'] - k * iqr)[0]:
-                msg = {'x': ycol, 'y': y + y0, 'data': {'value': Y[y]}, 'status': CassavaStatus.error}
-                yield msg
+    def print_selection(self):
+        """
+        Print whether the report is based on a selection of the data rows
+        """
 
-    def print_bom(self):
+        text = self.get_selection_text()
+
+        if text:
+            print('Selection:')
+            self.print_status(text, CassavaStatus.neutral, indent=INDENT)
+
+    def print_sampling(self):
         """
-        Print whether the input file begins with an unnecessary BOM
+        Print whether the report is based on a sample of the data rows
         """
 
-        msg = self.check_bom()
+        text = self.get_sampling_text()
 
-        if msg['data']['has_bom']:
-            text = f"The effective encoding is utf-8 and the input begins with an unneccessary Byte Order Mark (BOM). This BOM is present in cell ({msg['x']},{msg['y']}) of the stored input. If this is undesirable, either remove the BOM or specify the encoding as utf-8-sig (see the --encoding option)"
-            self.print_status(text, msg['status'])
-        else:
-            if(self.conf['verbose']):
-                text = 'No unnecessary Byte Order Mark (BOM) found'
-                self.print_status(text, msg['status'])
+        if text:
+            print('Sampling:')
+            self.print_status(text, CassavaStatus.warn, indent=INDENT)
 
     def print_column_counts(self):
         """
@@ -891,6 +5040,48 @@ class Cassava(object):
         table = [msg for msg in self.compute_column_stats()]
         self.print_msg_table(table, indent=INDENT)
 
+    def print_column_profile(self, nsample=COLUMN_PROFILE_NSAMPLE):
+        """
+        Print the inferred type, value and missing value counts, conversion
+        failures, estimated number of distinct values, and minimum and
+        maximum of every column (see profile_columns())
+
+        :param nsample: The (max.) number of cells to infer each type from
+        :type nsample: int
+        """
+
+        def fmt(value):
+            if isinstance(value, float):
+                text = f'{value:.6g}'
+            elif isinstance(value, datetime.datetime):
+                text = value.strftime(self.conf['datetime_format'])
+            else:
+                text = '' if value is None else str(value)
+
+            return text if len(text) <= 24 else text[:21] + '...'
+
+        table, failures = [], []
+
+        for msg in self.profile_columns(nsample=nsample):
+            data = msg['data']
+            table.append({'x': msg['x'], 'y': None, 'data': {'label': fmt(data['label']), 'type': data['type'], 'values': data['nvalues'], 'missing': data['nmissing'], 'failures': data['nfailures'], 'distinct': f"~{data['cardinality']}", 'min': fmt(data['min']), 'max': fmt(data['max'])}, 'status': msg['status']})
+
+            if data['nfailures']:
+                failures.append(msg)
+
+        print('Column profile:')
+        self.print_msg_table(table, indent=INDENT, fmt='')
+
+        if failures:
+            print('Conversion failures:')
+
+            for msg in failures:
+                nfailures = msg['data']['nfailures']
+                rows = ','.join([str(row) for row in msg['data']['rows']])
+                more = ',...' if nfailures > len(msg['data']['rows']) else ''
+                text = f"column {msg['x']} ({msg['data']['type']}): {nfailures} cells (rows {rows}{more})"
+                self.print_status(text, msg['status'], indent=INDENT)
+
     def print_column_outliers_iqr(self, k=1.5):
         """
         Print any outliers for the configured columns
@@ -903,16 +5094,138 @@ class Cassava(object):
         table = [msg for msg in self.check_column_outliers_iqr(k=k)]
         self.print_msg_table(table, indent=INDENT)
 
-    def print_qc(self):
+    def print_time_axis(self, gap_factor=1.5):
+        """
+        Print the cadence, gaps and monotonicity of a datetime x-axis
+
+        :param gap_factor: The factor to multiply the cadence by
+        :type gap_factor: float
+        """
+
+        msgs = self.check_time_axis(gap_factor=gap_factor)
+        msg = next(msgs, None)
+
+        if msg is None:
+            return
+
+        print('Time axis:')
+        data = msg['data']
+        text = f"cadence = {data['cadence']}, steps = {data['nsteps']}, gaps = {data['ngaps']}, duplicates = {data['nduplicates']}, reversals = {data['nreversals']}"
+
+        if data['nmissing']:
+            text += f", missing = {data['nmissing']}"
+
+        self.print_status(text, msg['status'], indent=INDENT)
+
+        for msg in msgs:
+            data = msg['data']
+            step = f"-{-data['step']}" if data['step'] < datetime.timedelta(0) else f"{data['step']}"
+            text = f"{data['kind']}: rows {data['start_row']}-{data['end_row']}, steps = {data['nsteps']}, {'max' if data['kind'] == 'gap' else 'min'} step = {step}"
+            self.print_status(text, msg['status'], indent=INDENT)
+
+    def print_conversion_failures(self):
+        """
+        Print any cells that failed to convert and were forgiven
+        """
+
+        if not self.conf['forgive']:
+            return
+
+        print('Forgiven conversion failures:')
+
+        for msg in self.check_conversion_failures():
+            nfailures = msg['data']['nfailures']
+            rows = ','.join([str(row) for row in msg['data']['rows']])
+            more = ',...' if nfailures > len(msg['data']['rows']) else ''
+            text = f"column {msg['x']}: {nfailures} cells" + (f" (rows {rows}{more})" if nfailures else '')
+
+            if nfailures or self.conf['verbose']:
+                self.print_status(text, msg['status'], indent=INDENT)
+
+    def print_checks(self, names=None, **kwargs):
+        """
+        Print the results of the given checks (see get_check_results())
+
+        Only messages with a warn or error status are printed, unless in
+        verbose mode
+
+        :param names: The names of the checks (default all registered checks)
+        :type names: list
+        :param kwargs: Arbitrary keyword arguments for the checks (e.g. k)
+        :type kwargs: kwargs
+        """
+
+        registry = load_check_plugins()
+
+        for name, results in self.get_check_results(names, **kwargs).items():
+            check = registry[name]
+            print(f'{check.title or check.name}:')
+
+            # Only create the message dicts that are to be printed
+            if not self.conf['verbose']:
+                results = results.select([CassavaStatus.warn, CassavaStatus.error])
+
+            for msg in results:
+                self._print_check_msg(msg)
+
+    def _print_check_msg(self, msg):
+        """
+        Print the given check message dict, if it has a warn or error
+        status, or if in verbose mode
+
+        :param msg: The message dict
+        :type msg: dict
+        """
+
+        if msg['status'] in [CassavaStatus.warn, CassavaStatus.error] or self.conf['verbose']:
+            coords = []
+
+            if msg['x'] is not None:
+                coords.append(f"column {msg['x']}")
+            if msg['y'] is not None:
+                coords.append(f"row {msg['y']}")
+
+            data = ', '.join([f'{k} = {v}' for k, v in msg['data'].items()])
+            text = ': '.join([item for item in [', '.join(coords), data] if item])
+            self.print_status(text, msg['status'], indent=INDENT)
+
+    def print_qc(self, gap_factor=1.5):
         """
         Print QC checks
+
+        :param gap_factor: The factor to multiply the cadence by, for gaps in
+        a datetime x-axis
+        :type gap_factor: float
         """
 
-        self.print_bom()
-        self.print_column_counts()
+        self.print_merge()
+        self.print_selection()
+        self.print_sampling()
+
+        with self.profile_phase('check_bom'):
+            self.print_bom()
+
+        with self.profile_phase('check_column_counts', nrows=len(self.rows)):
+            self.print_column_counts()
+
         self.print_row_counts()
-        self.print_empty_columns()
-        self.print_empty_rows()
+
+        with self.profile_phase('check_empty_columns', nrows=len(self.rows)):
+            self.print_empty_columns()
+
+        with self.profile_phase('check_empty_rows', nrows=len(self.rows)):
+            self.print_empty_rows()
+
+        with self.profile_phase('check_time_axis', nrows=len(self.rows)):
+            self.print_time_axis(gap_factor=gap_factor)
+
+        # The checks don't convert the y-axis columns, so they're converted
+        # here to account for any cells that fail to convert
+        if self.conf['forgive']:
+            for col in self.conf['ycol'] or []:
+                self.get_y_axis_array(col)
+
+        self.print_conversion_failures()
 
     def print_stats(self, k=1.5, showfliers=True):
         """
@@ -924,8 +5237,483 @@ class Cassava(object):
         :type showfliers: bool
         """
 
-        self.print_column_stats()
+        self.print_merge()
+        self.print_selection()
+        self.print_sampling()
+        self.print_resampling()
+
+        with self.profile_phase('compute_column_stats'):
+            self.print_column_stats()
 
         if showfliers:
-            self.print_column_outliers_iqr(k=k)
+            with self.profile_phase('check_column_outliers_iqr'):
+                self.print_column_outliers_iqr(k=k)
+
+        self.print_conversion_failures()
+
+    def print_diff(self, base, key=None, tolerance=0.0):
+        """
+        Print the differences between the input file and the given base file
+        (see diff())
+
+        Only the first few rows of each kind of difference are printed,
+        unless in verbose mode
+
+        :param base: The base file, which must be open
+        :type base: Cassava
+        :param key: The key column (default the xcol config item)
+        :type key: int
+        :param tolerance: The largest absolute difference between equal values
+        :type tolerance: float
+        """
+
+        results = self.diff(base, key=key, tolerance=tolerance)
+        info = self.diff_info
+
+        print('Diff:')
+        self.print_status(f"{info['base_path']} ({info['base_nrows']} data rows) -> {self.path} ({info['nrows']} data rows), key column {info['key']}, tolerance = {info['tolerance']}", CassavaStatus.neutral, indent=INDENT)
+        status = CassavaStatus.warn if len(results) else CassavaStatus.ok
+        self.print_status(f"added = {info['added']}, removed = {info['removed']}, changed = {info['changed']} ({info['changed_cells']} cells), unchanged = {info['unchanged']}, duplicates = {info['duplicates']}", status, indent=INDENT)
+
+        for kind, title in [('added', 'Added rows'), ('removed', 'Removed rows'), ('changed', 'Changed cells'), ('duplicate', 'Duplicate keys in the base file')]:
+            selected = results[results.data['kind'] == kind]
+
+            if not len(selected):
+                continue
+
+            print(f'{title}:')
+            n = len(selected) if self.conf['verbose'] else min(len(selected), MAX_FAILURE_ROWS)
+
+            for msg in selected[:n]:
+                data = msg['data']
+
+                if kind == 'added':
+                    text = f"row {msg['y']}: key = {data['key']}"
+                elif kind == 'changed':
+                    text = f"column {msg['x']}, row {msg['y']} (base row {data['base_row']}): key = {data['key']}, {data['base_value']} -> {data['value']}"
+                else:
+                    text = f"base row {data['base_row']}: key = {data['key']}"
+
+                self.print_status(text, msg['status'], indent=INDENT)
+
+            if len(selected) > n:
+                self.print_status(f'... and {len(selected) - n} more', selected.get_message(n)['status'], indent=INDENT)
+
+    def print_export(self, path, k=1.5, flags=False):
+        """
+        Write a cleaned copy of the input file to the given path (see
+        export_csv()), and unless writing to stdout, print the number of
+        cells of each configured column with each flag
+
+        :param path: The output file path, or - for stdout
+        :type path: str
+        :param k: The factor to multiply the IQR by
+        :type k: float
+        :param flags: Whether to append flag columns
+        :type flags: bool
+        """
+
+        msgs = self.export_csv(path, k=k, flags=flags)
+
+        if path == '-':
+            return
+
+        print('Export:')
+        self.print_status(f"wrote {self.export_info['nrows']} data rows to {path}", CassavaStatus.neutral, indent=INDENT)
+
+        for msg in msgs:
+            low, high = self.export_info['fences'][msg['x']]
+            nvalues = self.export_info['nvalues'][msg['x']]
+            estimated = f', estimated from a sample of {QUANTILE_NSAMPLE} of {nvalues} values' if nvalues > QUANTILE_NSAMPLE else ''
+            text = f"column {msg['x']}: " + ', '.join([f'{flag} = {n}' for flag, n in msg['data'].items()]) + f' (fences {low:.2g} to {high:.2g}{estimated})'
+            self.print_status(text, msg['status'], indent=INDENT)
+
+    def print_profile(self):
+        """
+        Print the profile summary as a phase breakdown
+
+        Nested phases are indented under their enclosing phases, and their
+        times are included in those of the enclosing phases.  The parser
+        engine that read the input file is also printed
+        """
+
+        memory = self.conf['profile_memory']
+        print('Profile:')
+        header = f"{'phase':<32}{'calls':>6}{'wall (s)':>10}{'cpu (s)':>10}{'rows':>12}{'rows/s':>12}{'MB/s':>10}"
+
+        if memory:
+            header += f"{'net MB':>10}{'peak MB':>10}{'max RSS MB':>12}"
+
+        self.print_status(header, CassavaStatus.neutral, indent=INDENT)
+
+        for item in self.get_profile_summary():
+            name = ' ' * 2 * item['depth'] + item['phase']
+            nrows = '' if item['nrows'] is None else item['nrows']
+            rows_per_sec = '' if item['rows_per_sec'] is None else f"{item['rows_per_sec']:.3g}"
+            mb_per_sec = '' if item['bytes_per_sec'] is None else f"{item['bytes_per_sec'] / 1e6:.3g}"
+            text = f"{name:<32}{item['calls']:>6}{item['wall']:>10.3f}{item['cpu']:>10.3f}{nrows:>12}{rows_per_sec:>12}{mb_per_sec:>10}"
+
+            if memory:
+                mb = ['' if item.get(key) is None else f'{item[key] / 1e6:.1f}' for key in ['mem_net', 'mem_peak', 'max_rss']]
+                text += f'{mb[0]:>10}{mb[1]:>10}{mb[2]:>12}'
+
+            self.print_status(text, CassavaStatus.undefined, indent=INDENT)
+
+        if self.engine is not None:
+            self.print_status(f'parser engine = {self.engine}', CassavaStatus.undefined, indent=INDENT)
+
+        if memory:
+            est = self.estimate_rows_memory()
+
+            if est['bytes_per_cell'] is not None:
+                text = f"rows memory (estimated) = {est['nbytes'] / 1e6:.1f} MB for {est['ncells']} cells, {est['bytes_per_cell']:.1f} bytes per cell"
+                self.print_status(text, CassavaStatus.undefined, indent=INDENT)
+
+@register_check
+class BomCheck(CassavaCheck):
+    """
+    Check if the input file begins with an unnecessary Byte Order Mark (BOM)
+    """
+
+    name = 'bom'
+    title = 'BOM'
+    inputs = {'rows'}
+
+    def run(self, f, inputs, **kwargs):
+        yield f.check_bom(rows=inputs['rows'])
+
+@register_check
+class ColumnCountsCheck(CassavaCheck):
+    """
+    Check that the number of columns is consistent for all rows
+    """
+
+    name = 'column_counts'
+    title = 'Column counts'
+    inputs = {'row_lengths'}
+
+    def results(self, f, inputs, **kwargs):
+        y0 = f.conf['first_data_row']
+        ncols = inputs['row_lengths'][y0:]
+        ys = np.arange(y0, y0 + len(ncols))
+        status = np.where(ncols == ncols[:1], CassavaStatus.ok.value, CassavaStatus.error.value)
+
+        return CassavaResults(len(ncols), y=f.get_row_numbers(ys), status=status, data={'is_first_row': ys == y0, 'ncols': ncols})
+
+@register_check
+class EmptyColumnsCheck(CassavaCheck):
+    """
+    Check for any columns that are wholly empty
+    """
+
+    name = 'empty_columns'
+    title = 'Empty columns'
+    inputs = {'column_is_empty'}
+
+    def results(self, f, inputs, **kwargs):
+        is_empty = inputs['column_is_empty']
+        status = np.where(is_empty, CassavaStatus.error.value, CassavaStatus.ok.value)
+
+        return CassavaResults(len(is_empty), x=np.arange(len(is_empty)), status=status, data={'is_empty': is_empty})
+
+@register_check
+class EmptyRowsCheck(CassavaCheck):
+    """
+    Check for any rows that are wholly empty
+    """
+
+    name = 'empty_rows'
+    title = 'Empty rows'
+    inputs = {'row_is_empty'}
+
+    def results(self, f, inputs, **kwargs):
+        is_empty = inputs['row_is_empty']
+        status = np.where(is_empty, CassavaStatus.error.value, CassavaStatus.ok.value)
+
+        return CassavaResults(len(is_empty), y=f.get_row_numbers(np.arange(len(is_empty))), status=status, data={'is_empty': is_empty})
+
+@register_check
+class ColumnStatsCheck(CassavaCheck):
+    """
+    Compute column statistics for the configured columns
+    """
+
+    name = 'column_stats'
+    title = 'Column stats'
+    inputs = {'columns'}
+
+    def run(self, f, inputs, **kwargs):
+        for ycol, Y in inputs['columns'].items():
+            yield {'x': ycol, 'y': None, 'data': f.compute_stats(Y), 'status': CassavaStatus.ok}
+
+@register_check
+class ColumnOutliersIqrCheck(CassavaCheck):
+    """
+    Check for any outliers for the configured columns (IQR)
+    """
+
+    name = 'column_outliers_iqr'
+    title = 'Column outliers'
+    inputs = {'columns'}
+
+    def results(self, f, inputs, k=1.5, **kwargs):
+        y0 = f.conf['first_data_row']
+        xs, ys, values = [], [], []
+
+        for ycol, Y in inputs['columns'].items():
+            low, high = f.get_iqr_fences(f.compute_stats(Y), k=k)
+
+            # High outliers, then low outliers, as check_column_outliers_iqr()
+            y = np.concatenate((np.where(Y > high)[0], np.where(Y < low)[0]))
+            xs.append(np.full(len(y), ycol))
+            ys.append(f.get_row_numbers(y + y0))
+            values.append(Y[y])
+
+        x, y = np.concatenate(xs or [[]]), np.concatenate(ys or [[]])
+
+        return CassavaResults(len(x), x=x, y=y, status=CassavaStatus.error, data={'value': np.concatenate(values or [[]])})
+
+@register_check
+class TimeAxisCheck(CassavaCheck):
+    """
+    Check the cadence, gaps and monotonicity of a datetime x-axis
+    """
+
+    name = 'time_axis'
+    title = 'Time axis'
+    inputs = {'x_axis'}
+
+    def run(self, f, inputs, gap_factor=1.5, **kwargs):
+        yield from f.check_time_axis(gap_factor=gap_factor)
+
+@register_engine
+class CsvEngine(CassavaEngine):
+    """
+    Parse the input file with the csv module, which handles any quoting
+    """
+
+    name = 'csv'
+
+    def reader(self, f, fp):
+        return csv.reader(fp, delimiter=f.conf['delimiter'], skipinitialspace=f.conf['skip_initial_space'])
+
+@register_engine
+class SplitEngine(CassavaEngine):
+    """
+    Parse the input file by splitting its lines on the delimiter
+
+    The lines are read in blocks, and a block without any quote characters
+    is split directly, which is faster than the csv module.  From the first
+    block that contains a quote character, the rest of the file is parsed
+    with the csv module, so quoted cells are still parsed correctly
+    """
+
+    name = 'split'
+
+    def sniff(self, f, lines):
+        return not f.conf['skip_initial_space'] and not any([csv.excel.quotechar in line for line in lines])
+
+    def reader(self, f, fp):
+        delimiter = f.conf['delimiter']
+
+        while True:
+            lines = list(itertools.islice(fp, CHUNK_NROWS))
+
+            if not lines:
+                break
+
+            if f.conf['skip_initial_space'] or csv.excel.quotechar in ''.join(lines):
+                yield from CsvEngine().reader(f, itertools.chain(lines, fp))
+                break
+
+            # As for the csv module, an empty line is an empty row
+            rows = [line.rstrip('\r\n').split(delimiter) for line in lines]
+            yield from [row if row != [''] else [] for row in rows]
+
+@register_engine
+class NumericEngine(SplitEngine):
+    """
+    Parse a purely numeric input file in bulk
+
+    The raw bytes of the data rows are converted straight to an array of
+    floats for each column, by pyarrow's multi-threaded CSV parser if the
+    optional pyarrow package is installed, otherwise by NumPy.  The rows are
+    held as a CassavaNumericRows object, so a row is only split into cell
+    strings when it's accessed.  The data rows must all have the same
+    number of cells, each a number or a missing value, and be ASCII and
+    unquoted.  Otherwise, when the engine was chosen automatically, the file
+    is read by one of the other engines.  When the rows are streamed rather
+    than read in bulk (e.g. to select or sample them, or to merge files),
+    they're parsed as by the split engine
+    """
+
+    name = 'numeric'
+    bulk = True
+
+    def sniff(self, f, lines):
+        if not lines or '' in f.get_missing_values() or not super().sniff(f, lines):
+            return False
+
+        missing_values = set(f.get_missing_values())
+        ncols = None
+
+        for line in lines:
+            cells = line.rstrip('\r\n').split(f.conf['delimiter'])
+            ncols = ncols or len(cells)
+
+            if len(cells) != ncols:
+                return False
+
+            for cell in cells:
+                if cell not in missing_values:
+                    try:
+                        float(cell)
+                    except ValueError:
+                        return False
+
+        return True
+
+    def read(self, f, fp):
+        delimiter = f.conf['delimiter']
+        missing_values = f.get_missing_values()
+        y0 = f.conf['first_data_row']
+
+        try:
+            fp.buffer.seek(0, 0)
+            raw = fp.buffer.read()
+        except AttributeError:
+            return self._fail(f, fp, 'the file has no underlying binary buffer')
+        finally:
+            fp.seek(0, 0)
+
+        sample = f'0123456789.{delimiter}\n'
+
+        if f.conf['skip_initial_space'] or '' in missing_values or not sample.isascii() or sample.encode(fp.encoding) != sample.encode('ascii'):
+            return self._fail(f, fp, 'the configuration or encoding is not supported')
+
+        # The rows before the first data row are parsed as by the csv engine
+        offset = 0
+
+        for y in range(y0):
+            offset = raw.find(b'\n', offset) + 1
+
+            if not offset:
+                return self._fail(f, fp, 'there are no data rows')
+
+        head = list(CsvEngine().reader(f, io.TextIOWrapper(io.BytesIO(raw[:offset]), encoding=fp.encoding)))
+        data = raw[offset:]
+
+        if len(head) != y0:
+            return self._fail(f, fp, 'the rows before the first data row could not be separated')
+
+        if not data.isascii() or csv.excel.quotechar.encode() in data:
+            return self._fail(f, fp, 'the data rows are not all ASCII and unquoted')
+
+        if b'\r' in data:
+            data = data.replace(b'\r\n', b'\n')
+
+            if b'\r' in data:
+                return self._fail(f, fp, 'the data rows have inconsistent line endings')
+
+        if data.endswith(b'\n'):
+            data = data[:-1]
+
+        if not data:
+            return self._fail(f, fp, 'there are no data rows')
+
+        ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n'))
+        starts = np.concatenate([[0], ends + 1])
+        ends = np.append(ends, len(data))
+
+        if (starts == ends).any():
+            return self._fail(f, fp, 'there are empty rows')
+        ncols = data[:ends[0]].count(delimiter.encode()) + 1
+        result = self._parse(data, starts, ends, ncols, delimiter, missing_values)
+
+        if result is None:
+            return self._fail(f, fp, 'the data rows are not all numeric, with the same number of cells')
+
+        return CassavaNumericRows(head, data, starts, ends, result[0], result[1], delimiter, missing_values)
+
+    def _fail(self, f, fp, reason):
+        """
+        Fail to read the given file in bulk
+
+        :param f: The Cassava object
+        :type f: Cassava
+        :param fp: The file
+        :type fp: file object
+        :param reason: The reason
+        :type reason: str
+        :returns: None, so that the file is read by another engine, unless
+        this engine was configured, when ValueError is raised
+        :rtype: None
+        """
+
+        if f.conf['engine'] == self.name:
+            raise ValueError(f'The numeric engine cannot read {fp.name}: {reason}')
+
+        return None
+
+    def _parse(self, data, starts, ends, ncols, delimiter, missing_values):
+        """
+        Parse the data rows with pyarrow, if installed, otherwise NumPy
+
+        :returns: The values and missing value masks of each column, or None
+        if the data rows can't be parsed
+        :rtype: tuple
+        """
+
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+        except ImportError:
+            return self._parse_numpy(data, starts, ends, ncols, delimiter, missing_values)
+
+        names = [str(x) for x in range(ncols)]
+        read_options = pacsv.ReadOptions(column_names=names)
+        parse_options = pacsv.ParseOptions(delimiter=delimiter, quote_char=False, ignore_empty_lines=False)
+        convert_options = pacsv.ConvertOptions(column_types={name: pa.float64() for name in names}, null_values=missing_values, strings_can_be_null=False)
+
+        try:
+            table = pacsv.read_csv(io.BytesIO(data), read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+        except pa.ArrowInvalid:
+            return None
+
+        if table.num_rows != len(starts):
+            return None
+
+        columns = [column.to_numpy() for column in table.columns]
+        missing = [column.is_null().to_numpy() if column.null_count else None for column in table.columns]
+
+        return columns, missing
+
+    def _parse_numpy(self, data, starts, ends, ncols, delimiter, missing_values):
+        """
+        Parse the data rows with NumPy (see _parse())
+
+        :returns: The values and missing value masks of each column, or None
+        if the data rows can't be parsed
+        :rtype: tuple
+        """
+
+        sep = delimiter.encode()
+        positions = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord(sep))
+        counts = np.searchsorted(positions, ends) - np.searchsorted(positions, starts)
+
+        if (counts != ncols - 1).any():
+            return None
+
+        tokens = np.array(data.replace(b'\n', sep).split(sep))
+        mask = np.isin(tokens, [value.encode() for value in missing_values if value.isascii()])
+        tokens = np.where(mask, b'nan', tokens)
+
+        try:
+            values = tokens.astype(np.float64)
+        except ValueError:
+            return None
+
+        columns = list(values.reshape(-1, ncols).T.copy())
+        missing = [m if m.any() else None for m in mask.reshape(-1, ncols).T.copy()]
 
+        return columns, missing
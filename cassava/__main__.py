@@ -1,13 +1,26 @@
+import os
+import io
+import sys
+import glob
 import argparse
 import json
+import contextlib
+import cProfile
 
-from cassava import Cassava, __version__, ENCODING
+import cassava
+from cassava import Cassava, CassavaStatus, __version__, ENCODING, AGGREGATES, MAX_PLOT_POINTS, ENGINES, INDENT, QUANTILE_NSAMPLE
+from cassava.manifest import Manifest, IGNORED_CONF_KEYS
+from cassava.history import ResultsHistory
 
 DEF_OPT_DELIMITER = ','
 DEF_OPT_RANGE_DELIMITER = '-'
 COMMANDS = {
-    'plot': {'subcommands': ['qc','stats']},
-    'print': {'subcommands': ['qc','stats']}
+    'plot': {'subcommands': ['qc','stats','overview']},
+    'print': {'subcommands': ['qc','stats','checks','profile']},
+    'serve': {'subcommands': []},
+    'diff': {'subcommands': [], 'args': {'base_file': 'base input file, that the input file is compared with'}},
+    'export': {'subcommands': [], 'args': {'out_file': 'output file for the cleaned copy of the input file, or - for stdout'}},
+    'query': {'subcommands': [], 'args': {'sql': 'SQL query over the results database (see --results-db), which is given as the input file'}}
 }
 
 def str_range_list_to_list(x, item_sep=DEF_OPT_DELIMITER, range_sep=DEF_OPT_RANGE_DELIMITER):
@@ -38,10 +51,54 @@ def str_range_list_to_list(x, item_sep=DEF_OPT_DELIMITER, range_sep=DEF_OPT_RANG
 
     return y
 
-def parse_cmdln():
+def str_slice_to_tuple(x, sep=':'):
+    """
+    Convert a string slice to a tuple
+
+    For example, given '100:200', return (100, 200).  Either end-point can
+    be omitted, so given '100:', return (100, None)
+
+    :param x: String slice specification
+    :type x: str
+    :param sep: The separator between the slice end-points in the string
+    :type sep: str
+    :returns: The slice end-points
+    :rtype: tuple
+    """
+
+    lim = x.split(sep)
+
+    if len(lim) != 2:
+        raise ValueError(f'Invalid slice specification: {x}')
+
+    return tuple([int(i) if i else None for i in lim])
+
+def str_to_positive_int(x):
+    """
+    Convert a string to a positive integer
+
+    :param x: String integer
+    :type x: str
+    :returns: The integer
+    :rtype: int
+    """
+
+    try:
+        i = int(x)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid int value: {x!r}')
+
+    if i < 1:
+        raise argparse.ArgumentTypeError(f'must be a positive integer: {x}')
+
+    return i
+
+def parse_cmdln(argv=None):
     """
     Parse the command line
 
+    :param argv: The command line arguments (default sys.argv[1:])
+    :type argv: list
     :returns: An object containing the command line arguments and options
     :rtype: argparse.Namespace
     """
@@ -61,6 +118,27 @@ python3 -m cassava -H 0 -i 1 -x 0 -d -f '%d/%m/%Y %H:%M:%S' -y 1,2,3 plot qc inp
 and this will print a QC report, instead of plotting:
 
 python3 -m cassava -H 0 -i 1 -x 0 -d -f '%d/%m/%Y %H:%M:%S' -y 1,2,3 print qc input.csv
+
+To avoid the start-up cost of each invocation, run a long-lived server listening on a Unix domain socket (here, the input file is the socket path):
+
+python3 -m cassava serve /tmp/cassava.sock
+
+and then send the same command lines to it:
+
+python3 -m cassava --remote /tmp/cassava.sock -H 0 -i 1 -x 0 -d -f '%d/%m/%Y %H:%M:%S' -y 1,2,3 print qc input.csv
+
+To compare a new version of the file with an old one, matching rows by their datetimes and reporting values that differ by more than 0.01:
+
+python3 -m cassava -C -x 0 -y 1,2,3 --tolerance 0.01 diff old.csv input.csv
+
+To write a cleaned copy of the file, with missing values and unconvertible values as empty cells, and a flag column for each y-axis column:
+
+python3 -m cassava -C -x 0 -y 1,2,3 -m -999 -F --flags export cleaned.csv input.csv
+
+To record the results of the checks of each run in a database, and then query them:
+
+python3 -m cassava -C -x 0 -d -y 1,2,3 --results-db results.db print checks input.csv
+python3 -m cassava query "SELECT path, run_at, nerror FROM check_summary WHERE check_name = 'empty_rows'" results.db
 """
 
     parser = argparse.ArgumentParser(description='plot and quality-check CSV (or similarly-delimited) data files', epilog=epilog, formatter_class=argparse.RawDescriptionHelpFormatter, prog='cassava')
@@ -73,6 +151,14 @@ python3 -m cassava -H 0 -i 1 -x 0 -d -f '%d/%m/%Y %H:%M:%S' -y 1,2,3 print qc in
     for command in COMMANDS:
         sub = subparsers.add_parser(command)
         sub.set_defaults(command=command)
+        sub.set_defaults(subcommand=None)
+
+        for arg, help in COMMANDS[command].get('args', {}).items():
+            sub.add_argument(arg, help=help)
+
+        if not COMMANDS[command]['subcommands']:
+            continue
+
         subsubparsers = sub.add_subparsers(help="subcommands")
 
         sub.set_defaults(subcommand=COMMANDS[command]['subcommands'][0])
@@ -81,7 +167,7 @@ python3 -m cassava -H 0 -i 1 -x 0 -d -f '%d/%m/%Y %H:%M:%S' -y 1,2,3 print qc in
             subsub = subsubparsers.add_parser(subcommand)
             subsub.set_defaults(subcommand=subcommand)
 
-    parser.add_argument('in_file', help='input file')
+    parser.add_argument('in_file', help='input file, or a quoted glob pattern of files with the same header, that are merged by their x-axis values into a single dataset')
     parser.add_argument('-e', '--encoding', help='character encoding of the input file', dest='encoding', type=str, default=ENCODING)
     parser.add_argument('-H', '--header-row', help='row containing the header', dest='header_row', type=int, default=Cassava.DEFAULTS['header_row'])
     parser.add_argument('-i', '--first-data-row', help='first row containing data to plot', dest='first_data_row', default=Cassava.DEFAULTS['first_data_row'], type=int)
@@ -91,21 +177,63 @@ python3 -m cassava -H 0 -i 1 -x 0 -d -f '%d/%m/%Y %H:%M:%S' -y 1,2,3 print qc in
     parser.add_argument('-y', '--y-column', help='column containing values for the y-axis (specify multiple columns separated by commas and/or as ranges to plot multiple curves on y-axis)', dest='ycol', default=str(Cassava.DEFAULTS['ycol'][0]), type=str)
     parser.add_argument('-d', '--x-as-datetime', help='treat the x-axis values as datetimes', action='store_true', default=Cassava.DEFAULTS['x_as_datetime'])
     parser.add_argument('-f', '--datetime-format', help='datetime format specification', dest='datetime_format', default=Cassava.DEFAULTS['datetime_format'])
-    parser.add_argument('-m', '--missing-value', help='value to be treated as missing data', dest='missing_value', default=Cassava.DEFAULTS['missing_value'])
+    parser.add_argument('-m', '--missing-value', help='value to be treated as missing data (specify multiple values separated by commas)', dest='missing_value', default=Cassava.DEFAULTS['missing_value'])
     parser.add_argument('-l', '--delimiter', help='alternative delimiter', dest='delimiter', default=Cassava.DEFAULTS['delimiter'], type=str)
     parser.add_argument('-s', '--skip-initial-space', help='ignore whitespace immediately following the delimiter', dest='skip_initial_space', action='store_true', default=Cassava.DEFAULTS['skip_initial_space'])
     parser.add_argument('-F', '--forgive', help='be forgiving when parsing numeric data', dest='forgive', action='store_true', default=Cassava.DEFAULTS['forgive'])
+    parser.add_argument('--sample', help='only read a uniformly random (reservoir) sample of at most N data rows, for a quick look at large files', dest='sample', metavar='N', default=Cassava.DEFAULTS['sample'], type=str_to_positive_int)
+    parser.add_argument('--sample-every', help='only read every Kth data row (systematic sampling)', dest='sample_every', metavar='K', default=Cassava.DEFAULTS['sample_every'], type=str_to_positive_int)
+    parser.add_argument('--sample-seed', help='seed for the random number generator used by --sample, for a reproducible sample', dest='sample_seed', default=Cassava.DEFAULTS['sample_seed'], type=int)
+    parser.add_argument('--start', help='only read the data rows whose x-axis values are at or after START (an ISO 8601 or --datetime-format datetime, or a number).  The data rows must be sorted by their x-axis values', dest='start', default=Cassava.DEFAULTS['start'])
+    parser.add_argument('--end', help='only read the data rows whose x-axis values are at or before END (see --start)', dest='end', default=Cassava.DEFAULTS['end'])
+    parser.add_argument('--rows', help='only read the data rows A to B - 1 of the input file (either can be omitted, e.g. 1000:)', dest='row_range', metavar='A:B', default=Cassava.DEFAULTS['row_range'], type=str_slice_to_tuple)
+
+    parser.add_argument('--checks', help='checks to run for the checks subcommand, separated by commas (default all registered checks, including any plugins)', dest='checks', default=None, type=lambda x: x.split(DEF_OPT_DELIMITER))
+
+    parser.add_argument('--key', help='key column that the rows are matched by, for the diff command (default the x-axis column)', dest='key', default=None, type=int)
+    parser.add_argument('--tolerance', help='largest absolute difference between values that are reported as unchanged, for the diff command', dest='tolerance', default=0.0, type=float)
+
+    parser.add_argument('--flags', help=f'for the export command, append a flag column for each y-axis column, holding missing, invalid or outlier for cells that were missing values, failed to convert (see -F) or are outliers (see -k). For a column of more than {QUANTILE_NSAMPLE} values, the outlier fences are estimated from a sample of its values, and unlike print qc, --resample does not apply', dest='flags', action='store_true', default=False)
 
+    parser.add_argument('--engine', help='parser engine (default auto, chosen from a sample of the input file): csv handles any quoting, split is faster for unquoted files, and numeric is much faster for purely numeric files', dest='engine', choices=['auto'] + list(ENGINES), default=Cassava.DEFAULTS['engine'])
+    parser.add_argument('--dtype', help='floating point type of the converted columns (float32 halves the memory used, with about 7 significant digits)', dest='dtype', choices=['float32', 'float64'], default=Cassava.DEFAULTS['dtype'])
+
+    parser.add_argument('--resample', help='aggregate the data in buckets of this width before plotting or computing stats, e.g. 1min, 1h, 1d for a datetime x-axis (units ms, s, min, h, d, w), otherwise in the units of the x-axis', dest='resample', metavar='WIDTH', default=Cassava.DEFAULTS['resample'])
+    parser.add_argument('--aggregate', help='aggregate of each bucket, for --resample', dest='aggregate', choices=AGGREGATES, default=Cassava.DEFAULTS['aggregate'])
+
+    parser.add_argument('--all-columns', help='for the stats subcommand of the print command, compute the stats of every numeric column other than the x-axis column, rather than the y-axis columns, in parallel (see --workers)', dest='all_columns', action='store_true', default=Cassava.DEFAULTS['all_columns'])
     parser.add_argument('-N', '--plot-in-n-columns', help='number of columns for a multi-plot grid', dest='ncols', default=None, type=int)
     parser.add_argument('-k', '--tukey-fence-factor', help="factor to multiply IQR by in Tukey's rule", dest='k', default=1.5, type=float)
+    parser.add_argument('--gap-factor', help='factor to multiply the inferred cadence of a datetime x-axis by, for a step to be reported as a gap', dest='gap_factor', default=1.5, type=float)
+    parser.add_argument('--overview-bins', help='maximum number of bins of rows for the overview subcommand', dest='overview_bins', default=500, type=int)
+    parser.add_argument('--interactive', help='for the plot qc subcommand, draw a decimated view of large data, and redraw the visible range at a higher resolution when zooming or panning, down to every data row', dest='interactive', action='store_true', default=False)
+    parser.add_argument('--max-points', help='maximum number of points drawn for each curve, for --interactive', dest='max_points', metavar='N', default=MAX_PLOT_POINTS, type=int)
     parser.add_argument('-O', '--hide-outliers', help="don't show outliers on stats plots", dest='showfliers', action='store_false', default=True)
     parser.add_argument('-P', '--plot-options', help="options for the plot, specified as a simple JSON object", dest='plot_opts', default={}, type=json.loads)
     parser.add_argument('-S', '--scatter-plot', help="set plot options (see -P) to produce a scatter plot", dest='plot_opts', action='store_const', const={'marker': '.', 'ls': ''})
 
+    parser.add_argument('--progress', help='show the progress and throughput of reading and processing the input file, on the terminal, or as log lines on stderr if stdout is not a terminal', dest='progress', action='store_true', default=Cassava.DEFAULTS['progress'])
+    parser.add_argument('--profile', help='print a breakdown of the time spent in each processing phase', dest='profile', action='store_true', default=Cassava.DEFAULTS['profile'])
+    parser.add_argument('--profile-out', help='write the --profile breakdown as JSON to the given file instead of printing it (implies --profile)', dest='profile_out', default=None, metavar='FILE')
+    parser.add_argument('--profile-memory', help='also report the net and peak memory allocated in each processing phase (implies --profile, and slows processing considerably)', dest='profile_memory', action='store_true', default=Cassava.DEFAULTS['profile_memory'])
+    parser.add_argument('--profile-stats', help='write cProfile statistics for the whole run to the given file (see the pstats module)', dest='profile_stats_out', default=None, metavar='FILE')
+
+    parser.add_argument('--keep-going', help='with --manifest, carry on checking the remaining files when a file fails, and list the failed files at the end', dest='keep_going', action='store_true', default=False)
+    parser.add_argument('--manifest', help='run the print command separately on each input file matching the glob pattern, recording the output in the given SQLite manifest, and print the recorded output of the files that are unchanged since the command was last run on them with the same options, rather than checking them again', dest='manifest', default=None, metavar='FILE')
+
+    parser.add_argument('--results-db', help='also run the checks (see --checks) for the qc, stats or checks subcommands of the print command, and record their results in the given SQLite database, for the query command', dest='results_db', default=None, metavar='FILE')
+
+    parser.add_argument('--remote', help='send the command line to the cassava server listening on the given Unix domain socket, instead of running it in this process (see the serve command)', dest='remote', default=None, metavar='SOCKET')
+    parser.add_argument('--workers', help='number of requests the server runs concurrently, or of threads that compute column stats (default the number of CPUs)', dest='workers', default=Cassava.DEFAULTS['workers'], type=int)
+    parser.add_argument('--cache-size', help='maximum number of parsed files the server keeps in its cache', dest='cache_size', default=32, type=int)
+
     parser.add_argument('-v', '--verbose', help='emit verbose messages', dest='verbose', action='store_true', default=Cassava.DEFAULTS['verbose'])
     parser.add_argument('-V', '--version', action='version', version=f"%(prog)s {__version__}")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if args.profile_memory or args.profile_out:
+        args.profile = True
 
     # This is shorthand for a common header configuration
     if args.common_header_row:
@@ -117,6 +245,10 @@ python3 -m cassava -H 0 -i 1 -x 0 -d -f '%d/%m/%Y %H:%M:%S' -y 1,2,3 print qc in
     if args.delimiter == '\\t':
         args.delimiter = '\t'
 
+    # missing_value option can have multiple delimited values
+    if args.missing_value is not None and DEF_OPT_DELIMITER in args.missing_value:
+        args.missing_value = args.missing_value.split(DEF_OPT_DELIMITER)
+
     # ycol option can have multiple delimited values
     if DEF_OPT_DELIMITER in str(args.ycol) or DEF_OPT_RANGE_DELIMITER in str(args.ycol):
         args.ycol = str_range_list_to_list(args.ycol)
@@ -130,15 +262,197 @@ python3 -m cassava -H 0 -i 1 -x 0 -d -f '%d/%m/%Y %H:%M:%S' -y 1,2,3 print qc in
 
     return args
 
-def main():
+def run_file(in_file, encoding, command, subcommand, args, conf, cls=Cassava):
     """
-    Main function
+    Run the given command on the given input file
+
+    :param in_file: The input file path, or a list of paths of files that
+    are read as a single dataset
+    :type in_file: str or list
+    :param encoding: The character encoding of the input file
+    :type encoding: str
+    :param command: The command
+    :type command: str
+    :param subcommand: The subcommand
+    :type subcommand: str
+    :param args: The command line arguments and options
+    :type args: argparse.Namespace
+    :param conf: The configuration
+    :type conf: dict
+    :param cls: The class used to read and process the input file
+    :type cls: Cassava or a subclass
+    :returns: The object that processed the input file
+    :rtype: Cassava
     """
 
-    args = parse_cmdln()
-    conf = Cassava.DEFAULTS.copy()
     mode = 'r'
 
+    with cls(path=in_file, mode=mode, encoding=encoding, conf=conf) as f:
+        with f.show_progress(), f.profile_phase('main', detail=f'{command} {subcommand}'):
+            # These stream the input file, rather than reading it all
+            if command not in ['diff', 'export'] and (command, subcommand) != ('print', 'profile'):
+                f.read()
+
+            if command == 'plot':
+                if subcommand == 'qc':
+                    if args.ncols:
+                        layout = f.compute_multi_plot_layout(args.ncols)
+                    else:
+                        layout = (1,1)
+
+                    f.plot(layout=layout, opts=args.plot_opts, max_points=args.max_points if args.interactive else None)
+                elif subcommand == 'stats':
+                    f.plot_stats(k=args.k, showfliers=args.showfliers)
+                elif subcommand == 'overview':
+                    f.plot_overview(nbins=args.overview_bins, opts=args.plot_opts)
+                else:
+                    raise ValueError('Unsupported subcommand')
+            elif command == 'print':
+                if subcommand == 'qc':
+                    f.print_qc(gap_factor=args.gap_factor)
+                elif subcommand == 'stats':
+                    f.print_stats(k=args.k, showfliers=args.showfliers)
+                elif subcommand == 'checks':
+                    f.print_checks(args.checks, k=args.k, gap_factor=args.gap_factor)
+                elif subcommand == 'profile':
+                    f.print_column_profile()
+                else:
+                    raise ValueError('Unsupported subcommand')
+
+                if args.results_db:
+                    record_results(f, args, conf)
+            elif command == 'export':
+                f.print_export(args.out_file, k=args.k, flags=args.flags)
+            elif command == 'diff':
+                with cls(path=args.base_file, mode=mode, encoding=encoding, conf=conf.copy()) as base:
+                    f.print_diff(base, key=args.key, tolerance=args.tolerance)
+            else:
+                raise ValueError('Unsupported command')
+
+    return f
+
+def record_results(f, args, conf):
+    """
+    Run the checks on the given input file and record their results in the
+    results database (see ResultsHistory)
+
+    :param f: The object that processed the input file
+    :type f: Cassava
+    :param args: The command line arguments and options
+    :type args: argparse.Namespace
+    :param conf: The configuration
+    :type conf: dict
+    """
+
+    paths = f.path if isinstance(f.path, (list, tuple)) else [f.path]
+    path = os.pathsep.join([os.path.realpath(path) for path in paths])
+    nrows = max(0, len(f.rows) - f.conf['first_data_row'])
+
+    with f.profile_phase('record_results'):
+        results = f.get_check_results(args.checks, k=args.k, gap_factor=args.gap_factor)
+
+        with ResultsHistory(args.results_db) as history:
+            history.put_run(path, nrows, {key: value for key, value in conf.items() if key not in IGNORED_CONF_KEYS}, results)
+
+def run_query(path, sql, conf):
+    """
+    Run the given SQL query over the given results database, and print the
+    result rows as a table
+
+    :param path: The path of the results database
+    :type path: str
+    :param sql: The SQL query
+    :type sql: str
+    :param conf: The configuration
+    :type conf: dict
+    """
+
+    # This also reports any errors, as for the other commands
+    f = Cassava(conf=conf)
+
+    with ResultsHistory(path, readonly=True) as history:
+        columns, rows = history.query(sql)
+
+    table = [{'x': None, 'y': None, 'data': dict(zip(columns, row)), 'status': CassavaStatus.undefined} for row in rows]
+    f.print_msg_table(table, fmt='')
+
+def run_manifest(paths, encoding, command, subcommand, args, conf, cls=Cassava):
+    """
+    Run the given command on each of the given input files in turn, skipping
+    the files that are unchanged since the command was last run on them
+    with the same configuration, and printing their recorded output instead
+    (see Manifest)
+
+    :param paths: The input file paths
+    :type paths: list
+    :param encoding: The character encoding of the input files
+    :type encoding: str
+    :param command: The command
+    :type command: str
+    :param subcommand: The subcommand
+    :type subcommand: str
+    :param args: The command line arguments and options
+    :type args: argparse.Namespace
+    :param conf: The configuration
+    :type conf: dict
+    :param cls: The class used to read and process the input files
+    :type cls: Cassava or a subclass
+    """
+
+    reporter = cls(conf=conf)
+    failed = []
+
+    with Manifest(args.manifest) as manifest:
+        conf_key = manifest.put_conf(conf, encoding=encoding, command=command, subcommand=subcommand)
+
+        for path in paths:
+            print(f'{path}:')
+            info = manifest.get_file_info(path)
+            output = manifest.get(info, conf_key)
+
+            if output is None:
+                buf = io.StringIO()
+
+                try:
+                    with contextlib.redirect_stdout(buf):
+                        run_file(path, encoding, command, subcommand, args, conf.copy(), cls=cls)
+                except Exception as e:
+                    # A file that fails isn't recorded, so it's run again
+                    sys.stdout.write(buf.getvalue())
+
+                    if args.verbose or not args.keep_going:
+                        raise
+
+                    reporter.print_status(str(e), CassavaStatus.error)
+                    failed.append(path)
+                    continue
+
+                output = buf.getvalue()
+                manifest.put(info, conf_key, output)
+            elif not cassava._term.does_styling:
+                # The output may have been recorded from a run on a terminal
+                output = '\n'.join([cassava._term.strip_seqs(line) for line in output.split('\n')])
+
+            sys.stdout.write(output)
+
+    print('Manifest:')
+    reporter.print_status(f'ran {command} {subcommand} on {manifest.misses} files, skipped {manifest.hits} unchanged files', CassavaStatus.neutral, indent=INDENT)
+
+    if failed:
+        reporter.print_status(f"failed on {len(failed)} files: {', '.join(failed)}", CassavaStatus.error, indent=INDENT)
+
+def run(args, cls=Cassava):
+    """
+    Run the command given in the parsed command line arguments
+
+    :param args: The command line arguments and options
+    :type args: argparse.Namespace
+    :param cls: The class used to read and process the input file
+    :type cls: Cassava or a subclass
+    """
+
+    conf = Cassava.DEFAULTS.copy()
+
     # Options go in the configuration
     in_file = args.in_file
     encoding = args.encoding
@@ -150,30 +464,77 @@ def main():
     del args.subcommand
     conf.update(vars(args))
 
-    with Cassava(path=in_file, mode=mode, encoding=encoding, conf=conf) as f:
-        f.read()
+    if command == 'query':
+        run_query(in_file, args.sql, conf)
+        return
 
-        if command == 'plot':
-            if subcommand == 'qc':
-                if args.ncols:
-                    layout = f.compute_multi_plot_layout(args.ncols)
-                else:
-                    layout = (1,1)
+    if args.results_db and (command != 'print' or subcommand == 'profile'):
+        raise ValueError('The --results-db option is only supported by the qc, stats and checks subcommands of the print command')
 
-                f.plot(layout=layout, opts=args.plot_opts)
-            elif subcommand == 'stats':
-                f.plot_stats(k=args.k, showfliers=args.showfliers)
-            else:
-                raise ValueError('Unsupported subcommand')
-        elif command == 'print':
-            if subcommand == 'qc':
-                f.print_qc()
-            elif subcommand == 'stats':
-                f.print_stats(k=args.k, showfliers=args.showfliers)
-            else:
-                raise ValueError('Unsupported subcommand')
-        else:
-            raise ValueError('Unsupported command')
+    if args.manifest:
+        if command != 'print':
+            raise ValueError('The --manifest option is only supported by the print command')
+
+        if args.profile:
+            raise ValueError('The --manifest option cannot be used with --profile')
+    elif args.keep_going:
+        raise ValueError('The --keep-going option is only supported with --manifest')
+
+    profiler = cProfile.Profile() if args.profile_stats_out else None
+
+    if profiler:
+        profiler.enable()
+
+    # A glob pattern of multiple files is read as a single dataset, unless
+    # each file is run separately against a manifest
+    if glob.has_magic(in_file) and not os.path.exists(in_file):
+        paths = sorted(glob.glob(in_file))
+
+        if not paths:
+            raise FileNotFoundError(f'No input files match {in_file}')
+
+        in_file = paths if len(paths) > 1 else paths[0]
+
+    if args.manifest:
+        paths = in_file if isinstance(in_file, list) else [in_file]
+        run_manifest(paths, encoding, command, subcommand, args, conf, cls=cls)
+    else:
+        f = run_file(in_file, encoding, command, subcommand, args, conf, cls=cls)
+
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile_stats_out)
+
+    if args.profile_out:
+        f.write_profile(args.profile_out)
+    elif args.profile:
+        f.print_profile()
+
+def main():
+    """
+    Main function
+    """
+
+    args = parse_cmdln()
+
+    if args.command == 'serve':
+        from cassava.serve import serve
+        serve(args.in_file, workers=args.workers, cache_size=args.cache_size, verbose=args.verbose)
+    elif args.remote and args.command != 'plot':
+        # Plots are displayed by this process, so only the text commands
+        # are sent to the server
+        from cassava.serve import send_request
+
+        try:
+            response = send_request(args.remote, sys.argv[1:], isatty=sys.stdout.isatty())
+        except OSError as e:
+            sys.exit(f'Failed to connect to the cassava server on {args.remote}: {e}')
+
+        sys.stdout.write(response['stdout'])
+        sys.stderr.write(response['stderr'])
+        sys.exit(response['status'])
+    else:
+        run(args)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,209 @@
+import os
+import json
+import math
+import sqlite3
+import datetime
+
+import numpy as np
+
+from cassava import CassavaStatus
+
+class ResultsHistory(object):
+    """
+    SQLite store of the check results of each run of cassava on an input
+    file, for querying across runs
+
+    Each run of the checks on a file is a row of the runs table.  The
+    results of each check are counted by status in the checks table, and
+    stored in the results table.  Consecutive rows with the same column,
+    status and data items are stored as a single range of rows, so the
+    results of per-row checks, such as empty_rows, take a row per change
+    rather than a row per data row.  The check_summary view joins the check
+    counts to their runs, e.g. to find the files with more than 1% empty
+    rows in a given month:
+
+    SELECT DISTINCT path FROM check_summary WHERE check_name = 'empty_rows'
+    AND run_at >= '2026-09' AND run_at < '2026-10' AND nerror > 0.01 * nrows
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        run_at TEXT NOT NULL,
+        nrows INTEGER NOT NULL,
+        conf TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS runs_path ON runs (path, run_at);
+    CREATE INDEX IF NOT EXISTS runs_run_at ON runs (run_at);
+    CREATE TABLE IF NOT EXISTS checks (
+        run_id INTEGER NOT NULL REFERENCES runs (run_id),
+        check_name TEXT NOT NULL,
+        run_at TEXT NOT NULL,
+        nresults INTEGER NOT NULL,
+        nok INTEGER NOT NULL,
+        nwarn INTEGER NOT NULL,
+        nerror INTEGER NOT NULL,
+        PRIMARY KEY (run_id, check_name)
+    );
+    CREATE INDEX IF NOT EXISTS checks_check_name ON checks (check_name, run_at);
+    CREATE TABLE IF NOT EXISTS results (
+        run_id INTEGER NOT NULL REFERENCES runs (run_id),
+        check_name TEXT NOT NULL,
+        col INTEGER,
+        start_row INTEGER,
+        end_row INTEGER,
+        status TEXT NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS results_run_id ON results (run_id, check_name);
+    CREATE INDEX IF NOT EXISTS results_check_name ON results (check_name, status);
+    CREATE VIEW IF NOT EXISTS check_summary AS
+        SELECT checks.run_id, path, checks.run_at, nrows, check_name, nresults, nok, nwarn, nerror
+        FROM checks JOIN runs USING (run_id);
+    """
+
+    def __init__(self, path, readonly=False):
+        """
+        Constructor
+
+        :param path: The path of the SQLite database file
+        :type path: str
+        :param readonly: Open the database read-only, e.g. for queries.  It
+        must then already exist
+        :type readonly: bool
+        """
+
+        self.path = path
+        self.readonly = readonly
+        self.conn = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+        return False
+
+    def open(self):
+        """
+        Open the database, creating it if it doesn't exist (unless opened
+        read-only)
+
+        :returns: This object
+        :rtype: ResultsHistory
+        """
+
+        if self.readonly:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f'No such results database: {self.path}')
+
+            self.conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+        else:
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.executescript(self.SCHEMA)
+
+        return self
+
+    def close(self):
+        """
+        Close the database
+
+        :returns: This object
+        :rtype: ResultsHistory
+        """
+
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+        return self
+
+    @staticmethod
+    def _to_json(data):
+        # NaN isn't valid JSON, so it's stored as null, so that the data can
+        # be queried with SQLite's JSON functions
+        data = {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in data.items()}
+
+        return json.dumps(data, default=str)
+
+    def get_ranges(self, results):
+        """
+        Group the given check results into ranges of consecutive rows with
+        the same column, status and data items
+
+        :param results: The check results
+        :type results: CassavaResults
+        :yields: A tuple of the column, first and last row numbers, status
+        and data of each range
+        """
+
+        n = len(results)
+
+        if n == 0:
+            return
+
+        # Results without a row (held as -1) are never grouped
+        breaks = np.ones(n, dtype=bool)
+        breaks[1:] = (np.diff(results.y) != 1) | (results.y[1:] < 0)
+
+        for values in [results.x, results.status, *results.data.values()]:
+            breaks[1:] |= np.asarray(values[1:] != values[:-1], dtype=bool)
+
+        starts = np.flatnonzero(breaks)
+        ends = np.append(starts[1:], n) - 1
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            msg = results[start]
+            end_row = msg['y'] if msg['y'] is None else results.y[end].item()
+
+            yield msg['x'], msg['y'], end_row, msg['status'].name, self._to_json(msg['data'])
+
+    def put_run(self, path, nrows, conf, results):
+        """
+        Store the given check results of a run on the given input file
+
+        :param path: The input file path
+        :type path: str
+        :param nrows: The number of data rows checked
+        :type nrows: int
+        :param conf: The configuration the checks were run with
+        :type conf: dict
+        :param results: The check results, keyed by check name (see
+        Cassava.get_check_results())
+        :type results: dict
+        :returns: The run ID
+        :rtype: int
+        """
+
+        run_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+        with self.conn:
+            cur = self.conn.execute('INSERT INTO runs (path, run_at, nrows, conf) VALUES (?, ?, ?, ?)', (path, run_at, nrows, json.dumps(conf, sort_keys=True, default=str)))
+            run_id = cur.lastrowid
+
+            for name, check_results in results.items():
+                counts = check_results.count()
+                self.conn.execute('INSERT INTO checks VALUES (?, ?, ?, ?, ?, ?, ?)', (run_id, name, run_at, len(check_results), counts.get(CassavaStatus.ok, 0), counts.get(CassavaStatus.warn, 0), counts.get(CassavaStatus.error, 0)))
+                self.conn.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)', [(run_id, name, *item) for item in self.get_ranges(check_results)])
+
+        return run_id
+
+    def query(self, sql, params=()):
+        """
+        Run the given SQL query
+
+        :param sql: The SQL query
+        :type sql: str
+        :param params: The query parameters
+        :type params: tuple or dict
+        :returns: The column names and the result rows
+        :rtype: tuple
+        """
+
+        cur = self.conn.execute(sql, params)
+        columns = [item[0] for item in cur.description or []]
+
+        return columns, cur.fetchall()
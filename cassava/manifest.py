@@ -0,0 +1,226 @@
+import os
+import json
+import sqlite3
+import hashlib
+import datetime
+
+import cassava
+
+HASH_BLOCK_SIZE = 1 << 20
+# The configuration items that don't affect the output of a command
+IGNORED_CONF_KEYS = ['manifest', 'keep_going', 'progress', 'profile', 'profile_out', 'profile_memory', 'profile_stats_out', 'remote', 'workers', 'cache_size', 'results_db']
+
+class Manifest(object):
+    """
+    SQLite manifest of the output of running a command on each input file
+
+    Each entry is keyed by the input file's path and the configuration that
+    the command was run with (see get_conf_key()), and records the file's
+    size, modification time and SHA-256 content hash.  A file is unchanged
+    if its size and modification time match its entry, or failing that, if
+    its content hash does, so an unchanged file is only re-read if it has
+    been touched
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS confs (
+        conf_key TEXT PRIMARY KEY,
+        conf TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT NOT NULL,
+        conf_key TEXT NOT NULL REFERENCES confs (conf_key),
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        output TEXT NOT NULL,
+        run_at TEXT NOT NULL,
+        PRIMARY KEY (path, conf_key)
+    );
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        :param path: The path of the SQLite database file
+        :type path: str
+        """
+
+        self.path = path
+        self.conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+        return False
+
+    def open(self):
+        """
+        Open the manifest, creating it if it doesn't exist
+
+        :returns: This object
+        :rtype: Manifest
+        """
+
+        self.conn = sqlite3.connect(self.path)
+
+        # Each entry is committed as it's stored, so that an interrupted run
+        # keeps its progress.  This makes the commits cheap
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(self.SCHEMA)
+
+        return self
+
+    def close(self):
+        """
+        Close the manifest
+
+        :returns: This object
+        :rtype: Manifest
+        """
+
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+        return self
+
+    @staticmethod
+    def get_conf_key(conf, encoding=cassava.ENCODING, command=None, subcommand=None):
+        """
+        Get the key of the given command and configuration
+
+        The key also covers the cassava version, as a new version can report
+        on the same file differently
+
+        :param conf: The configuration
+        :type conf: dict
+        :param encoding: The character encoding of the input files
+        :type encoding: str
+        :param command: The command
+        :type command: str
+        :param subcommand: The subcommand
+        :type subcommand: str
+        :returns: The key and the serialised configuration
+        :rtype: tuple
+        """
+
+        items = {key: value for key, value in conf.items() if key not in IGNORED_CONF_KEYS}
+        text = json.dumps({'version': cassava.__version__, 'command': command, 'subcommand': subcommand, 'encoding': encoding, 'conf': items}, sort_keys=True, default=str)
+        key = hashlib.sha256(text.encode()).hexdigest()
+
+        return key, text
+
+    def put_conf(self, conf, **kwargs):
+        """
+        Store the given configuration
+
+        :param conf: The configuration
+        :type conf: dict
+        :param kwargs: The keyword arguments of get_conf_key()
+        :type kwargs: dict
+        :returns: The key
+        :rtype: str
+        """
+
+        key, text = self.get_conf_key(conf, **kwargs)
+
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO confs VALUES (?, ?)', (key, text))
+
+        return key
+
+    @staticmethod
+    def get_file_hash(path, block_size=HASH_BLOCK_SIZE):
+        """
+        Get the SHA-256 hash of the content of the given file
+
+        :param path: The file path
+        :type path: str
+        :param block_size: The number of bytes read at a time
+        :type block_size: int
+        :returns: The hex digest
+        :rtype: str
+        """
+
+        h = hashlib.sha256()
+
+        with open(path, 'rb') as fp:
+            for block in iter(lambda: fp.read(block_size), b''):
+                h.update(block)
+
+        return h.hexdigest()
+
+    def get_file_info(self, path):
+        """
+        Get the identifying details of the given file
+
+        :param path: The file path
+        :type path: str
+        :returns: The file's real path, size and modification time.  Its
+        content hash is added by get() when required
+        :rtype: dict
+        """
+
+        st = os.stat(path)
+
+        return {'path': os.path.realpath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': None}
+
+    def get(self, info, conf_key):
+        """
+        Get the recorded output for the given file, if it's unchanged
+
+        :param info: The file details (see get_file_info())
+        :type info: dict
+        :param conf_key: The configuration key (see put_conf())
+        :type conf_key: str
+        :returns: The output, or None if the file is new or has changed
+        :rtype: str
+        """
+
+        entry = self.conn.execute('SELECT size, mtime_ns, sha256, output FROM files WHERE path = ? AND conf_key = ?', (info['path'], conf_key)).fetchone()
+
+        if entry and entry[:2] == (info['size'], info['mtime_ns']):
+            self.hits += 1
+            return entry[3]
+
+        # The hash is also needed to store a new entry for the file
+        info['sha256'] = self.get_file_hash(info['path'])
+
+        if entry and entry[0] == info['size'] and entry[2] == info['sha256']:
+            with self.conn:
+                self.conn.execute('UPDATE files SET mtime_ns = ? WHERE path = ? AND conf_key = ?', (info['mtime_ns'], info['path'], conf_key))
+
+            self.hits += 1
+            return entry[3]
+
+        self.misses += 1
+
+        return None
+
+    def put(self, info, conf_key, output):
+        """
+        Store the output of running the command on the given file
+
+        :param info: The file details, as passed to get()
+        :type info: dict
+        :param conf_key: The configuration key (see put_conf())
+        :type conf_key: str
+        :param output: The output
+        :type output: str
+        """
+
+        if info['sha256'] is None:
+            info['sha256'] = self.get_file_hash(info['path'])
+
+        run_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)', (info['path'], conf_key, info['size'], info['mtime_ns'], info['sha256'], output, run_at))
@@ -0,0 +1,410 @@
+import os
+import io
+import sys
+import stat
+import json
+import socket
+import contextlib
+import socketserver
+import threading
+import traceback
+import collections
+import concurrent.futures
+
+from blessed import Terminal
+
+import cassava
+from cassava import Cassava, CassavaStatus, load_check_plugins
+
+CACHE_SIZE = 32
+READ_CONF_KEYS = ['comment', 'header_row', 'first_data_row', 'delimiter', 'skip_initial_space', 'sample', 'sample_every', 'sample_seed', 'start', 'end', 'row_range', 'xcol', 'x_as_datetime', 'datetime_format', 'missing_value', 'engine']
+
+# The output streams and terminal of the request being run in each thread
+_local = threading.local()
+
+class _ThreadLocalProxy(object):
+    """
+    Proxy an object, such as sys.stdout, to the per-thread object of the
+    given name, or to the given default object if the thread has none
+    """
+
+    def __init__(self, name, default):
+        """
+        Constructor
+
+        :param name: The name of the per-thread object
+        :type name: str
+        :param default: The default object
+        :type default: object
+        """
+
+        self._name = name
+        self._default = default
+
+    def __getattr__(self, attr):
+        return getattr(getattr(_local, self._name, self._default), attr)
+
+class FileCache(object):
+    """
+    Least recently used cache of parsed input files
+
+    Entries are keyed by each input file's path, inode, modification time
+    and size, and the configuration items that affect how it is read, so
+    that a modified file is read afresh
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        """
+        Constructor
+
+        :param size: The maximum number of entries
+        :type size: int
+        """
+
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_key(self, f):
+        """
+        Get the cache key for the given open Cassava object
+
+        :param f: The Cassava object
+        :type f: Cassava
+        :returns: The key
+        :rtype: tuple
+        """
+
+        files = []
+
+        for fp in f.fps:
+            st = os.fstat(fp.fileno())
+            files.append((os.path.realpath(fp.name), st.st_ino, st.st_mtime_ns, st.st_size))
+
+        conf = tuple([repr(f.conf[key]) for key in READ_CONF_KEYS])
+
+        return (tuple(files), f.encoding, conf)
+
+    def get(self, key):
+        """
+        Get the entry for the given key
+
+        :param key: The key
+        :type key: tuple
+        :returns: The entry, or None if not cached
+        :rtype: dict
+        """
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+
+        return entry
+
+    def put(self, key, entry):
+        """
+        Store the given entry under the given key
+
+        :param key: The key
+        :type key: tuple
+        :param entry: The entry
+        :type entry: dict
+        """
+
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+class CachedCassava(Cassava):
+    """
+    Cassava object that reads its input via a FileCache
+
+    The parsed rows in the cache are shared between requests, so they must
+    not be modified.  The cache is set on a subclass for each server
+    """
+
+    cache = None
+
+    def read(self):
+        """
+        Read the input file, or restore it from the cache
+
+        :returns: The rows
+        :rtype: list
+        """
+
+        key = self.cache.get_key(self)
+        entry = self.cache.get(key)
+
+        if entry is None:
+            super().read()
+            self.cache.put(key, {
+                'rows': self.rows,
+                'header_row': self.header_row,
+                'row_numbers': self.row_numbers,
+                'row_offset': self.row_offset,
+                'sample_info': self.sample_info,
+                'selection_info': self.selection_info,
+                'merge_info': self.merge_info,
+                'row_sources': self.row_sources,
+                'conf': {item: self.conf[item] for item in ['header_row', 'first_data_row']}
+            })
+        else:
+            with self.profile_phase('read', detail='cached') as record:
+                self.conf.update(entry['conf'])
+                self.rows = entry['rows']
+                self.header_row = entry['header_row']
+                self.row_numbers = entry['row_numbers']
+                self.row_offset = entry['row_offset']
+                self.sample_info = entry['sample_info']
+                self.selection_info = entry['selection_info']
+                self.merge_info = entry['merge_info']
+                self.row_sources = entry['row_sources']
+                self.columns = {}
+                self.conversion_failures = {}
+                record['nrows'] = len(self.rows)
+
+        return self.rows
+
+def _exit_status(e):
+    """
+    Get the exit status for the given SystemExit exception
+
+    :param e: The exception
+    :type e: SystemExit
+    :returns: The exit status
+    :rtype: int
+    """
+
+    if e.code is None:
+        status = 0
+    elif isinstance(e.code, int):
+        status = e.code
+    else:
+        print(e.code, file=sys.stderr)
+        status = 1
+
+    return status
+
+def run_request(argv, cwd=None, cls=Cassava):
+    """
+    Run the given command line, as the CLI would
+
+    :param argv: The command line arguments
+    :type argv: list
+    :param cwd: The directory that relative paths are relative to (default
+    the current working directory)
+    :type cwd: str
+    :param cls: The class used to read and process the input file
+    :type cls: Cassava or a subclass
+    :returns: The exit status
+    :rtype: int
+    """
+
+    from cassava.__main__ import parse_cmdln, run
+
+    cwd = cwd or os.getcwd()
+
+    # The command line can fail to parse other than by argparse (e.g. an
+    # invalid y-axis column range), leaving no args
+    args = None
+
+    try:
+        args = parse_cmdln(argv)
+
+        if args.command in ['plot', 'serve']:
+            raise ValueError(f'The {args.command} command is not supported by the server')
+
+        # The recorded output is captured by redirecting sys.stdout, which
+        # the worker threads share
+        if args.manifest:
+            raise ValueError('The --manifest option is not supported by the server')
+
+        args.in_file = os.path.join(cwd, args.in_file)
+
+        if getattr(args, 'base_file', None):
+            args.base_file = os.path.join(cwd, args.base_file)
+
+        if args.profile_out:
+            args.profile_out = os.path.join(cwd, args.profile_out)
+
+        if getattr(args, 'out_file', None) and args.out_file != '-':
+            args.out_file = os.path.join(cwd, args.out_file)
+
+        if args.results_db:
+            args.results_db = os.path.join(cwd, args.results_db)
+
+        if args.profile_stats_out:
+            args.profile_stats_out = os.path.join(cwd, args.profile_stats_out)
+
+        run(args, cls=cls)
+        status = 0
+    except SystemExit as e:
+        status = _exit_status(e)
+    except Exception as e:
+        # As Cassava._exception_handler(), including its exit status
+        if getattr(args, 'verbose', False):
+            traceback.print_exc()
+            status = 1
+        else:
+            Cassava().print_status(str(e), CassavaStatus.error)
+            status = 1 if getattr(args, 'forgive', False) else 0
+
+    return status
+
+class CassavaRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handle a request from a client (see send_request())
+    """
+
+    def handle(self):
+        request = json.loads(self.rfile.read().decode())
+        stdout, stderr = io.StringIO(), io.StringIO()
+        _local.stdout = stdout
+        _local.stderr = stderr
+        _local.term = self.server.terms[bool(request.get('isatty'))]
+
+        try:
+            status = run_request(request['argv'], cwd=request.get('cwd'), cls=self.server.cls)
+        finally:
+            del _local.stdout, _local.stderr, _local.term
+
+        response = {'stdout': stdout.getvalue(), 'stderr': stderr.getvalue(), 'status': status}
+        self.wfile.write(json.dumps(response).encode())
+
+class CassavaServer(socketserver.UnixStreamServer):
+    """
+    Server that runs requests on a pool of worker threads
+    """
+
+    def __init__(self, path, workers=None, cache_size=CACHE_SIZE):
+        """
+        Constructor
+
+        :param path: The path of the Unix domain socket
+        :type path: str
+        :param workers: The number of worker threads (default the number of
+        CPUs)
+        :type workers: int
+        :param cache_size: The maximum number of parsed files to cache
+        :type cache_size: int
+        """
+
+        super().__init__(path, CassavaRequestHandler)
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+        self.cache = FileCache(size=cache_size)
+        self.cls = type('CachedCassava', (CachedCassava,), {'cache': self.cache})
+        self.terms = {False: Terminal(force_styling=None), True: Terminal(force_styling=True)}
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+@contextlib.contextmanager
+def redirect_output():
+    """
+    Context manager to redirect the output of each worker thread to the
+    streams and terminal of the request that it is running
+    """
+
+    saved = sys.stdout, sys.stderr, sys.excepthook, cassava._term
+    sys.stdout = _ThreadLocalProxy('stdout', sys.stdout)
+    sys.stderr = _ThreadLocalProxy('stderr', sys.stderr)
+    cassava._term = _ThreadLocalProxy('term', cassava._term)
+
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr, sys.excepthook, cassava._term = saved
+
+def serve(path, workers=None, cache_size=CACHE_SIZE, verbose=False):
+    """
+    Serve requests on the given Unix domain socket, until interrupted
+
+    :param path: The path of the Unix domain socket
+    :type path: str
+    :param workers: The number of worker threads (default the number of
+    CPUs)
+    :type workers: int
+    :param cache_size: The maximum number of parsed files to cache
+    :type cache_size: int
+    :param verbose: Emit verbose messages
+    :type verbose: bool
+    """
+
+    # Remove any socket left behind by a previous server
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.unlink(path)
+
+    load_check_plugins()
+    server = CassavaServer(path, workers=workers, cache_size=cache_size)
+
+    try:
+        with redirect_output():
+            if verbose:
+                print(f'Serving on {path} with {server.pool._max_workers} workers', file=sys.stderr)
+
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+def send_request(path, argv, cwd=None, isatty=False):
+    """
+    Send the given command line to the server listening on the given Unix
+    domain socket
+
+    :param path: The path of the Unix domain socket
+    :type path: str
+    :param argv: The command line arguments
+    :type argv: list
+    :param cwd: The directory that relative paths are relative to (default
+    the current working directory)
+    :type cwd: str
+    :param isatty: Whether the output is colour-coded, as for a terminal
+    :type isatty: bool
+    :returns: The response, containing the stdout and stderr text and the
+    exit status
+    :rtype: dict
+    """
+
+    request = {'argv': list(argv), 'cwd': cwd or os.getcwd(), 'isatty': isatty}
+    chunks = []
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(request).encode())
+        sock.shutdown(socket.SHUT_WR)
+
+        while True:
+            chunk = sock.recv(65536)
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+
+    return json.loads(b''.join(chunks).decode())
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import cassava
+from benchmarks import synthetic, bench
+
+@pytest.fixture
+def init_generator_conf():
+    def _init_generator_conf(opts):
+        conf = synthetic.DEFAULTS.copy()
+        conf.update({'nrows': 100, 'ncols': 4})
+        conf.update(opts)
+
+        return conf
+
+    return _init_generator_conf
+
+def test_generate_lines_is_reproducible(init_generator_conf):
+    conf = init_generator_conf({'seed': 42})
+    assert list(synthetic.generate_lines(conf)) == list(synthetic.generate_lines(conf))
+
+def test_generate_lines_header_and_counts(init_generator_conf):
+    conf = init_generator_conf({})
+    lines = list(synthetic.generate_lines(conf))
+    assert lines[0] == 'x,v1,v2,v3'
+    assert len(lines) == 101
+    assert lines[1].startswith('2000-01-01T00:00:00,')
+
+def test_generate_ragged_rows(init_generator_conf, tmp_path):
+    conf = init_generator_conf({'ragged_fraction': 0.5})
+    path = synthetic.generate(str(tmp_path / 'ragged.csv'), conf)
+    cconf = cassava.Cassava.DEFAULTS.copy()
+    cconf.update({'header_row': 0, 'first_data_row': 1})
+
+    with cassava.Cassava(path=path, conf=cconf) as f:
+        f.read()
+        statuses = [msg['status'] for msg in f.check_column_counts()]
+        assert cassava.CassavaStatus.error in statuses
+
+def test_generate_bom_and_commented_header(init_generator_conf, tmp_path):
+    conf = init_generator_conf({'bom': True, 'comment': '#', 'ncomment_lines': 3})
+    path = synthetic.generate(str(tmp_path / 'commented.csv'), conf)
+    cconf = cassava.Cassava.DEFAULTS.copy()
+    cconf.update({'comment': '#'})
+
+    with cassava.Cassava(path=path, conf=cconf) as f:
+        f.read()
+        assert f.conf['header_row'] == 3
+        assert f.conf['first_data_row'] == 4
+        assert f.check_bom()['data']['has_bom']
+
+def test_run_scenario_and_compare():
+    results = bench.run_scenario('numeric', 100, 4, repeat=1, benchmarks=['read','check_column_counts'])
+    assert list(results) == ['numeric.read', 'numeric.check_column_counts']
+
+    baseline = {name: t / 10 for name, t in results.items()}
+    table = bench.compare(results, baseline, threshold=0.2)
+    assert all(row[-1] for row in table)
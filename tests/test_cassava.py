@@ -1,5 +1,9 @@
 import os
+import io
+import sys
+import csv
 import datetime
+import tracemalloc
 
 import pytest
 import numpy as np
@@ -479,6 +483,16 @@ def test_read_non_utf8_encoded_file_explicitly():
         with pytest.raises(UnicodeDecodeError):
             f.read()
 
+@pytest.mark.parametrize(['engine'], [('auto',), ('csv',), ('split',)])
+def test_read_non_utf8_encoded_file_reports_byte_offset(engine):
+    in_file = base + '/data/encoded_iso-8859-15.csv'
+    conf = cassava.Cassava.DEFAULTS.copy()
+    conf.update({'header_row': 0, 'first_data_row': 1, 'ycol': [1,2], 'engine': engine})
+
+    with cassava.Cassava(path=in_file, conf=conf) as f:
+        with pytest.raises(UnicodeDecodeError, match='at byte offset 62'):
+            f.read()
+
 def test_read_non_utf8_encoded_file_with_correct_encoding():
     in_file = base + '/data/encoded_iso-8859-15.csv'
     conf = cassava.Cassava.DEFAULTS.copy()
@@ -666,3 +680,1148 @@ def test_check_bom(path, opts, expected):
         msg = f.check_bom()
         assert msg == expected
 
+
+@pytest.fixture
+def long_file(tmp_path):
+    path = tmp_path / 'long.csv'
+    lines = ['index,value'] + [f'{i},{i * 10}' for i in range(1000)]
+    path.write_text('\n'.join(lines) + '\n')
+
+    return str(path)
+
+def test_read_sample_every(long_file):
+    conf = cassava.Cassava.DEFAULTS.copy()
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'ycol': [1],
+        'sample_every': 10
+    }
+    conf.update(opts)
+
+    with cassava.Cassava(path=long_file, conf=conf) as f:
+        f.read()
+        assert f.header_row == ['index','value']
+        assert len(f.rows) == 101
+        assert f.row_numbers[:3] == [0,1,11]
+        assert f.get_column_data(0, func=int) == list(range(0, 1000, 10))
+        assert f.sample_info['nrows'] == 1000
+        assert f.sample_info['nsampled'] == 100
+        assert f.sample_info['fraction'] == 0.1
+
+def test_read_sample_reservoir(long_file):
+    conf = cassava.Cassava.DEFAULTS.copy()
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'ycol': [1],
+        'sample': 50,
+        'sample_seed': 1
+    }
+    conf.update(opts)
+
+    with cassava.Cassava(path=long_file, conf=conf) as f:
+        f.read()
+        assert len(f.rows) == 51
+        assert f.sample_info['fraction'] == 0.05
+
+        # Rows are kept in file order, and row numbers refer to the file
+        indices = f.get_column_data(0, func=int)
+        assert indices == sorted(indices)
+        assert f.row_numbers[1:] == [i + 1 for i in indices]
+        assert f.get_x_axis_data() == indices
+
+def test_read_sample_larger_than_file(long_file):
+    conf = cassava.Cassava.DEFAULTS.copy()
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'sample': 5000
+    }
+    conf.update(opts)
+
+    with cassava.Cassava(path=long_file, conf=conf) as f:
+        f.read()
+        assert len(f.rows) == 1001
+        assert f.sample_info['fraction'] == 1.0
+
+def test_check_column_outliers_iqr_sampled_reports_file_rows(long_file):
+    conf = cassava.Cassava.DEFAULTS.copy()
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'ycol': [1],
+        'sample_every': 100
+    }
+    conf.update(opts)
+
+    with cassava.Cassava(path=long_file, conf=conf) as f:
+        f.read()
+        f.rows[3][1] = '1e9'
+        msgs = [msg for msg in f.check_column_outliers_iqr()]
+        assert msgs[0]['y'] == 201
+
+def test_profile_phase_disabled_by_default(dummy_cassava):
+    f = dummy_cassava
+    f.get_column_data(0)
+    assert f.profile == []
+
+def test_profile_phase_records_phases(dummy_cassava):
+    f = dummy_cassava
+    f.conf['profile'] = True
+    hooked = []
+    f.profile_hooks.append(hooked.append)
+
+    with f.profile_phase('outer'):
+        f.get_column_data(0)
+        f.get_column_data(1)
+
+    assert [r['phase'] for r in f.profile] == ['outer', 'convert', 'convert']
+    assert [r['depth'] for r in f.profile] == [0, 1, 1]
+    assert f.profile[1]['nrows'] == 10
+    assert hooked[-1]['phase'] == 'outer'
+
+    summary = f.get_profile_summary()
+    assert [item['phase'] for item in summary] == ['outer', 'convert']
+    assert summary[1]['calls'] == 2
+    assert summary[1]['nrows'] == 20
+    assert summary[0]['wall'] >= summary[1]['wall']
+
+def test_read_records_rows_and_bytes():
+    in_file = base + '/data/dt-valid.csv'
+    conf = cassava.Cassava.DEFAULTS.copy()
+    conf.update({'profile': True})
+
+    with cassava.Cassava(path=in_file, conf=conf) as f:
+        f.read()
+        assert f.profile[0]['phase'] == 'read'
+        assert f.profile[0]['nrows'] == len(f.rows)
+        assert f.profile[0]['nbytes'] == os.path.getsize(in_file)
+
+def test_profile_phase_records_memory(dummy_cassava):
+    f = dummy_cassava
+    f.conf['profile'] = True
+    f.conf['profile_memory'] = True
+
+    with f.profile_phase('outer'):
+        with f.profile_phase('inner'):
+            block = [0.0] * 100000
+
+        del block
+
+    tracemalloc.stop()
+    outer, inner = f.profile
+    assert inner['mem_net'] >= 800000
+    assert outer['mem_peak'] >= inner['mem_peak'] >= inner['mem_net']
+    assert outer['mem_net'] < inner['mem_net']
+
+def test_estimate_rows_memory(dummy_cassava):
+    f = dummy_cassava
+    est = f.estimate_rows_memory()
+    assert est['ncells'] == 110
+    assert est['bytes_per_cell'] > 8
+
+def test_to_numpy_matches_axis_data(missing_values_cassava):
+    f = missing_values_cassava
+    f.conf['missing_value'] = '-999'
+    data = f.to_numpy()
+    assert data.dtype.names == ('Datetime', 'Temperature')
+    assert data['Datetime'].tolist() == f.get_x_axis_data()
+    np.testing.assert_array_equal(data['Temperature'], np.array(f.get_y_axis_data(1)))
+
+def test_get_column_arrays_not_copied(dummy_cassava):
+    f = dummy_cassava
+    f.conf['ycol'] = [1,2]
+    arrays = f.get_column_arrays()
+    assert list(arrays) == ['index', 'v1', 'v2']
+    assert f.get_column_arrays()['v1'] is arrays['v1']
+
+    # A configuration change causes the column to be converted again
+    f.conf['missing_value'] = '11'
+    arrays = f.get_column_arrays()
+    assert np.isnan(arrays['v1'][1])
+
+def test_get_field_names_fallback(dummy_cassava):
+    f = dummy_cassava
+    f.header_row[2] = ''
+    f.header_row[3] = 'v1'
+    assert f.get_field_names([1,2,3]) == ['v1', 'col2', 'col3']
+
+def test_to_arrow_zero_copy(dummy_cassava):
+    pa = pytest.importorskip('pyarrow')
+    f = dummy_cassava
+    f.conf['ycol'] = [1]
+    table = f.to_arrow()
+    assert table.column_names == ['index', 'v1']
+    assert np.shares_memory(table.column('v1').chunk(0).to_numpy(), f.get_column_arrays()['v1'])
+
+def test_check_time_axis():
+    in_file = base + '/data/dt-time-axis.csv'
+    conf = cassava.Cassava.DEFAULTS.copy()
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'xcol': 0,
+        'ycol': [1],
+        'x_as_datetime': True
+    }
+    conf.update(opts)
+
+    with cassava.Cassava(path=in_file, conf=conf) as f:
+        f.read()
+        msgs = [msg for msg in f.check_time_axis()]
+
+    summary = msgs[0]
+    assert summary['status'] == cassava.CassavaStatus.error
+    assert summary['data']['cadence'] == datetime.timedelta(minutes=1)
+    assert (summary['data']['ngaps'], summary['data']['nduplicates'], summary['data']['nreversals']) == (2, 2, 1)
+
+    ranges = [(msg['data']['kind'], msg['data']['start_row'], msg['data']['end_row']) for msg in msgs[1:]]
+    assert ranges == [('gap', 7, 8), ('gap', 10, 11), ('duplicate', 5, 7), ('reversal', 11, 12)]
+    assert msgs[-1]['data']['step'] == datetime.timedelta(minutes=-2)
+
+def test_check_time_axis_valid():
+    in_file = base + '/data/dt-valid.csv'
+    conf = cassava.Cassava.DEFAULTS.copy()
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'xcol': 0,
+        'x_as_datetime': True
+    }
+    conf.update(opts)
+
+    with cassava.Cassava(path=in_file, conf=conf) as f:
+        f.read()
+        msgs = [msg for msg in f.check_time_axis()]
+
+    assert len(msgs) == 1
+    assert msgs[0]['status'] == cassava.CassavaStatus.ok
+
+def test_check_time_axis_requires_datetime_xcol(dummy_cassava):
+    f = dummy_cassava
+    assert [msg for msg in f.check_time_axis()] == []
+
+@pytest.mark.parametrize(['missing_value','expected'], [
+(['-999','-9999'], [0,-1,np.nan,np.nan,-4,np.nan,-99,np.nan,-999.99,-9]),
+([-999,'-999.99'], [0,-1,-9999,np.nan,-4,np.nan,-99,-9999,np.nan,-9]),
+('-999', [0,-1,-9999,np.nan,-4,np.nan,-99,-9999,-999.99,-9]),
+(None, [0,-1,-9999,-999,-4,-999,-99,-9999,-999.99,-9])
+])
+def test_get_y_axis_data_with_missing_values(missing_values_cassava, missing_value, expected):
+    f = missing_values_cassava
+    f.conf['missing_value'] = missing_value
+    assert f.get_y_axis_data(1) == expected
+
+def test_get_y_axis_data_with_mixed_missing_values(init_cassava):
+    values = [['0'],['-9999'],['NaN'],['NA'],[''],['4']]
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'missing_value': ['-9999','NaN','NA','']
+    }
+    rows = [['y'], *values]
+    f = init_cassava(opts)
+    f.rows = rows
+    f.store_header()
+    assert f.get_y_axis_data(0) == [0,np.nan,np.nan,np.nan,np.nan,4]
+
+def test_get_y_axis_data_bulk_conversion_failure_falls_back(init_cassava):
+    values = [['0'],['bad'],['2']]
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1
+    }
+    rows = [['y'], *values]
+    f = init_cassava(opts)
+    f.rows = rows
+    f.store_header()
+
+    with pytest.raises(ValueError, match='at row 2'):
+        f.get_y_axis_data(0)
+
+    f.conf['forgive'] = True
+    assert f.get_y_axis_data(0, exc_value=-1) == [0,-1,2]
+
+def test_get_y_axis_data_forgive_mode_records_failures(init_cassava):
+    values = [['0'],['bad'],['2'],[],['-999'],['bad'],['6']]
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'missing_value': '-999',
+        'forgive': True
+    }
+    rows = [['y'], *values]
+    f = init_cassava(opts)
+    f.rows = rows
+    f.store_header()
+    y = f.get_y_axis_data(0, exc_value=-1)
+    assert y == [0,-1,2,-1,np.nan,-1,6]
+    assert y == f.get_column_data(0, '-999', exc_value=-1, func=f.to_float_with_missing_value)
+    assert f.conversion_failures[0] == {'nfailures': 3, 'rows': [2,4,6]}
+
+    msgs = [msg for msg in f.check_conversion_failures()]
+    assert msgs == [{'x': 0, 'y': None, 'data': {'nfailures': 3, 'rows': [2,4,6]}, 'status': cassava.CassavaStatus.warn}]
+
+def test_get_y_axis_data_forgive_mode_limits_failure_rows(init_cassava):
+    values = [['bad']] * 20
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'forgive': True
+    }
+    rows = [['y'], *values]
+    f = init_cassava(opts)
+    f.rows = rows
+    f.store_header()
+    f.get_y_axis_data(0)
+    assert f.conversion_failures[0]['nfailures'] == 20
+    assert f.conversion_failures[0]['rows'] == list(range(1, cassava.MAX_FAILURE_ROWS + 1))
+
+def test_get_x_axis_data_datetime_forgive_mode_records_failures():
+    in_file = base + '/data/dt-invalid-date.csv'
+    conf = cassava.Cassava.DEFAULTS.copy()
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'xcol': 0,
+        'ycol': [1],
+        'x_as_datetime': True,
+        'forgive': True
+    }
+    conf.update(opts)
+
+    with cassava.Cassava(path=in_file, conf=conf) as f:
+        f.read()
+        x = f.get_x_axis_data()
+        assert x == f.get_column_data(0, f.conf['datetime_format'], func=datetime.datetime.strptime)
+        assert f.conversion_failures[0]['nfailures'] == 1
+        assert f.conversion_failures[0]['rows'] == [1]
+
+@pytest.mark.parametrize(['name','method'], [
+('column_counts', 'check_column_counts'),
+('empty_columns', 'check_empty_columns'),
+('empty_rows', 'check_empty_rows'),
+('column_stats', 'compute_column_stats'),
+])
+def test_run_checks_matches_check_methods(cells_missing_cassava, name, method):
+    f = cells_missing_cassava
+    f.conf['forgive'] = True
+    msgs = [msg for check, msg in f.run_checks([name])]
+    assert msgs == [msg for msg in getattr(f, method)()]
+
+def test_run_checks_column_outliers_iqr(dummy_cassava):
+    f = dummy_cassava
+    f.conf['ycol'] = [1]
+    f.rows[2][1] = 1000                # Make cell 1,2 an outlier
+    msgs = [msg for check, msg in f.run_checks(['column_outliers_iqr'])]
+    assert msgs == [msg for msg in f.check_column_outliers_iqr()]
+
+def test_run_checks_unknown_check(dummy_cassava):
+    with pytest.raises(ValueError, match='Unknown checks'):
+        list(dummy_cassava.run_checks(['no_such_check']))
+
+def test_plan_checks_shares_inputs(dummy_cassava):
+    checks, inputs = dummy_cassava.plan_checks(['column_counts', 'empty_rows', 'column_stats', 'column_outliers_iqr'])
+    assert [check.name for check in checks] == ['column_counts', 'empty_rows', 'column_stats', 'column_outliers_iqr']
+    assert inputs == {'row_lengths', 'row_is_empty', 'columns'}
+
+def test_run_checks_empty_columns_shares_scan(dummy_cassava):
+    f = dummy_cassava
+    checks, inputs = f.plan_checks(['empty_columns', 'empty_rows'])
+    assert inputs == {'column_is_empty', 'row_is_empty'}
+
+    for row in f.rows:
+        row[2] = ''
+
+    msgs = [msg for check, msg in f.run_checks(['empty_columns'])]
+    assert msgs == [msg for msg in f.check_empty_columns()]
+    assert [msg['x'] for msg in msgs if msg['data']['is_empty']] == [2]
+
+def test_register_check_custom_check(dummy_cassava, monkeypatch):
+    monkeypatch.setattr(cassava, 'CHECKS', dict(cassava.CHECKS))
+
+    @cassava.register_check
+    class MaxValueCheck(cassava.CassavaCheck):
+        name = 'max_value'
+        inputs = {'columns'}
+
+        def run(self, f, inputs, limit=50, **kwargs):
+            for ycol, Y in inputs['columns'].items():
+                status = cassava.CassavaStatus.error if Y.max() > limit else cassava.CassavaStatus.ok
+                yield {'x': ycol, 'y': None, 'data': {'max': Y.max()}, 'status': status}
+
+    f = dummy_cassava
+    f.conf['ycol'] = [1,2]
+    msgs = [msg for check, msg in f.run_checks(['max_value'], limit=91)]
+    assert [msg['status'] for msg in msgs] == [cassava.CassavaStatus.ok, cassava.CassavaStatus.error]
+
+def test_register_check_unknown_input():
+    class BadCheck(cassava.CassavaCheck):
+        name = 'bad'
+        inputs = {'no_such_input'}
+
+    with pytest.raises(ValueError, match='unknown inputs'):
+        cassava.register_check(BadCheck)
+
+def test_compute_overview(dummy_cassava):
+    f = dummy_cassava
+    f.conf['ycol'] = [1,2]
+    f.rows[3][2] = ''
+    f.conf['missing_value'] = ''
+    overview = f.compute_overview(nbins=5)
+
+    # 10 data rows in 5 bins of 2 rows
+    assert overview['starts'].tolist() == [0,2,4,6,8]
+    assert overview['min'].shape == (2,5)
+    assert overview['min'][0].tolist() == pytest.approx([0, 2/9, 4/9, 6/9, 8/9])
+    assert overview['max'][0].tolist() == pytest.approx([1/9, 3/9, 5/9, 7/9, 1])
+
+    # The missing cell is ignored in the aggregates, and counted
+    assert overview['min'][1,1] == pytest.approx(3/9)
+    assert overview['nan_fraction'].tolist() == [[0,0,0,0,0], [0,0.5,0,0,0]]
+
+def test_compute_overview_more_bins_than_rows(dummy_cassava):
+    f = dummy_cassava
+    f.conf['ycol'] = [1]
+    overview = f.compute_overview(nbins=500)
+    assert overview['starts'].tolist() == list(range(10))
+    assert overview['min'].tolist() == overview['max'].tolist()
+
+def test_compute_overview_no_data_rows(dummy_cassava):
+    f = dummy_cassava
+    f.conf['ycol'] = [1,2]
+    del f.rows[1:]
+    overview = f.compute_overview(nbins=5)
+    assert overview['starts'].tolist() == []
+    assert overview['min'].shape == (2,0)
+    assert overview['nan_fraction'].shape == (2,0)
+
+def test_plot_overview(cells_missing_cassava):
+    f = cells_missing_cassava
+    f.conf['forgive'] = True
+    fig, axs = f.plot_overview(show=False, nbins=4)
+    assert axs.shape == (3,1)
+    assert [ax.get_title() for ax in axs[:,0]] == ['Min (normalised)', 'Max (normalised)', 'Missing fraction']
+    assert axs[0,0].get_images()[0].get_array().shape == (4,4)
+
+@pytest.fixture
+def select_cassava():
+    def _select_cassava(opts, seekable=True):
+        in_file = base + '/data/cells-missing.csv'
+        conf = cassava.Cassava.DEFAULTS.copy()
+        conf.update({
+            'header_row': 0,
+            'first_data_row': 1,
+            'xcol': 0,
+            'ycol': [1],
+            'x_as_datetime': True,
+            'forgive': True
+        })
+        conf.update(opts)
+        f = cassava.Cassava(path=in_file, conf=conf)
+
+        if not seekable:
+            f._is_byte_seekable = lambda: False
+
+        with f:
+            f.read()
+
+        return f
+
+    return _select_cassava
+
+@pytest.mark.parametrize(['opts','expected'], [
+({'row_range': (3,6)}, [3,4,5]),
+({'row_range': (None,3)}, [1,2]),
+({'row_range': (14,None)}, [14,15]),
+({'start': '1999-12-31T23:53:30', 'end': '1999-12-31T23:56:00'}, [5,6,7]),
+({'start': '1999-12-31T23:58:00'}, [9,10,11,12,13,14,15]),
+({'end': '1999-12-31T23:51:00'}, [1,2]),
+({'start': '2000-01-01T00:00:00'}, [11,12,13,14,15]),
+({'end': '1999-01-01T00:00:00'}, []),
+({'start': '1999-12-31T23:52:00', 'row_range': (1,5)}, [3,4]),
+])
+@pytest.mark.parametrize(['seekable'], [(True,), (False,)])
+def test_select_rows(select_cassava, opts, expected, seekable):
+    f = select_cassava(opts, seekable=seekable)
+    rows = [line for line in csv.reader(open(base + '/data/cells-missing.csv'))]
+    assert f.selection_info['method'] == ('offset' if seekable else 'scan')
+    assert f.rows == [rows[0]] + [rows[y] for y in expected]
+    assert [f.get_row_number(y) for y in range(1, len(f.rows))] == expected
+
+def test_select_rows_reports_file_rows(select_cassava):
+    f = select_cassava({'start': '1999-12-31T23:59:00'})
+    msgs = [msg for msg in f.check_empty_rows() if msg['data']['is_empty']]
+    assert [msg['y'] for msg in msgs] == [11,12,13,14,15]
+
+def test_select_rows_holds_offset(select_cassava):
+    f = select_cassava({'row_range': (3,9)})
+    assert f.row_numbers is None
+    assert f.row_offset == 2
+    assert f.get_row_numbers([0,1,6]).tolist() == [0,3,8]
+
+def test_select_rows_no_rows_stats(select_cassava, capsys):
+    f = select_cassava({'start': '2027-01-01T00:00:00'})
+    f.print_stats()
+    assert 'nan' in capsys.readouterr().out
+    assert all([np.isnan(v) for v in f.compute_stats(np.array([])).values()])
+
+def test_select_rows_then_sample(select_cassava):
+    f = select_cassava({'row_range': (3,9), 'sample_every': 2})
+    assert f.row_numbers == [0,3,5,7]
+    assert f.selection_info['nrows'] == 6
+    assert f.sample_info['nsampled'] == 3
+
+def test_select_rows_by_start_requires_xcol(select_cassava):
+    with pytest.raises(ValueError, match='requires an x-axis column'):
+        select_cassava({'xcol': None, 'start': '1999-12-31T23:55:00'})
+
+def test_get_window_bound(init_cassava):
+    f = init_cassava({'x_as_datetime': True, 'datetime_format': '%d/%m/%Y %H:%M'})
+    assert f.get_window_bound('1999-12-31T23:55') == datetime.datetime(1999,12,31,23,55)
+    assert f.get_window_bound('31/12/1999 23:55') == datetime.datetime(1999,12,31,23,55)
+    assert f.get_window_bound(None) is None
+
+    f.conf['x_as_datetime'] = False
+    assert f.get_window_bound('10') == 10.0
+
+@pytest.mark.parametrize(['dtype'], [('float32',), ('float64',)])
+def test_get_y_axis_array_dtype(cells_missing_cassava, dtype):
+    f = cells_missing_cassava
+    f.conf['forgive'] = True
+    f.conf['dtype'] = dtype
+    Y = f.get_y_axis_array(1)
+    assert Y.dtype == np.dtype(dtype)
+    np.testing.assert_array_equal(Y, np.array(f.get_y_axis_data(1), dtype=dtype))
+
+def test_get_y_axis_array_dtype_is_cached_separately(cells_missing_cassava):
+    f = cells_missing_cassava
+    f.conf['forgive'] = True
+    assert f.get_y_axis_array(1).dtype == np.float64
+    f.conf['dtype'] = 'float32'
+    assert f.get_y_axis_array(1).dtype == np.float32
+
+def test_get_y_axis_array_not_stale_when_rows_replaced(init_cassava):
+    f = init_cassava({'header_row': 0, 'first_data_row': 1})
+    f.rows = [['y'], ['1'], ['2']]
+    np.testing.assert_array_equal(f.get_y_axis_array(0), [1, 2])
+    f.rows = [['y'], ['3'], ['4']]
+    np.testing.assert_array_equal(f.get_y_axis_array(0), [3, 4])
+
+def test_get_float_column_array_forgive_mode(init_cassava):
+    opts = {
+        'header_row': 0,
+        'first_data_row': 1,
+        'missing_value': '-999',
+        'forgive': True
+    }
+    f = init_cassava(opts)
+    f.rows = [['y'], ['0'], ['bad'], ['2'], [], ['-999']]
+    f.store_header()
+    Y = f.get_float_column_array(0, exc_value=-1, dtype='float32')
+    np.testing.assert_array_equal(Y, np.array([0,-1,2,-1,np.nan], dtype=np.float32))
+    assert f.conversion_failures[0] == {'nfailures': 2, 'rows': [2,4]}
+
+def test_get_datetime_column_array(cells_missing_cassava):
+    f = cells_missing_cassava
+    f.conf['forgive'] = True
+    X = f.get_datetime_column_array(0)
+    assert X.dtype == np.dtype('datetime64[us]')
+    assert X[:10].tolist() == f.get_x_axis_data()[:10]
+    assert np.isnat(X[10:]).all()
+    assert f.conversion_failures[0]['nfailures'] == 5
+
+@pytest.mark.parametrize(['datetime_format','cells'], [
+(cassava.ISO_DATETIME_FORMAT, ['2020-01-01T00:00:00', '2020-1-2T3:04:05', '2020-01-03T00:00:00']),
+('%d/%m/%Y %H:%M', ['01/01/2020 00:00', '02/01/2020 03:04', '03/01/2020 00:00']),
+])
+def test_get_datetime_column_array_not_forgive_mode(init_cassava, datetime_format, cells):
+    f = init_cassava({'header_row': 0, 'first_data_row': 1, 'datetime_format': datetime_format})
+    f.rows = [['t']] + [[cell] for cell in cells]
+    f.store_header()
+    X = f.get_datetime_column_array(0)
+    assert X.tolist() == [datetime.datetime.strptime(cell, datetime_format) for cell in cells]
+
+    f.rows = [['t'], [cells[0]], ['bad'], [cells[2]]]
+    with pytest.raises(ValueError, match=r"Failed to convert column 0 at row 2 with strptime: \['bad'\]"):
+        f.get_datetime_column_array(0)
+
+def test_cassava_results_messages_on_demand():
+    results = cassava.CassavaResults(3, y=np.array([4,5,6]), status=np.array([1,3,1]), data={'is_empty': np.array([False,True,False])})
+    assert len(results) == 3
+    assert results[1] == {'x': None, 'y': 5, 'data': {'is_empty': True}, 'status': cassava.CassavaStatus.error}
+    assert type(results[1]['y']) is int
+    assert type(results[1]['data']['is_empty']) is bool
+    assert [msg['y'] for msg in results.select([cassava.CassavaStatus.error])] == [5]
+    assert results.count() == {cassava.CassavaStatus.ok: 2, cassava.CassavaStatus.error: 1}
+
+def test_cassava_results_from_messages(cells_missing_cassava):
+    f = cells_missing_cassava
+    msgs = [msg for msg in f.check_empty_rows()]
+    results = cassava.CassavaResults.from_messages(msgs)
+    assert list(results) == msgs
+    assert results.status.dtype == np.int8
+
+def test_cassava_results_from_messages_with_different_data_items():
+    msgs = [{'x': 0, 'y': None, 'data': {'ngaps': 1}, 'status': cassava.CassavaStatus.warn}, {'x': 0, 'y': 3, 'data': {'kind': 'gap', 'nsteps': 2}, 'status': cassava.CassavaStatus.warn}]
+    results = cassava.CassavaResults.from_messages(msgs)
+    assert list(results) == msgs
+    assert results.select([cassava.CassavaStatus.warn])[1] == msgs[1]
+
+@pytest.mark.parametrize(['name','method'], [
+('column_counts', 'check_column_counts'),
+('empty_columns', 'check_empty_columns'),
+('empty_rows', 'check_empty_rows'),
+('column_outliers_iqr', 'check_column_outliers_iqr'),
+])
+def test_get_check_results_matches_check_methods(cells_missing_cassava, name, method):
+    f = cells_missing_cassava
+    f.conf['forgive'] = True
+    f.conf['ycol'] = [1,2,3]
+    results = f.get_check_results([name])[name]
+    assert isinstance(results, cassava.CassavaResults)
+    assert list(results) == [msg for msg in getattr(f, method)()]
+
+def test_check_without_run_or_results():
+    class NoopCheck(cassava.CassavaCheck):
+        name = 'noop'
+
+    with pytest.raises(NotImplementedError):
+        list(NoopCheck().run(None, {}))
+
+    with pytest.raises(NotImplementedError):
+        NoopCheck().results(None, {})
+
+@pytest.fixture
+def diff_cassavas(tmp_path):
+    def _diff_cassavas(base_text, text, opts={}):
+        paths = []
+
+        for name, content in [('base.csv', base_text), ('in.csv', text)]:
+            path = tmp_path / name
+            path.write_text(content)
+            paths.append(str(path))
+
+        conf = cassava.Cassava.DEFAULTS.copy()
+        conf.update({'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'ycol': [1,2], 'forgive': True})
+        conf.update(opts)
+
+        return cassava.Cassava(path=paths[0], conf=conf.copy()), cassava.Cassava(path=paths[1], conf=conf.copy())
+
+    return _diff_cassavas
+
+DIFF_BASE = 't,v1,v2\n1,1.0,2.0\n2,1.5,2.5\n3,2.0,3.0\n3,9.0,9.0\n4,,4.0\n'
+DIFF_INPUT = 't,v1,v2\n2,1.5,2.6\n1,1.0,2.0\n4,,4.0\n5,3.0,3.0\n'
+
+@pytest.mark.parametrize(['nrows'], [(2,), (cassava.CHUNK_NROWS,)])
+def test_diff(diff_cassavas, nrows):
+    base_f, f = diff_cassavas(DIFF_BASE, DIFF_INPUT)
+
+    with base_f, f:
+        results = f.diff(base_f, nrows=nrows)
+
+    msgs = list(results)
+    assert [msg['data']['kind'] for msg in msgs] == ['added', 'removed', 'changed', 'duplicate']
+    assert msgs[0]['y'] == 4 and msgs[0]['data']['key'] == '5'
+    assert msgs[1]['y'] is None and msgs[1]['data']['base_row'] == 3
+    assert (msgs[2]['x'], msgs[2]['y'], msgs[2]['data']['base_row']) == (2, 1, 2)
+    assert (msgs[2]['data']['base_value'], msgs[2]['data']['value']) == (2.5, 2.6)
+    assert msgs[2]['status'] is cassava.CassavaStatus.error
+    assert msgs[3]['data']['base_row'] == 4
+    assert f.diff_info['changed'] == 1
+    assert f.diff_info['unchanged'] == 2
+
+def test_diff_tolerance(diff_cassavas):
+    base_f, f = diff_cassavas(DIFF_BASE, DIFF_INPUT)
+
+    with base_f, f:
+        results = f.diff(base_f, tolerance=0.2)
+
+    assert 'changed' not in list(results.data['kind'])
+    assert f.diff_info['unchanged'] == 3
+
+def test_diff_requires_key(diff_cassavas):
+    base_f, f = diff_cassavas(DIFF_BASE, DIFF_INPUT, opts={'xcol': None})
+
+    with base_f, f:
+        with pytest.raises(ValueError, match='key column is required'):
+            f.diff(base_f)
+
+def test_iter_chunks(init_cassava):
+    in_file = base + '/data/cells-missing.csv'
+    f = cassava.Cassava(path=in_file, conf=dict(cassava.Cassava.DEFAULTS, header_row=0, first_data_row=1))
+    rows = [line for line in csv.reader(open(in_file))]
+
+    with f:
+        chunks = [(list(chunk), f.get_row_numbers(range(len(chunk))).tolist()) for chunk in f.iter_chunks(nrows=4)]
+
+    assert f.header_row == rows[0]
+    assert [chunk[1:] for chunk, row_numbers in chunks] == [rows[y:y+4] for y in range(1, len(rows), 4)]
+    assert chunks[1][1] == [0,5,6,7,8]
+
+@pytest.fixture
+def merge_cassava(tmp_path):
+    def _merge_cassava(texts, opts={}):
+        paths = []
+
+        for i, text in enumerate(texts):
+            path = tmp_path / f'{i}.csv'
+            path.write_text(text)
+            paths.append(str(path))
+
+        conf = cassava.Cassava.DEFAULTS.copy()
+        conf.update({'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'ycol': [1]})
+        conf.update(opts)
+
+        return cassava.Cassava(path=paths, conf=conf)
+
+    return _merge_cassava
+
+MERGE_TEXTS = [
+'t,v\n1,a\n4,b\n,c\n6,d\n',
+'t,v\n2,e\n4,f\n5,g\n',
+]
+
+def test_merge_readers(merge_cassava):
+    f = merge_cassava(MERGE_TEXTS)
+
+    with f:
+        f.read()
+
+    assert f.rows == [['t','v'], ['1','a'], ['2','e'], ['4','b'], ['','c'], ['4','f'], ['5','g'], ['6','d']]
+    assert f.merge_info['nrows'] == [4,3]
+    assert f.get_row_source(4) == (f.path[0], 3)
+    assert f.get_row_source(5) == (f.path[1], 2)
+
+@pytest.mark.parametrize(['opts'], [
+    ({'sample': 3, 'sample_seed': 1},),
+    ({'row_range': (3,6)},),
+    ({'row_range': (2,7), 'sample_every': 2},),
+])
+def test_merge_readers_sources_of_kept_rows(merge_cassava, opts):
+    f = merge_cassava(MERGE_TEXTS, opts=opts)
+
+    # The sources are passed on through the progress tracking reader
+    with f:
+        with f.show_progress():
+            f.read()
+
+    expected = {1: (0,1), 2: (1,1), 3: (0,2), 4: (0,3), 5: (1,2), 6: (1,3), 7: (0,4)}
+    ys = f.get_row_numbers(range(len(f.rows))).tolist()
+
+    assert f.row_sources.shape == (len(f.rows), 2)
+    assert [f.get_row_source(y) for y in ys[1:]] == [(f.path[expected[y][0]], expected[y][1]) for y in ys[1:]]
+
+    with pytest.raises(ValueError, match='not a stored row'):
+        f.get_row_source(max(set(expected) - set(ys)))
+
+def test_merge_readers_iter_chunks_sources(merge_cassava):
+    f = merge_cassava(MERGE_TEXTS)
+
+    with f:
+        sources = [f.row_sources.tolist() for chunk in f.iter_chunks(nrows=3)]
+
+    assert sources == [[[0,0], [0,1], [1,1], [0,2]], [[0,0], [0,3], [1,2], [1,3]], [[0,0], [0,4]]]
+
+def test_merge_readers_without_xcol_concatenates(merge_cassava):
+    f = merge_cassava(MERGE_TEXTS, opts={'xcol': None})
+
+    with f:
+        f.read()
+
+    assert [row[1] for row in f.rows[1:]] == ['a','b','c','d','e','f','g']
+
+def test_merge_readers_commented_headers(merge_cassava):
+    f = merge_cassava(['# a\nt,v\n1,a\n3,b\n', '# a\n# b\nt,v\n2,c\n'], opts={'comment': '#'})
+
+    with f:
+        f.read()
+
+    assert f.header_row == ['t','v']
+    assert [row[1] for row in f.rows[f.conf['first_data_row']:]] == ['a','c','b']
+
+def test_merge_readers_header_mismatch(merge_cassava):
+    f = merge_cassava(['t,v\n1,a\n', 't,w\n2,b\n'])
+
+    with f:
+        with pytest.raises(ValueError, match='header row'):
+            f.read()
+
+@pytest.fixture
+def resample_cassava(init_cassava):
+    opts = {'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'ycol': [1], 'x_as_datetime': True, 'resample': '2min'}
+    f = init_cassava(opts)
+    f.rows = [['t','v'],
+    ['2000-01-01T00:01:00','4'],
+    ['2000-01-01T00:00:00','2'],
+    ['2000-01-01T00:02:30','1'],
+    ['2000-01-01T00:03:00','nan'],
+    ['2000-01-01T00:07:00','5']]
+    f.store_header()
+
+    return f
+
+@pytest.mark.parametrize(['aggregate','expected'], [
+('mean', [3.0, 1.0, np.nan, 5.0]),
+('min', [2.0, 1.0, np.nan, 5.0]),
+('max', [4.0, 1.0, np.nan, 5.0]),
+('count', [2.0, 1.0, 0.0, 1.0]),
+('nan_fraction', [0.0, 0.5, np.nan, 0.0]),
+])
+def test_resample(resample_cassava, aggregate, expected):
+    f = resample_cassava
+    np.testing.assert_array_equal(f.resample(1, aggregate=aggregate), expected)
+    assert list(f.get_resampled_x_axis_array().astype(str)) == ['2000-01-01T00:00:00.000000', '2000-01-01T00:02:00.000000', '2000-01-01T00:04:00.000000', '2000-01-01T00:06:00.000000']
+    assert list(f.get_resampled_rows()) == [0, 2, 4, 4]
+
+def test_resample_numeric_x_axis(init_cassava, dummy_rows):
+    f = init_cassava({'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'ycol': [1], 'resample': '25'})
+    f.rows = dummy_rows
+    np.testing.assert_array_equal(f.get_resampled_x_axis_array(), [0.0, 25.0, 50.0, 75.0])
+    np.testing.assert_array_equal(f.get_resampled_y_axis_array(1), [11.0, 36.0, 61.0, 86.0])
+
+def test_resample_invalid_width(resample_cassava):
+    resample_cassava.conf['resample'] = '2 fortnights'
+
+    with pytest.raises(ValueError, match='Invalid resample duration'):
+        resample_cassava.get_resampled_y_axis_array(1)
+
+def test_compute_column_stats_resampled(resample_cassava):
+    msgs = list(resample_cassava.compute_column_stats())
+    assert msgs[0]['data']['max'] == 5.0
+    assert msgs[0]['data']['min'] == 1.0
+
+def test_decimate(dummy_cassava):
+    f = dummy_cassava
+    x = np.arange(100, dtype=np.float64)
+    y = np.arange(100, dtype=np.float64)
+    y[50] = 1000.0
+
+    xd, yd = f.decimate(x, y, max_points=200)
+    assert len(xd) == 100
+
+    xd, yd = f.decimate(x, y, max_points=20)
+    assert len(xd) <= 21
+    assert yd.max() == 1000.0
+    assert xd[0] == 0.0 and xd[-1] == 99.0
+
+    xd, yd = f.decimate(x, y, lo=10.0, hi=20.0, max_points=20)
+    np.testing.assert_array_equal(xd, np.arange(9, 22))
+
+def test_plot_interactive_redecimates_on_zoom(dummy_cassava):
+    f = dummy_cassava
+    f.conf['xcol'] = 0
+    f.conf['ycol'] = [1]
+    fig, axs = f.plot(show=False, max_points=5)
+    line = axs[0,0].get_lines()[0]
+    assert len(line.get_xdata()) < 10
+
+    axs[0,0].set_xlim(20, 40)
+    np.testing.assert_array_equal(line.get_xdata(), [10, 20, 30, 40, 50])
+
+class TtyStringIO(io.StringIO):
+    def isatty(self):
+        return True
+
+@pytest.mark.parametrize(['isatty'], [(True,), (False,)])
+def test_show_progress(monkeypatch, capsys, isatty):
+    in_file = base + '/data/cells-missing.csv'
+    conf = cassava.Cassava.DEFAULTS.copy()
+    conf.update({'header_row': 0, 'first_data_row': 1, 'progress': True})
+    stdout = TtyStringIO() if isatty else io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    monkeypatch.setattr(cassava, 'PROGRESS_NROWS', 4)
+
+    with cassava.Cassava(path=in_file, conf=conf) as f:
+        with f.show_progress() as progress:
+            progress.interval = 0
+            f.read()
+            print('report')
+
+            assert progress.nrows == 16
+            assert progress.nbytes == progress.total_bytes
+
+    assert f.progress is None
+    assert sys.stdout is stdout
+    err = capsys.readouterr().err
+
+    if isatty:
+        assert 'read:' in stdout.getvalue()
+        assert stdout.getvalue().endswith('\r' + cassava._term.clear_eol + 'report\n')
+        assert err == ''
+    else:
+        assert stdout.getvalue() == 'report\n'
+        assert 'progress: read:' in err
+        assert 'progress: done:' in err
+
+@pytest.mark.parametrize(['names'], [(['column_counts'],), (['empty_rows'],)])
+def test_show_progress_checks(monkeypatch, capsys, names):
+    in_file = base + '/data/cells-missing.csv'
+    conf = cassava.Cassava.DEFAULTS.copy()
+    conf.update({'header_row': 0, 'first_data_row': 1, 'progress': True})
+    monkeypatch.setattr(sys, 'stdout', io.StringIO())
+    monkeypatch.setattr(cassava, 'PROGRESS_NROWS', 4)
+
+    with cassava.Cassava(path=in_file, conf=conf) as f:
+        with f.show_progress() as progress:
+            f.read()
+            progress.interval = 0
+
+            # The rows scanned for the check inputs are counted
+            f.get_check_results(names)
+
+            with f.profile_phase('check_empty_rows'):
+                list(f.check_empty_rows())
+                assert progress.phase_nrows == 16
+
+    err = capsys.readouterr().err
+    assert 'progress: scan: 4 of 16 rows (25%)' in err
+    assert 'progress: check_empty_rows: 16 of 16 rows (100%)' in err
+
+@pytest.fixture
+def engine_cassava(tmp_path):
+    def _engine_cassava(text, opts={}):
+        path = tmp_path / 'in.csv'
+        path.write_text(text)
+        conf = cassava.Cassava.DEFAULTS.copy()
+        conf.update({'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'ycol': [1,2], 'missing_value': '-999'})
+        conf.update(opts)
+
+        return cassava.Cassava(path=str(path), conf=conf)
+
+    return _engine_cassava
+
+NUMERIC_TEXT = 't,u,v\n1,0.5,-999\n2,1e3,2.25\n3,-999,nan\n4,-1.5,7\n'
+
+@pytest.mark.parametrize(['text','expected'], [
+(NUMERIC_TEXT, 'numeric'),
+('t,u,v\n1,0.5,a\n2,1.5,b\n', 'split'),
+('t,u,v\n1,0.5,"a"\n2,1.5,b\n', 'csv'),
+('t,u,v\n1,0.5\n2,1.5,2\n', 'split')
+])
+def test_read_chooses_engine(engine_cassava, text, expected):
+    with engine_cassava(text, opts={'profile': True}) as f:
+        f.read()
+
+    assert f.engine == expected
+    assert [record['detail'] for record in f.profile if record['phase'] == 'read'] == [f'{expected} engine']
+
+@pytest.mark.parametrize(['engine'], [('split',), ('numeric',)])
+def test_read_engines_match_csv_engine(engine_cassava, engine):
+    with engine_cassava(NUMERIC_TEXT, opts={'engine': 'csv'}) as f:
+        f.read()
+        expected = f.get_check_results()
+
+    with engine_cassava(NUMERIC_TEXT, opts={'engine': engine}) as g:
+        g.read()
+        results = g.get_check_results()
+
+    assert g.engine == engine
+    assert g.rows == f.rows
+    assert g.rows[-1] == ['4','-1.5','7']
+    assert g.rows[1:3] == [['1','0.5','-999'], ['2','1e3','2.25']]
+    np.testing.assert_array_equal(g.get_x_axis_array(), f.get_x_axis_array())
+    np.testing.assert_array_equal(g.get_y_axis_array(1), [0.5, 1000, np.nan, -1.5])
+    np.testing.assert_array_equal(g.get_y_axis_data(2), f.get_y_axis_data(2))
+    assert [list(r) for r in results.values()] == [list(r) for r in expected.values()]
+
+def test_read_numeric_engine_without_pyarrow(engine_cassava, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+
+    with engine_cassava(NUMERIC_TEXT, opts={'engine': 'numeric'}) as f:
+        f.read()
+
+    assert isinstance(f.rows, cassava.CassavaNumericRows)
+    np.testing.assert_array_equal(f.get_y_axis_array(2), [np.nan, 2.25, np.nan, 7])
+    assert f.rows.get_column(2, 1, ['-999'])[1].tolist() == [True, False, False, False]
+
+def test_read_numeric_engine_falls_back(engine_cassava, monkeypatch):
+    monkeypatch.setattr(cassava, 'SNIFF_NLINES', 2)
+    text = NUMERIC_TEXT + '5,"6",x\n'
+
+    with engine_cassava(text) as f:
+        f.read()
+
+    assert f.engine == 'split'
+    assert f.rows[-1] == ['5','6','x']
+
+    with engine_cassava(text, opts={'engine': 'numeric'}) as f:
+        with pytest.raises(ValueError, match='numeric engine cannot read'):
+            f.read()
+
+def test_read_numeric_engine_streams_selected_rows(engine_cassava):
+    with engine_cassava(NUMERIC_TEXT, opts={'engine': 'numeric', 'row_range': (2, 4)}) as f:
+        f.read()
+
+    assert f.rows == [['t','u','v'], ['2','1e3','2.25'], ['3','-999','nan']]
+
+def test_split_engine_quoted_cells(engine_cassava, monkeypatch):
+    monkeypatch.setattr(cassava, 'CHUNK_NROWS', 2)
+
+    with engine_cassava('t,u\n1,a\n2,"b,\nc"\n3,d\n', opts={'engine': 'split'}) as f:
+        f.read()
+
+    assert f.rows == [['t','u'], ['1','a'], ['2','b,\nc'], ['3','d']]
+
+def test_unknown_engine(engine_cassava):
+    with engine_cassava(NUMERIC_TEXT, opts={'engine': 'fast'}) as f:
+        with pytest.raises(ValueError, match='Unknown engine fast'):
+            f.read()
+
+@pytest.mark.parametrize(['n'], [(0,), (10,), (5000,), (100000,)])
+def test_hyperloglog(n):
+    hll = cassava.CassavaHyperLogLog()
+    values = np.array([f'v{i}' for i in range(n)], dtype=object)
+    hll.add(values)
+    hll.add(values[:n // 2])
+
+    assert abs(hll.count() - n) <= 0.03 * n
+
+def test_hyperloglog_is_deterministic():
+    values = [f'v{i}' for i in range(1000)]
+    a, b = cassava.CassavaHyperLogLog(), cassava.CassavaHyperLogLog()
+    a.add(values)
+    b.add(values[::-1])
+
+    assert a.registers.tobytes() == b.registers.tobytes()
+    assert a.count() == b.count()
+
+@pytest.mark.parametrize(['values','expected'], [
+(['True','false','TRUE'], 'bool'),
+(['1','-2','30'], 'int'),
+(['1','2.5','1e3','nan'], 'float'),
+(['2020-01-01T00:00:00','2020-01-02T12:30:00'], 'datetime'),
+(['a','1','2020-01-01T00:00:00'], 'text'),
+([str(i) for i in range(19)] + ['x'], 'int'),
+([], None)
+])
+def test_infer_column_type(init_cassava, values, expected):
+    f = init_cassava({})
+
+    assert f.infer_column_type(np.array(values, dtype=object)) == expected
+
+PROFILE_TEXT = 'id,flag,when,name,score\n' + ''.join([f"{i},{'true' if i % 2 else 'False'},2020-01-{i + 1:02d}T00:00:00,n{i % 5},{i * 0.5}\n" for i in range(20)]).replace('4,False,2020-01-05T00:00:00,n4,2.0', '4,false,2020-01-0x,"a, b",-999').replace('8,False,2020-01-09T00:00:00,n3,4.0', '8,false,2020-01-09T00:00:00,n3,bad') + '20,true\n'
+
+@pytest.mark.parametrize(['read','nrows'], [(False, 3), (False, cassava.CHUNK_NROWS), (True, cassava.CHUNK_NROWS)])
+def test_profile_columns(tmp_path, read, nrows):
+    path = tmp_path / 'in.csv'
+    path.write_text(PROFILE_TEXT)
+    conf = cassava.Cassava.DEFAULTS.copy()
+    conf.update({'header_row': 0, 'first_data_row': 1, 'missing_value': '-999'})
+
+    with cassava.Cassava(path=str(path), conf=conf) as f:
+        if read:
+            f.read()
+
+        msgs = list(f.profile_columns(nsample=10, nrows=nrows))
+
+    assert [msg['data']['type'] for msg in msgs] == ['int', 'bool', 'datetime', 'text', 'float']
+    assert [msg['data']['nvalues'] for msg in msgs] == [21, 21, 20, 20, 19]
+    assert [msg['data']['nmissing'] for msg in msgs] == [0, 0, 1, 1, 2]
+    assert [msg['data']['nfailures'] for msg in msgs] == [0, 0, 1, 0, 1]
+    assert msgs[2]['data']['rows'] == [5]
+    assert msgs[4]['data']['rows'] == [9]
+    assert msgs[4]['status'] == cassava.CassavaStatus.warn
+    # The cardinalities are estimates, with a standard error of about 1%
+    assert [msg['data']['cardinality'] for msg in msgs] == pytest.approx([21, 3, 20, 6, 19], abs=1)
+    assert (msgs[0]['data']['min'], msgs[0]['data']['max']) == (0, 20)
+    assert msgs[2]['data']['max'] == datetime.datetime(2020, 1, 20)
+    assert (msgs[3]['data']['min'], msgs[3]['data']['max']) == ('a, b', 'n4')
+    assert msgs[4]['data']['label'] == 'score'
+
+@pytest.mark.parametrize(['workers'], [(1,), (4,)])
+def test_compute_column_stats_all_columns(init_cassava, workers):
+    f = init_cassava({'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'all_columns': True, 'workers': workers, 'missing_value': '-999', 'profile': True})
+    f.rows = [['t','a','b','c','d']] + [[str(i), str(i * 2), f'n{i}', '-999' if i == 3 else str(i / 4), ''] for i in range(10)]
+    f.store_header()
+
+    with f.profile_phase('outer'):
+        msgs = list(f.compute_column_stats())
+
+    assert f.get_numeric_columns() == [1,3]
+    assert [msg['x'] for msg in msgs] == [1,3]
+    assert msgs[0]['data']['max'] == 18
+    assert msgs[1]['data']['mean'] == pytest.approx(np.mean([i / 4 for i in range(10) if i != 3]))
+    assert {record['depth'] for record in f.profile if record['phase'] == 'stats'} == {1}
+
+EXPORT_TEXT = 't,v1,s,v2\n1,1.0,a,10\n2,-999,b,11\n3,x,c,12\n4,1.2,d,13\n5,100,e,14\n6,1.1\n7,0.9,f,15\n8,1.0,g,16\n'
+
+@pytest.mark.parametrize(['nrows'], [(3,), (100,)])
+def test_export_csv(tmp_path, nrows):
+    path = tmp_path / 'in.csv'
+    out_path = tmp_path / 'out.csv'
+    path.write_text(EXPORT_TEXT)
+    conf = cassava.Cassava.DEFAULTS.copy()
+    conf.update({'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'ycol': [1,3], 'missing_value': '-999', 'forgive': True})
+
+    with cassava.Cassava(path=str(path), conf=conf) as f:
+        fences = f.compute_column_fences(nrows=nrows)
+        msgs = f.export_csv(str(out_path), flags=True, nrows=nrows)
+
+    assert fences[1] == pytest.approx((0.7375, 1.4375))
+    assert out_path.read_text().splitlines() == [
+        't,v1,s,v2,v1_flag,v2_flag',
+        '1,1.0,a,10,,',
+        '2,,b,11,missing,',
+        '3,,c,12,invalid,',
+        '4,1.2,d,13,,',
+        '5,100,e,14,outlier,',
+        '6,1.1,,,,invalid',
+        '7,0.9,f,15,,',
+        '8,1.0,g,16,,'
+    ]
+    assert [msg['data'] for msg in msgs] == [{'missing': 1, 'invalid': 1, 'outlier': 1}, {'missing': 0, 'invalid': 1, 'outlier': 0}]
+    assert f.export_info['nrows'] == 8
+    assert f.export_info['nvalues'] == {1: 6, 3: 7}
+
+def test_print_export_estimated_fences(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'in.csv'
+    path.write_text(EXPORT_TEXT)
+    conf = cassava.Cassava.DEFAULTS.copy()
+    conf.update({'header_row': 0, 'first_data_row': 1, 'xcol': 0, 'ycol': [1,3], 'missing_value': '-999', 'forgive': True})
+    monkeypatch.setattr(cassava, 'QUANTILE_NSAMPLE', 6)
+
+    with cassava.Cassava(path=str(path), conf=conf) as f:
+        f.print_export(str(tmp_path / 'out.csv'))
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[2].endswith('(fences 0.74 to 1.4)')
+    assert lines[3].endswith('estimated from a sample of 6 of 7 values)')
+
+@pytest.mark.parametrize(['text','header_row','expected'], [
+('t,v1,s,v2\n', 0, ['t,v1,s,v2,v1_flag,v2_flag']),
+('', None, []),
+])
+def test_export_csv_no_data_rows(tmp_path, text, header_row, expected):
+    path = tmp_path / 'in.csv'
+    out_path = tmp_path / 'out.csv'
+    path.write_text(text)
+    conf = cassava.Cassava.DEFAULTS.copy()
+    conf.update({'header_row': header_row, 'first_data_row': 0 if header_row is None else 1, 'ycol': [1,3]})
+
+    with cassava.Cassava(path=str(path), conf=conf) as f:
+        msgs = f.export_csv(str(out_path), flags=True)
+
+    assert out_path.read_text().splitlines() == expected
+    assert [msg['data'] for msg in msgs] == [{'missing': 0, 'invalid': 0, 'outlier': 0}] * 2
+    assert f.export_info['nrows'] == 0
+
+def test_quantile_sketch():
+    values = np.random.default_rng(1).normal(size=50000)
+    values[::100] = np.nan
+
+    # Exact until the sample is full
+    sketch = cassava.CassavaQuantileSketch(n=100000, seed=0)
+    sketch.add(values[:20000])
+    sketch.add(values[20000:])
+    np.testing.assert_array_equal(np.sort(sketch.get_values()), np.sort(values[~np.isnan(values)]))
+
+    sketch = cassava.CassavaQuantileSketch(n=5000, seed=0)
+
+    for chunk in np.array_split(values, 7):
+        sketch.add(chunk)
+
+    assert sketch.nvalues == 49500
+    assert len(sketch.get_values()) == 5000
+    assert np.quantile(sketch.get_values(), [0.25, 0.75]) == pytest.approx(np.nanquantile(values, [0.25, 0.75]), abs=0.05)
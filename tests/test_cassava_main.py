@@ -1,6 +1,7 @@
 import os
 import sys
 import argparse
+import json
 
 import pytest
 
@@ -98,9 +99,217 @@ def test_parse_cmdln_custom_plot_options():
     args = m.parse_cmdln()
     assert args.plot_opts == {'lw': 4, 'c': 'green', 'ls': '--'}
 
+@pytest.mark.parametrize(['opt','value'], [
+('--sample', '0'),
+('--sample', '-5'),
+('--sample-every', '0'),
+('--sample-every', '-1'),
+('--sample-every', 'x'),
+])
+def test_parse_cmdln_sample_must_be_positive(opt, value):
+    sys.argv = ['main', '-y', '1', opt, value, 'print', 'qc', 'data.csv']
+    with pytest.raises(SystemExit):
+        m.parse_cmdln()
+
 def test_main_print_qc():
     in_file = base + '/data/dt-valid.csv'
     sys.argv = ['main', '-H', '0', '-i', '1', '-y', '1', 'print', 'qc', in_file]
     args = m.parse_cmdln()
     m.main()
 
+def test_main_print_qc_forgiven_y_column_failures(tmp_path, capsys):
+    in_file = tmp_path / 'bad.csv'
+    in_file.write_text('t,v\n1,2\n2,bad\n3,4\n')
+    sys.argv = ['main', '-C', '-x', '0', '-y', '1', '-F', 'print', 'qc', str(in_file)]
+    m.main()
+    captured = capsys.readouterr()
+    assert 'Forgiven conversion failures:' in captured.out
+    assert 'column 1: 1 cells (rows 2)' in captured.out
+
+def test_main_print_stats_profile_json(tmp_path):
+    in_file = base + '/data/dt-valid.csv'
+    out_file = str(tmp_path / 'profile.json')
+    sys.argv = ['main', '-C', '-y', '1', '--profile-out', out_file, 'print', 'stats', in_file]
+    m.main()
+
+    with open(out_file) as fp:
+        profile = json.load(fp)
+
+    phases = [item['phase'] for item in profile['summary']]
+    assert phases[:2] == ['main', 'read']
+    assert 'convert' in phases
+
+def test_main_print_stats_profile_before_command(capsys):
+    in_file = base + '/data/dt-valid.csv'
+    sys.argv = ['main', '-C', '-y', '1', '--profile', 'print', 'stats', in_file]
+    m.main()
+    captured = capsys.readouterr()
+    assert 'Profile:' in captured.out
+    assert 'compute_column_stats' in captured.out
+
+def test_parse_cmdln_single_missing_value():
+    sys.argv = ['main', '-m', '-999', 'print', 'qc', 'data.csv']
+    args = m.parse_cmdln()
+    assert args.missing_value == '-999'
+
+def test_parse_cmdln_multiple_missing_values():
+    sys.argv = ['main', '--missing-value=-9999,NaN,NA,', 'print', 'qc', 'data.csv']
+    args = m.parse_cmdln()
+    assert args.missing_value == ['-9999','NaN','NA','']
+
+def test_main_print_checks(capsys):
+    in_file = base + '/data/cells-missing.csv'
+    sys.argv = ['main', '-C', '-y', '1', '--checks', 'empty_rows,column_counts', 'print', 'checks', in_file]
+    m.main()
+    out = capsys.readouterr().out
+    assert out.index('Empty rows:') < out.index('Column counts:')
+    assert 'row 11: is_empty = True' in out
+
+@pytest.mark.parametrize(['opt','expected'], [
+('100:200', (100,200)),
+('100:', (100,None)),
+(':200', (None,200)),
+])
+def test_parse_cmdln_rows(opt, expected):
+    sys.argv = ['main', '--rows', opt, 'print', 'qc', 'data.csv']
+    args = m.parse_cmdln()
+    assert args.row_range == expected
+
+def test_parse_cmdln_dtype():
+    sys.argv = ['main', 'print', 'qc', 'data.csv']
+    args = m.parse_cmdln()
+    assert args.dtype == 'float64'
+
+    sys.argv = ['main', '--dtype', 'float32', 'print', 'qc', 'data.csv']
+    args = m.parse_cmdln()
+    assert args.dtype == 'float32'
+
+def test_main_diff(tmp_path, capsys):
+    base_file = tmp_path / 'base.csv'
+    in_file = tmp_path / 'in.csv'
+    base_file.write_text('t,v1\n1,1.0\n2,2.0\n3,3.0\n')
+    in_file.write_text('t,v1\n1,1.0\n2,2.5\n4,4.0\n')
+    sys.argv = ['main', '-C', '-x', '0', '-y', '1', '--tolerance', '0.1', 'diff', str(base_file), str(in_file)]
+    m.main()
+    out = capsys.readouterr().out
+    assert 'added = 1, removed = 1, changed = 1 (1 cells), unchanged = 1' in out
+    assert 'column 1, row 2 (base row 2): key = 2, 2.0 -> 2.5' in out
+
+def test_main_print_qc_glob(tmp_path, capsys):
+    for day in [1, 2]:
+        (tmp_path / f'day{day}.csv').write_text(f't,v1\n{day},1.0\n{day + 2},2.0\n')
+
+    sys.argv = ['main', '-C', '-x', '0', '-y', '1', 'print', 'qc', str(tmp_path / 'day*.csv')]
+    m.main()
+    out = capsys.readouterr().out
+    assert 'merged 4 data rows of 2 files by x-axis column 0' in out
+
+@pytest.mark.parametrize(['engine'], [('auto',), ('csv',), ('numeric',)])
+def test_main_print_stats_engine(tmp_path, capsys, engine):
+    in_file = tmp_path / 'in.csv'
+    in_file.write_text('t,v1\n1,1.0\n2,2.0\n3,-999\n4,5.0\n')
+    sys.argv = ['main', '-C', '-x', '0', '-y', '1', '-m', '-999', '--engine', engine, '--profile', '-v', 'print', 'stats', str(in_file)]
+    m.main()
+    out = capsys.readouterr().out
+    assert 'parser engine = ' + ('numeric' if engine == 'auto' else engine) in out
+    assert '1      1   2.7  5' in out
+
+def test_main_print_profile(tmp_path, capsys):
+    in_file = tmp_path / 'in.csv'
+    in_file.write_text('t,v1,v2\n' + ''.join([f'{i},{i / 2},a{i % 3}\n' for i in range(20)]) + '20,x,b\n')
+    sys.argv = ['main', '-C', 'print', 'profile', str(in_file)]
+    m.main()
+    out = capsys.readouterr().out
+    assert '1      v1    float 21     0       1        ~21' in out
+    assert 'column 1 (float): 1 cells (rows 21)' in out
+
+def test_main_print_stats_all_columns(tmp_path, capsys):
+    in_file = tmp_path / 'in.csv'
+    in_file.write_text('t,v1,s,v2\n' + ''.join([f'{i},{i},a{i},{i * 10}\n' for i in range(10)]))
+    sys.argv = ['main', '-C', '-x', '0', '-O', '--all-columns', '--workers', '2', 'print', 'stats', str(in_file)]
+    m.main()
+    out = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in out[2:]] == ['1', '3']
+
+def test_main_print_qc_manifest(tmp_path, capsys):
+    for day in [1, 2]:
+        (tmp_path / f'day{day}.csv').write_text(f't,v1\n{day},1.0\n{day + 2},2.0\n')
+
+    manifest = str(tmp_path / 'manifest.db')
+    argv = ['main', '-C', '-x', '0', '-y', '1', '--manifest', manifest, 'print', 'qc', str(tmp_path / 'day*.csv')]
+    sys.argv = argv
+    m.main()
+    out = capsys.readouterr().out
+    assert 'ran print qc on 2 files, skipped 0 unchanged files' in out
+    assert out.count('total rows = 3, data rows = 2') == 2
+
+    # A touched file is unchanged, as its content hash is the same
+    os.utime(tmp_path / 'day1.csv', ns=(0, 0))
+    (tmp_path / 'day2.csv').write_text('t,v1\n2,1.0\n4,2.0\n5,3.0\n')
+    sys.argv = argv
+    m.main()
+    rerun = capsys.readouterr().out
+    assert 'ran print qc on 1 files, skipped 1 unchanged files' in rerun
+    assert rerun.split('day2.csv:')[0] == out.split('day2.csv:')[0]
+    assert 'total rows = 4, data rows = 3' in rerun
+
+    # Different options are a different entry
+    sys.argv = [*argv[:-3], '-v', *argv[-3:]]
+    m.main()
+    assert 'ran print qc on 2 files, skipped 0 unchanged files' in capsys.readouterr().out
+
+def test_main_print_qc_manifest_keep_going(tmp_path, capsys):
+    (tmp_path / 'day1.csv').write_text('t,v1\n1,bad\n')
+    (tmp_path / 'day2.csv').write_text('t,v1\n2,1.0\n')
+    manifest = str(tmp_path / 'manifest.db')
+    argv = ['main', '-C', '-x', '0', '-y', '1', '--manifest', manifest, 'print', 'stats', str(tmp_path / 'day*.csv')]
+
+    sys.argv = argv
+    with pytest.raises(ValueError):
+        m.main()
+    capsys.readouterr()
+
+    sys.argv = [*argv[:-3], '--keep-going', *argv[-3:]]
+    m.main()
+    out = capsys.readouterr().out
+    assert 'ran print stats on 2 files, skipped 0 unchanged files' in out
+    assert f"failed on 1 files: {tmp_path / 'day1.csv'}" in out
+
+    # The failed file isn't recorded, so it's checked again
+    m.main()
+    assert 'ran print stats on 1 files, skipped 1 unchanged files' in capsys.readouterr().out
+
+def test_main_results_db_query(tmp_path, capsys):
+    in_file = tmp_path / 'in.csv'
+    in_file.write_text('t,v1\n' + ''.join([f'{i},{i}\n' for i in range(8)]) + ',\n,\n8,8\n')
+    results_db = str(tmp_path / 'results.db')
+
+    for i in range(2):
+        sys.argv = ['main', '-C', '-y', '1', '-F', '--results-db', results_db, 'print', 'qc', str(in_file)]
+        m.main()
+
+    capsys.readouterr()
+    sys.argv = ['main', 'query', "SELECT run_id, nrows, nresults, nerror FROM check_summary WHERE check_name = 'empty_rows' AND nerror > 0.1 * nrows", results_db]
+    m.main()
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].split() == ['run_id', 'nrows', 'nresults', 'nerror']
+    assert [line.split() for line in out[1:]] == [['1', '11', '12', '2'], ['2', '11', '12', '2']]
+
+    # Consecutive rows with the same result are stored as a range
+    sys.argv = ['main', 'query', "SELECT start_row, end_row, status FROM results WHERE run_id = 2 AND check_name = 'empty_rows'", results_db]
+    m.main()
+    out = capsys.readouterr().out.splitlines()
+    assert [line.split() for line in out[1:]] == [['0', '8', 'ok'], ['9', '10', 'error'], ['11', '11', 'ok']]
+
+def test_main_export(tmp_path, capsys):
+    in_file = tmp_path / 'in.csv'
+    in_file.write_text('t,v1\n1,1.0\n2,-999\n3,1.1\n4,0.9\n5,50\n6,1.0\n')
+    sys.argv = ['main', '-C', '-x', '0', '-y', '1', '-m', '-999', 'export', '-', str(in_file)]
+    m.main()
+    assert capsys.readouterr().out.splitlines() == ['t,v1', '1,1.0', '2,', '3,1.1', '4,0.9', '5,50', '6,1.0']
+
+    out_file = tmp_path / 'out.csv'
+    sys.argv = ['main', '-C', '-x', '0', '-y', '1', '-m', '-999', '--flags', 'export', str(out_file), str(in_file)]
+    m.main()
+    assert 'column 1: missing = 1, invalid = 0, outlier = 1' in capsys.readouterr().out
+    assert out_file.read_text().splitlines()[5] == '5,50,outlier'
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+
+import pytest
+
+import cassava.__main__ as m
+import cassava.serve as s
+
+base = os.path.dirname(__file__)
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / 'cassava.sock')
+
+    server = s.CassavaServer(path, workers=2)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+def send_request(server, argv, cwd=None):
+    # The output is redirected here, rather than in the server fixture,
+    # because pytest's output capturing replaces sys.stdout between phases
+    with s.redirect_output():
+        return s.send_request(server.server_address, argv, cwd=cwd)
+
+def run_locally(argv, capsys):
+    sys.argv = ['main', *argv]
+    m.main()
+
+    return capsys.readouterr().out
+
+@pytest.mark.parametrize(['argv'], [
+(['-C', '-x', '0', '-d', '-y', '1,2,3,4', '-F', 'print', 'qc'],),
+(['-C', '-x', '0', '-d', '-y', '1,2,3,4', '-F', 'print', 'stats'],),
+(['-C', '-y', '1,2', '-F', '--checks', 'empty_rows', 'print', 'checks'],),
+])
+def test_remote_output_same_as_local(server, capsys, argv):
+    argv = [*argv, 'cells-missing.csv']
+    response = send_request(server, argv, cwd=base + '/data')
+    assert response['status'] == 0
+    assert response['stdout'] == run_locally([*argv[:-1], base + '/data/cells-missing.csv'], capsys)
+
+def test_remote_caches_parsed_file(server):
+    argv = ['-C', '-y', '1', 'print', 'stats', base + '/data/dt-valid.csv']
+    responses = [send_request(server, argv) for i in range(3)]
+    assert len(set([response['stdout'] for response in responses])) == 1
+    assert (server.cache.misses, server.cache.hits) == (1, 2)
+
+    # A change to how the file is read is a different cache entry
+    send_request(server, ['-H', '0', '-i', '2', *argv[1:]])
+    assert server.cache.misses == 2
+
+def test_remote_error_status(server):
+    response = send_request(server, ['-F', 'print', 'qc', 'no-such-file.csv'], cwd=base)
+    assert response['status'] == 1
+    assert 'No such file or directory' in response['stdout']
+
+    response = send_request(server, ['-C', 'plot', 'qc', 'data.csv'])
+    assert 'not supported by the server' in response['stdout']
+
+def test_remote_invalid_option(server):
+    response = send_request(server, ['-y', 'a-b', 'print', 'qc', 'data.csv'], cwd=base)
+    assert response['status'] == 0
+    assert 'invalid literal' in response['stdout']
+
+    # The server still handles requests
+    response = send_request(server, ['-C', '-y', '1', 'print', 'qc', 'data/dt-valid.csv'], cwd=base)
+    assert 'Row counts:' in response['stdout']
+
+def test_file_cache_evicts_least_recently_used():
+    cache = s.FileCache(size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert list(cache.entries) == ['a', 'c']